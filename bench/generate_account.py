@@ -0,0 +1,116 @@
+import argparse
+import datetime
+import json
+import random
+
+# Tasks per API priority above P4, a few short of the default targets as after
+# a day of completed tasks
+HIGH_PRIORITY_TASKS = {4: 3, 3: 7, 2: 12}
+# Share of tasks per duration in minutes, None is no duration
+DURATION_WEIGHTS = {None: 0.55, 15: 0.15, 30: 0.15, 60: 0.1, 120: 0.05}
+# Share of tasks due today
+TODAY_SHARE = 0.001
+
+
+def make_item(
+    task_id: str,
+    priority: int,
+    created_at: datetime.datetime,
+    duration: int | None = None,
+    due: datetime.date | None = None,
+) -> dict:
+    """!
+    Create a task in the Todoist API v1 format
+
+    @param task_id The task id
+    @param priority The API priority, 4 is the highest
+    @param created_at The creation time in UTC
+    @param duration The duration in minutes or None
+    @param due The due date or None
+
+    @return The task dict
+    """
+    timestamp = created_at.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+    return {
+        "id": task_id,
+        "content": f"Task {task_id}",
+        "description": "",
+        "project_id": "2203306141",
+        "section_id": None,
+        "parent_id": None,
+        "labels": [],
+        "priority": priority,
+        "due": (
+            None
+            if due is None
+            else {"date": due.isoformat(), "string": "today", "lang": "en"}
+        ),
+        "deadline": None,
+        "duration": (
+            None if duration is None else {"amount": duration, "unit": "minute"}
+        ),
+        "collapsed": False,
+        "child_order": 1,
+        "responsible_uid": None,
+        "assigned_by_uid": None,
+        "added_by_uid": "1",
+        "added_at": timestamp,
+        "updated_at": timestamp,
+        "completed_at": None,
+        "checked": False,
+        "is_deleted": False,
+    }
+
+
+def generate_tasks(count: int, seed: int = 0, now: datetime.datetime = None) -> list:
+    """!
+    Generate a synthetic account
+
+    Task ages follow a log-normal distribution with a median of about two
+    months, so most tasks are recent and a long tail is years old. The P1-P3
+    levels hold HIGH_PRIORITY_TASKS tasks and every other task is P4, like an
+    account kept by the script.
+
+    @param count The number of tasks
+    @param seed The random seed, the same seed gives the same account
+    @param now The time the account is generated at, defaults to the current time
+
+    @return The list of task dicts
+    """
+    rng = random.Random(seed)
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    today = datetime.date.today()
+    priorities = [1] * count
+    high_priority = rng.sample(
+        range(count), min(count, sum(HIGH_PRIORITY_TASKS.values()))
+    )
+    for priority, size in HIGH_PRIORITY_TASKS.items():
+        for i in high_priority[:size]:
+            priorities[i] = priority
+        high_priority = high_priority[size:]
+    durations = rng.choices(
+        list(DURATION_WEIGHTS), list(DURATION_WEIGHTS.values()), k=count
+    )
+    tasks = []
+    for i in range(count):
+        age_days = min(rng.lognormvariate(4, 1.2), 3650)
+        tasks.append(
+            make_item(
+                str(1000000 + i),
+                priorities[i],
+                now - datetime.timedelta(days=age_days),
+                durations[i],
+                today if rng.random() < TODAY_SHARE else None,
+            )
+        )
+    return tasks
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic account")
+    parser.add_argument("tasks", type=int, help="Number of tasks")
+    parser.add_argument("-s", "--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("-o", "--output", default="account.json", help="Output file")
+    args = parser.parse_args()
+    with open(args.output, "w") as output_file:
+        json.dump(generate_tasks(args.tasks, args.seed), output_file)
@@ -0,0 +1,289 @@
+import argparse
+import collections
+import datetime
+import json
+import re
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from generate_account import generate_tasks
+
+PAGE_LIMIT = 200
+
+
+def parse_due_string(due_string: str) -> dict:
+    """!
+    Convert the due strings the script sends to a due object
+
+    Only "today" and "today at HH:MM" are understood, which is all the script
+    uses.
+
+    @param due_string The due string
+
+    @return The due object
+    """
+    today = datetime.date.today().isoformat()
+    match = re.fullmatch(r"today at (\d{1,2}):(\d{2})", due_string)
+    date = f"{today}T{int(match[1]):02}:{match[2]}:00" if match else today
+    return {"date": date, "string": due_string, "lang": "en", "is_recurring": False}
+
+
+def matches_query(item: dict, query: str) -> bool:
+    """!
+    Check a task against the filter queries the script uses
+
+    @param item The task dict
+    @param query "p1"-"p4" or "today", anything else matches every task
+
+    @return True if the task matches
+    """
+    query = query.strip().lower()
+    if query in {"p1", "p2", "p3", "p4"}:
+        return item["priority"] == 5 - int(query[1])
+    if query == "today":
+        return item["due"] is not None and item["due"]["date"].startswith(
+            datetime.date.today().isoformat()
+        )
+    return True
+
+
+class MockTodoist:
+    """
+    Local stand-in for the Todoist REST and Sync endpoints the script uses,
+    with injected latency and per-endpoint call and byte counters
+    """
+
+    def __init__(self, tasks: list, latency: float = 0, port: int = 0):
+        """!
+        Initializes a MockTodoist object and binds the HTTP server
+
+        @param tasks The task dicts of the account
+        @param latency Seconds added to every request
+        @param port The port to listen on, 0 picks a free port
+        """
+        self.items = {item["id"]: dict(item) for item in tasks}
+        self.latency = latency
+        self.lock = threading.Lock()
+        # Sync token of each task's last change
+        self.version = 1
+        self.changed = {task_id: 1 for task_id in self.items}
+        self.calls = collections.Counter()
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.commands = 0
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), self.make_handler())
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = None
+
+    def reset_counters(self) -> None:
+        """
+        Zero the call and byte counters
+        """
+        with self.lock:
+            self.calls = collections.Counter()
+            self.bytes_in = self.bytes_out = self.commands = 0
+
+    def counters(self) -> dict:
+        """!
+        Get the call and byte counters
+
+        @return Dict of the counters
+        """
+        with self.lock:
+            return {
+                "api_calls": sum(self.calls.values()),
+                "calls": dict(self.calls),
+                "commands": self.commands,
+                "bytes_sent": self.bytes_in,
+                "bytes_received": self.bytes_out,
+            }
+
+    def update_item(self, task_id: str, fields: dict) -> dict:
+        """!
+        Apply REST style update fields to a task
+
+        @param task_id The task id
+        @param fields The update fields
+
+        @return The updated task dict
+
+        @raises KeyError: If the task does not exist
+        """
+        item = self.items[task_id]
+        for key, value in fields.items():
+            if key == "due_string":
+                item["due"] = parse_due_string(value)
+            elif key == "due":
+                item["due"] = parse_due_string(value["string"])
+            elif key == "duration" and isinstance(value, dict):
+                item["duration"] = value
+            elif key == "duration":
+                item["duration"] = {
+                    "amount": value,
+                    "unit": fields.get("duration_unit", "minute"),
+                }
+            elif key not in {"id", "duration_unit"}:
+                item[key] = value
+        self.version += 1
+        self.changed[task_id] = self.version
+        return item
+
+    def get_tasks(self, params: dict) -> tuple:
+        """!
+        Get a page of tasks
+
+        @param params The query parameters, query, limit and cursor
+
+        @return Tuple of HTTP status and response body
+        """
+        query = params.get("query", [""])[0]
+        limit = min(int(params.get("limit", [50])[0]), PAGE_LIMIT)
+        start = int(params.get("cursor", ["0"])[0] or 0)
+        matching = [item for item in self.items.values() if matches_query(item, query)]
+        page = matching[start : start + limit]
+        next_cursor = str(start + limit) if start + limit < len(matching) else None
+        return 200, {"results": page, "next_cursor": next_cursor}
+
+    def sync(self, form: dict) -> tuple:
+        """!
+        Handle a Sync API request with commands and an items read
+
+        @param form The decoded form fields
+
+        @return Tuple of HTTP status and response body
+        """
+        response = {"sync_status": {}, "temp_id_mapping": {}}
+        for command in json.loads(form.get("commands", "[]")):
+            self.commands += 1
+            args = command["args"]
+            try:
+                self.update_item(
+                    args["id"],
+                    {key: value for key, value in args.items() if key != "id"},
+                )
+                response["sync_status"][command["uuid"]] = "ok"
+            except KeyError:
+                response["sync_status"][command["uuid"]] = {
+                    "error": "Item not found",
+                    "error_code": 22,
+                }
+        sync_token = form.get("sync_token")
+        if sync_token is not None:
+            if sync_token == "*":
+                since = 0
+            elif sync_token.isdigit() and int(sync_token) <= self.version:
+                since = int(sync_token)
+            else:
+                return 400, {
+                    "error": "Invalid argument value",
+                    "error_tag": "INVALID_ARGUMENT_VALUE",
+                    "error_extra": {"argument": "sync_token"},
+                }
+            response["full_sync"] = since == 0
+            response["items"] = [
+                item
+                for task_id, item in self.items.items()
+                if self.changed[task_id] > since
+            ]
+        response["sync_token"] = str(self.version)
+        return 200, response
+
+    def handle(self, method: str, path: str, body: bytes) -> tuple:
+        """!
+        Route a request
+
+        @param method The HTTP method
+        @param path The request path with the query string
+        @param body The raw request body
+
+        @return Tuple of the endpoint name, HTTP status and response body
+        """
+        url = urllib.parse.urlsplit(path)
+        params = urllib.parse.parse_qs(url.query)
+        parts = url.path.strip("/").split("/")[2:]
+        if method == "GET" and parts == ["tasks"]:
+            return ("GET /tasks", *self.get_tasks(params))
+        if method == "GET" and parts == ["tasks", "filter"]:
+            return ("GET /tasks/filter", *self.get_tasks(params))
+        if method == "POST" and parts == ["sync"]:
+            form = {
+                key: values[0]
+                for key, values in urllib.parse.parse_qs(body.decode()).items()
+            }
+            return ("POST /sync", *self.sync(form))
+        if method == "POST" and len(parts) in {2, 3} and parts[0] == "tasks":
+            fields = json.loads(body or b"{}")
+            name = "POST /tasks/{id}" + ("/move" if len(parts) == 3 else "")
+            if parts[1] not in self.items:
+                return name, 404, {"error": "Task not found"}
+            return name, 200, self.update_item(parts[1], fields)
+        return f"{method} {url.path}", 404, {"error": "Not found"}
+
+    def make_handler(self):
+        """!
+        Create the request handler class bound to this server
+
+        @return The request handler class
+        """
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def respond(self, method):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if mock.latency:
+                    time.sleep(mock.latency)
+                with mock.lock:
+                    name, status, payload = mock.handle(method, self.path, body)
+                    data = json.dumps(payload).encode()
+                    mock.calls[name] += 1
+                    mock.bytes_in += len(body)
+                    mock.bytes_out += len(data)
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self.respond("GET")
+
+            def do_POST(self):
+                self.respond("POST")
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> None:
+        """
+        Serve requests in a background thread
+        """
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop serving requests
+        """
+        self.server.shutdown()
+        self.server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a synthetic Todoist account")
+    parser.add_argument("tasks", type=int, help="Number of tasks")
+    parser.add_argument("-s", "--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on")
+    parser.add_argument(
+        "--latency-ms", type=float, default=0, help="Latency added to every request"
+    )
+    args = parser.parse_args()
+    mock = MockTodoist(
+        generate_tasks(args.tasks, args.seed), args.latency_ms / 1000, args.port
+    )
+    print(f"Serving {args.tasks} tasks on {mock.url}")
+    mock.server.serve_forever()
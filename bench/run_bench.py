@@ -0,0 +1,226 @@
+import argparse
+import dataclasses
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+from todoist_api_python.api import TodoistAPI
+import http_session
+import todoist_prioritizer
+from todoist_prioritizer import apply_plan, build_plan, get_snapshot, make_writer
+from Settings import Settings, SettingsFile
+from ParallelExecutor import ParallelExecutor
+from SyncStore import SyncStore
+from generate_account import generate_tasks
+from mock_todoist import MockTodoist
+
+TOKEN = "bench"
+
+
+def make_settings(write_mode: str, incremental_sync: bool) -> Settings:
+    """!
+    Get the default settings with a write mode and sync mode
+
+    @param write_mode The write_mode setting
+    @param incremental_sync The incremental_sync setting
+
+    @return The settings
+    """
+    return dataclasses.replace(
+        SettingsFile().get("DEFAULT"),
+        write_mode=write_mode,
+        incremental_sync=incremental_sync,
+    )
+
+
+def run_pipeline(settings: Settings, state_path: str) -> int:
+    """!
+    Run one daily prioritization pass the way run_account() does
+
+    @param settings The settings
+    @param state_path The sync state file
+
+    @return The number of planned changes
+    """
+    with TodoistAPI(TOKEN, client=http_session.new_client()) as api:
+        writer = make_writer(settings, api, TOKEN) or ParallelExecutor(api, 1)
+        store = None
+        if settings.incremental_sync:
+            store = SyncStore(TOKEN, state_path)
+        plan = build_plan(get_snapshot(api, store), settings)
+        apply_plan(plan, writer)
+    return len(plan)
+
+
+def measure(tasks: list, settings: Settings, latency: float, memory: bool) -> list:
+    """!
+    Run a cold and a warm pass against a fresh mock server
+
+    @param tasks The task dicts of the account
+    @param settings The settings
+    @param latency Seconds added to every request
+    @param memory Trace the peak memory, which slows the runs down
+
+    @return List of the results of the two runs
+    """
+    mock = MockTodoist(tasks, latency)
+    mock.start()
+    # The mock has no quota, so the governor does not throttle the runs
+    http_session.configure(api_url=mock.url, rate_limit=10**9)
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            state_path = os.path.join(tmp_dir, "sync_state.bin")
+            for run in ("cold", "warm"):
+                mock.reset_counters()
+                if memory:
+                    tracemalloc.start()
+                start = time.perf_counter()
+                changes = run_pipeline(settings, state_path)
+                result = {"run": run, "wall_time_s": time.perf_counter() - start}
+                if memory:
+                    result["peak_memory_bytes"] = tracemalloc.get_traced_memory()[1]
+                    tracemalloc.stop()
+                result["changes"] = changes
+                result.update(mock.counters())
+                results.append(result)
+    finally:
+        mock.stop()
+        http_session.configure()
+    return results
+
+
+def run_bench(
+    sizes: list, write_modes: list, incremental: list, latency: float, seed: int
+) -> dict:
+    """!
+    Run every benchmark scenario
+
+    The wall time is measured without tracing, the peak memory is measured in a
+    separate traced repeat of the same scenario.
+
+    @param sizes The account sizes
+    @param write_modes The write modes to run
+    @param incremental The incremental_sync settings to run
+    @param latency Seconds added to every request
+    @param seed The random seed of the accounts
+
+    @return The benchmark report
+    """
+    report = {
+        "version": todoist_prioritizer.current_version,
+        "python": platform.python_version(),
+        "latency_ms": latency * 1000,
+        "seed": seed,
+        "scenarios": [],
+    }
+    for size in sizes:
+        tasks = generate_tasks(size, seed)
+        for write_mode in write_modes:
+            for incremental_sync in incremental:
+                settings = make_settings(write_mode, incremental_sync)
+                runs = measure(tasks, settings, latency, False)
+                traced = measure(tasks, settings, latency, True)
+                for run, traced_run in zip(runs, traced):
+                    run["peak_memory_bytes"] = traced_run["peak_memory_bytes"]
+                scenario = {
+                    "name": f"{size}-{write_mode}-{'incremental' if incremental_sync else 'full'}",
+                    "tasks": size,
+                    "write_mode": write_mode,
+                    "incremental_sync": incremental_sync,
+                    "runs": runs,
+                }
+                report["scenarios"].append(scenario)
+                for run in runs:
+                    print(
+                        f"{scenario['name']:<28} {run['run']:<5} "
+                        f"{run['wall_time_s']:8.3f} s {run['api_calls']:6} calls "
+                        f"{(run['bytes_sent'] + run['bytes_received']) / 1e6:8.2f} MB "
+                        f"{run['peak_memory_bytes'] / 1e6:8.2f} MB peak"
+                    )
+    return report
+
+
+def compare(report: dict, baseline: dict) -> None:
+    """!
+    Print the relative change of every metric against a baseline report
+
+    @param report The new report
+    @param baseline The baseline report
+    """
+    baseline_runs = {
+        (scenario["name"], run["run"]): run
+        for scenario in baseline["scenarios"]
+        for run in scenario["runs"]
+    }
+    print(f"\n{baseline['version']} -> {report['version']}")
+    for scenario in report["scenarios"]:
+        for run in scenario["runs"]:
+            old = baseline_runs.get((scenario["name"], run["run"]))
+            if old is None:
+                continue
+            deltas = []
+            for key in (
+                "wall_time_s",
+                "api_calls",
+                "bytes_received",
+                "peak_memory_bytes",
+            ):
+                if old[key]:
+                    deltas.append(f"{key} {(run[key] - old[key]) / old[key]:+.1%}")
+            print(f"{scenario['name']:<28} {run['run']:<5} {', '.join(deltas)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark a daily run")
+    parser.add_argument(
+        "--tasks",
+        type=int,
+        nargs="+",
+        default=[1000, 10000],
+        help="Account sizes to benchmark",
+    )
+    parser.add_argument(
+        "--write-mode",
+        nargs="+",
+        default=["sync", "parallel"],
+        choices=["sync", "parallel", "rest"],
+        help="Write modes to benchmark",
+    )
+    parser.add_argument(
+        "--sync",
+        nargs="+",
+        default=["incremental", "full"],
+        choices=["incremental", "full"],
+        help="Task fetch modes to benchmark",
+    )
+    parser.add_argument(
+        "--latency-ms", type=float, default=20, help="Latency added to every request"
+    )
+    parser.add_argument("-s", "--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("-o", "--output", help="Write the JSON report to this file")
+    parser.add_argument("-c", "--compare", help="Compare with a previous JSON report")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    report = run_bench(
+        args.tasks,
+        args.write_mode,
+        [mode == "incremental" for mode in args.sync],
+        args.latency_ms / 1000,
+        args.seed,
+    )
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+    if args.compare:
+        with open(args.compare, "r") as baseline_file:
+            compare(report, json.load(baseline_file))
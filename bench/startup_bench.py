@@ -0,0 +1,140 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+bench_dir = os.path.dirname(os.path.abspath(__file__))
+src_dir = os.path.abspath(os.path.join(bench_dir, "..", "src"))
+sys.path.insert(0, src_dir)
+import todoist_prioritizer
+from generate_account import generate_tasks
+from mock_todoist import MockTodoist
+
+# Modules that should only be imported when a run needs them
+LAZY_MODULES = ("keyring", "todoist_api_python")
+
+
+def time_command(command: list, repeat: int) -> list:
+    """!
+    Run a command in fresh processes and time each one
+
+    @param command The command and its arguments
+    @param repeat The number of runs
+
+    @return The list of wall times in seconds
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def run_child(api_url: str) -> None:
+    """!
+    Run one pass against the mock server, the way --once does in a new process
+
+    @param api_url The URL of the mock server
+    """
+    import http_session
+    from run_bench import make_settings, run_pipeline
+
+    http_session.configure(api_url=api_url, rate_limit=10**9)
+    with tempfile.TemporaryDirectory() as directory:
+        run_pipeline(make_settings("sync", False), os.path.join(directory, "sync.bin"))
+
+
+def run_bench(tasks: int, repeat: int, seed: int) -> dict:
+    """!
+    Time the startup of the script and of a one-shot run in new processes
+
+    @param tasks The size of the account of the one-shot run
+    @param repeat The number of runs of every scenario
+    @param seed The random seed of the account
+
+    @return The benchmark report
+    """
+    imported = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            f"import sys; sys.path.insert(0, {src_dir!r}); import todoist_prioritizer;"
+            f"print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))",
+        ],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout.strip()
+    report = {
+        "version": todoist_prioritizer.current_version,
+        "python": platform.python_version(),
+        "tasks": tasks,
+        "eager_imports": imported.split(",") if imported else [],
+        "scenarios": [],
+    }
+    mock = MockTodoist(generate_tasks(tasks, seed))
+    mock.start()
+    try:
+        scenarios = {
+            "interpreter": [sys.executable, "-c", "pass"],
+            "import": [
+                sys.executable,
+                "-c",
+                f"import sys; sys.path.insert(0, {src_dir!r}); import todoist_prioritizer",
+            ],
+            "help": [
+                sys.executable,
+                os.path.join(src_dir, "todoist_prioritizer.py"),
+                "--help",
+            ],
+            "once": [sys.executable, os.path.abspath(__file__), "--child", mock.url],
+        }
+        for name, command in scenarios.items():
+            times = time_command(command, repeat)
+            scenario = {
+                "name": name,
+                "median_s": statistics.median(times),
+                "min_s": min(times),
+                "max_s": max(times),
+            }
+            report["scenarios"].append(scenario)
+            print(
+                f"{name:<12} {scenario['median_s'] * 1000:8.1f} ms median "
+                f"{scenario['min_s'] * 1000:8.1f} ms min"
+            )
+    finally:
+        mock.stop()
+    print(f"Imported at startup: {', '.join(report['eager_imports']) or 'none'}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the startup and a one-shot run in new processes"
+    )
+    parser.add_argument(
+        "--tasks", type=int, default=1000, help="Account size of the one-shot run"
+    )
+    parser.add_argument(
+        "-r", "--repeat", type=int, default=10, help="Runs of every scenario"
+    )
+    parser.add_argument("-s", "--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("-o", "--output", help="Write the JSON report to this file")
+    parser.add_argument("--child", metavar="API_URL", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    if args.child:
+        run_child(args.child)
+        sys.exit(0)
+    report = run_bench(args.tasks, args.repeat, args.seed)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
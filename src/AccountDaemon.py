@@ -0,0 +1,106 @@
+import datetime
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AccountDaemon:
+    """
+    Runs the scheduled passes of many accounts on one shared worker pool
+    """
+
+    def __init__(self, schedulers: dict, job, max_workers: int = 4, max_sleep=300):
+        """!
+        Initializes an AccountDaemon object
+
+        @param schedulers Dict of account name to the account's Scheduler
+        @param job Called with an account name to run one pass for the account
+        @param max_workers The number of accounts that can run at the same time
+        @param max_sleep The longest single sleep in seconds
+        """
+        self.schedulers = schedulers
+        self.job = job
+        self.max_sleep = max_sleep
+        self.pool = ThreadPoolExecutor(max_workers=max(1, max_workers))
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.running = set()
+        now = datetime.datetime.now()
+        self.next_fires = {
+            name: scheduler.next_fire(now) for name, scheduler in schedulers.items()
+        }
+
+    def run_account(self, name: str) -> bool:
+        """!
+        Run one pass for an account, errors only fail this account
+
+        @param name The account name
+
+        @return True if the pass succeeded
+        """
+        try:
+            self.job(name)
+            return True
+        except (Exception, SystemExit) as error:
+            logging.error(f"Account {name} failed: {error}")
+            return False
+
+    def finished(self, name: str, succeeded: bool) -> None:
+        """!
+        Record a finished pass and compute the account's next fire time
+
+        @param name The account name
+        @param succeeded True if the pass succeeded
+        """
+        scheduler = self.schedulers[name]
+        now = datetime.datetime.now()
+        if succeeded:
+            scheduler.mark_run(now)
+        else:
+            # Retry at the next fire time
+            scheduler.last_run = now
+        with self.lock:
+            self.next_fires[name] = scheduler.next_fire(now)
+            self.running.discard(name)
+        self.wake.set()
+
+    def dispatch(self, now: datetime.datetime) -> datetime.datetime | None:
+        """!
+        Submit the accounts whose fire time has come to the worker pool
+
+        @param now The current time
+
+        @return The earliest fire time of the idle accounts, or None
+        """
+        next_fire = None
+        submitted = []
+        with self.lock:
+            for name, fire in self.next_fires.items():
+                if name in self.running:
+                    continue
+                if fire <= now:
+                    self.running.add(name)
+                    submitted.append((name, self.pool.submit(self.run_account, name)))
+                elif next_fire is None or fire < next_fire:
+                    next_fire = fire
+        # A finished future runs its callback immediately, and finished() takes
+        # the lock, so the callbacks are added after releasing it
+        for name, future in submitted:
+            future.add_done_callback(
+                lambda future, name=name: self.finished(name, future.result())
+            )
+        return next_fire
+
+    def run_forever(self) -> None:
+        """
+        Dispatch the accounts at their fire times
+        """
+        logging.info(f"Serving {len(self.schedulers)} accounts")
+        while True:
+            now = datetime.datetime.now()
+            next_fire = self.dispatch(now)
+            timeout = self.max_sleep
+            if next_fire is not None:
+                timeout = min(timeout, (next_fire - now).total_seconds())
+            self.wake.wait(max(timeout, 0))
+            self.wake.clear()
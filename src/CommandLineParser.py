@@ -1,14 +1,21 @@
 import argparse
 import logging
-import keyring
-import configparser
 import sys
-import os
-
-# Get the directory of the script file
-script_dir = os.path.dirname(os.path.realpath(__file__))
-# Join the script directory with the relative path to the ini file
-ini_path = os.path.join(script_dir, "config.ini")
+from Settings import SettingsFile, ini_path
+from logging_setup import configure_logging
+
+# Command line arguments saved to the USER section
+SETTING_ARGS = {
+    "p1": "p1_tasks",
+    "p2": "p2_tasks",
+    "p3": "p3_tasks",
+    "hh": "run_hour",
+    "mm": "run_minute",
+    "nd": "number_of_tasks",
+    "du": "task_duration",
+    "parent": "parent_id",
+    "webhook": "webhook_port",
+}
 
 
 def make_wide(formatter, w: int = 120, h: int = 36):
@@ -95,18 +102,70 @@ class CommandLineParser:
             metavar="PARENT_PROJECT_ID",
             help="If set move oldest P1 task to this parent project",
         )
+        self.parser.add_argument(
+            "-w",
+            "--webhook",
+            type=int,
+            metavar="PORT",
+            help="Listen for Todoist webhooks on this port, 0 disables",
+        )
+        self.parser.add_argument(
+            "-ws",
+            "--webhook-secret",
+            type=str,
+            metavar="CLIENT_SECRET",
+            help="Set the Todoist app client secret used to verify webhooks",
+        )
+        self.parser.add_argument(
+            "-A",
+            "--accounts",
+            type=str,
+            metavar="ACCOUNTS_INI",
+            help="Serve every account profile in this file from one process",
+        )
         self.parser.add_argument(
             "-r",
             "--reset",
             action="store_true",
             help="Reset configuration to default values",
         )
+        self.parser.add_argument(
+            "-n",
+            "--dry-run",
+            action="store_true",
+            help="Print the planned changes once without applying them and exit",
+        )
+        self.parser.add_argument(
+            "-o",
+            "--once",
+            action="store_true",
+            help="Run one prioritization pass and exit, for cron jobs and systemd timers",
+        )
+        self.parser.add_argument(
+            "-s",
+            "--status",
+            action="store_true",
+            help="Print the task counts of the local task index and exit",
+        )
+        self.parser.add_argument(
+            "-P",
+            "--profile",
+            type=str,
+            metavar="DIR",
+            help="Run once under cProfile and tracemalloc, write the reports to DIR and exit",
+        )
         self.parser.add_argument(
             "-d",
             "--debug",
             action="store_true",
             help="Enable debug logging level",
         )
+        self.parser.add_argument(
+            "-j",
+            "--json-logs",
+            action="store_true",
+            help="Write the log as one JSON object per line",
+        )
 
     def parse_args(self, input: bool = False):
         """
@@ -114,74 +173,48 @@ class CommandLineParser:
 
         @param input: If True use user inputted args, else use command line args
         """
-        # Create the config parser
-        config = configparser.ConfigParser()
-        config.read(ini_path)
-
         if not input:
             self.args = self.parser.parse_args()
 
-        logging.basicConfig(
-            level=logging.DEBUG if self.args.debug else logging.INFO,
-            format="%(asctime)s - %(levelname)s - %(message)s",
-            datefmt="%d.%m.%Y %H:%M:%S",
+        configure_logging(
+            logging.DEBUG if self.args.debug else logging.INFO, self.args.json_logs
         )
 
+        if self.args.api is not None or self.args.webhook_secret is not None:
+            # Imported only when needed, loading a keyring backend is slow
+            import keyring
         if self.args.api is not None:
             logging.info("API token saved to keyring")
             keyring.set_password("system", "todoist-api-token", self.args.api)
-        if self.args.p1 is not None:
-            config.set("USER", "p1_tasks", str(self.args.p1))
-            with open(ini_path, "w") as configfile:
-                config.write(configfile)
-        if self.args.p2 is not None:
-            config.set("USER", "p2_tasks", str(self.args.p2))
-            with open(ini_path, "w") as configfile:
-                config.write(configfile)
-        if self.args.p3 is not None:
-            config.set("USER", "p3_tasks", str(self.args.p3))
-            with open(ini_path, "w") as configfile:
-                config.write(configfile)
-        if self.args.hh is not None:
-            config.set("USER", "run_hour", str(self.args.hh))
-            with open(ini_path, "w") as configfile:
-                config.write(configfile)
-        if self.args.mm is not None:
-            config.set("USER", "run_minute", str(self.args.mm))
-            with open(ini_path, "w") as configfile:
-                config.write(configfile)
-        if self.args.nd is not None:
-            config.set("USER", "number_of_tasks", str(self.args.nd))
-            with open(ini_path, "w") as configfile:
-                config.write(configfile)
-        if self.args.du is not None:
-            config.set("USER", "task_duration", str(self.args.du))
-            with open(ini_path, "w") as configfile:
-                config.write(configfile)
-        if self.args.parent is not None:
-            config.set("USER", "parent_id", str(self.args.parent))
-            with open(ini_path, "w") as configfile:
-                config.write(configfile)
-        if self.args.reset:
-            config.set("USER", "p1_tasks", config.get("DEFAULT", "p1_tasks"))
-            config.set("USER", "p2_tasks", config.get("DEFAULT", "p2_tasks"))
-            config.set("USER", "p3_tasks", config.get("DEFAULT", "p3_tasks"))
-            config.set("USER", "run_hour", config.get("DEFAULT", "run_hour"))
-            config.set("USER", "run_minute", config.get("DEFAULT", "run_minute"))
-            config.set(
-                "USER", "number_of_tasks", config.get("DEFAULT", "number_of_tasks")
+        if self.args.webhook_secret is not None:
+            logging.info("Webhook secret saved to keyring")
+            keyring.set_password(
+                "system", "todoist-webhook-secret", self.args.webhook_secret
             )
-            config.set("USER", "task_duration", config.get("DEFAULT", "task_duration"))
-            with open(ini_path, "w") as configfile:
-                config.write(configfile)
+
+        # Every change is validated and written at once
+        settings_file = SettingsFile(ini_path)
+        for arg, key in SETTING_ARGS.items():
+            value = getattr(self.args, arg)
+            if value is not None:
+                settings_file.set(key, value)
+        if self.args.reset:
+            settings_file.reset()
+        try:
+            settings_file.save()
+        except ValueError as error:
+            logging.error(f"Invalid configuration, nothing saved: {error}")
+            sys.exit(1)
+        if self.args.reset:
             logging.info("Reset")
             sys.exit(0)
 
     def user_input(self):
         """
-        Prompts the user for input if no command line arguments are provided
+        Prompts the user for input if no command line arguments are provided,
+        never in --once or --status mode so a timer cannot block on a prompt
         """
-        if self.args.api is None:
+        if self.args.api is None and not (self.args.once or self.args.status):
             arg = input("Configure? (y/n): ")
             if arg == "y":
                 self.args.reset = input("Reset? (y/n): ")
@@ -203,7 +236,13 @@ class CommandLineParser:
                     )
                     arg = input("Move oldest P1 task to new parent project? (y/n): ")
                     if arg == "y":
-                        self.args.p = input("Enter parent project id: ")
+                        self.args.parent = input("Enter parent project id: ")
+                    arg = input("Listen for Todoist webhooks? (y/n): ")
+                    if arg == "y":
+                        self.args.webhook = input("Enter webhook port: ")
+                        self.args.webhook_secret = input(
+                            "Enter Todoist app client secret: "
+                        )
                     self.args.debug = input("Debug logging? (y/n): ")
                     if self.args.debug == "y":
                         self.args.debug = True
@@ -0,0 +1,127 @@
+import datetime
+import json
+import logging
+import os
+from types import SimpleNamespace
+from planner import Change
+
+# Get the directory of the script file
+script_dir = os.path.dirname(os.path.realpath(__file__))
+# Join the script directory with the relative path to the journal file
+journal_path = os.path.join(script_dir, "journal.jsonl")
+
+
+class Journal:
+    """
+    Write-ahead journal of the task mutations of a run
+
+    The planned changes are written before any of them is applied and every
+    applied change is appended when it completes. If the process dies in the
+    middle of a run, the next run replays only the unfinished changes instead
+    of fetching and planning again.
+    """
+
+    def __init__(self, path: str = journal_path):
+        """!
+        Initializes a Journal object
+
+        @param path The journal file, one JSON record per line
+        """
+        self.path = path
+
+    def begin(self, plan: list, today: datetime.date | None = None) -> None:
+        """!
+        Record the planned changes of a run before they are applied
+
+        The journal is written atomically and synced to disk, so a run either has
+        a complete journal or none.
+
+        @param plan The list of planned changes
+        @param today The date the plan was made for, defaults to the current date
+        """
+        if today is None:
+            today = datetime.date.today()
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as journal_file:
+            journal_file.write(json.dumps({"date": today.isoformat()}) + "\n")
+            for change in plan:
+                record = {
+                    "id": change.id,
+                    "task_id": change.task.id,
+                    "content": change.task.content,
+                    "kind": change.kind,
+                    "fields": change.fields,
+                    "message": change.message,
+                }
+                journal_file.write(json.dumps(record) + "\n")
+            journal_file.flush()
+            os.fsync(journal_file.fileno())
+        os.replace(tmp_path, self.path)
+
+    def complete(self, change_ids) -> None:
+        """!
+        Record applied changes
+
+        The record is flushed to the OS, which keeps it if the process is killed.
+
+        @param change_ids The ids of the applied changes
+        """
+        change_ids = list(change_ids)
+        if not change_ids or not os.path.exists(self.path):
+            return
+        with open(self.path, "a") as journal_file:
+            journal_file.write(json.dumps({"done": change_ids}) + "\n")
+
+    def pending(self, today: datetime.date | None = None) -> list:
+        """!
+        Get the unfinished changes of an interrupted run
+
+        A journal from another day is discarded, the due strings of its changes
+        are relative to the day it was planned. A truncated last line is ignored.
+
+        @param today The current date, defaults to the current date
+
+        @return The list of changes that were planned but not applied, in order
+        """
+        if today is None:
+            today = datetime.date.today()
+        try:
+            with open(self.path, "r") as journal_file:
+                lines = journal_file.read().splitlines()
+        except FileNotFoundError:
+            return []
+        records = []
+        for line in lines:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                logging.debug("Skipping unreadable journal line: %s", line)
+        if not records or records[0].get("date") != today.isoformat():
+            logging.info("Discarding the journal of an earlier run")
+            self.finish()
+            return []
+
+        changes = {}
+        for record in records[1:]:
+            if "done" in record:
+                for change_id in record["done"]:
+                    changes.pop(change_id, None)
+            elif "id" in record:
+                task = SimpleNamespace(id=record["task_id"], content=record["content"])
+                changes[record["id"]] = Change(
+                    task,
+                    record["kind"],
+                    record["fields"],
+                    record["message"],
+                    record["id"],
+                )
+        return list(changes.values())
+
+    def finish(self) -> None:
+        """
+        Remove the journal once every change of the run has been handled
+        """
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,144 @@
+import logging
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ParallelExecutor:
+    """
+    Collects task mutations and sends them as parallel REST calls
+    """
+
+    def __init__(self, api: object, max_workers: int = 8):
+        """!
+        Initializes a ParallelExecutor object
+
+        @param api The TodoistAPI object used for the calls
+        @param max_workers The maximum number of concurrent calls
+        """
+        self.api = api
+        self.max_workers = max(1, max_workers)
+        self.operations = []
+
+    def queue(
+        self,
+        task: object,
+        method: str,
+        message: str | None,
+        operation_id: str | None = None,
+        **kwargs,
+    ) -> str:
+        """!
+        Queue a call of a TodoistAPI method for a task
+
+        @param task The task the call is for
+        @param method The name of the TodoistAPI method
+        @param message Logged when the call succeeds
+        @param operation_id The id of the operation, generated if not given
+        @param kwargs The method keyword arguments
+
+        @return The id of the queued operation
+        """
+        operation_id = operation_id or str(uuid.uuid4())
+        self.operations.append((operation_id, task, method, message, kwargs))
+        return operation_id
+
+    def update_task(
+        self,
+        task: object,
+        message: str | None = None,
+        operation_id: str | None = None,
+        **fields,
+    ) -> str:
+        """!
+        Queue an update_task call
+
+        @param task The task to update
+        @param message Logged when the update succeeds
+        @param operation_id The id of the operation, generated if not given
+        @param fields The update_task() keyword arguments
+
+        @return The id of the queued operation
+        """
+        return self.queue(
+            task, "update_task", message, operation_id, task_id=task.id, **fields
+        )
+
+    def move_task(
+        self,
+        task: object,
+        project_id: str,
+        message: str | None = None,
+        operation_id: str | None = None,
+    ) -> str:
+        """!
+        Queue a move_task call
+
+        @param task The task to move
+        @param project_id The project to move the task to
+        @param message Logged when the move succeeds
+        @param operation_id The id of the operation, generated if not given
+
+        @return The id of the queued operation
+        """
+        return self.queue(
+            task,
+            "move_task",
+            message,
+            operation_id,
+            task_id=task.id,
+            project_id=project_id,
+        )
+
+    def run_operations(self, operations: list) -> list:
+        """!
+        Run the operations of one task in order
+
+        The operations after a failed one are not run and fail with the same error.
+
+        @param operations The operations of the task
+
+        @return The list of (operation, error) results, error is None on success
+        """
+        results = []
+        error = None
+        for operation in operations:
+            _, _, method, _, kwargs = operation
+            if error is None:
+                try:
+                    getattr(self.api, method)(**kwargs)
+                except Exception as call_error:
+                    error = call_error
+            results.append((operation, error))
+        return results
+
+    def flush(self) -> dict:
+        """!
+        Run all queued operations in a thread pool
+
+        Operations of the same task run in order in one worker. Results are logged
+        in the order the operations were queued.
+
+        @return Dict of failed operation ids and their errors
+        """
+        operations, self.operations = self.operations, []
+        by_task = {}
+        for operation in operations:
+            by_task.setdefault(operation[1].id, []).append(operation)
+
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for task_results in executor.map(self.run_operations, by_task.values()):
+                for operation, error in task_results:
+                    results[operation[0]] = error
+
+        failed = {}
+        for operation_id, task, method, message, _ in operations:
+            error = results[operation_id]
+            if error is None:
+                if message:
+                    logging.info(message)
+            else:
+                failed[operation_id] = error
+                logging.error(f"{method} failed for {task.content}: {error}")
+        logging.debug("Ran %d operations, %d failed", len(operations), len(failed))
+        return failed
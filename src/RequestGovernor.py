@@ -0,0 +1,241 @@
+import email.utils
+import logging
+import random
+import re
+import threading
+import time
+from metrics import endpoint_name, registry
+
+# Todoist allows 1000 requests per user in 15 minutes
+DEFAULT_LIMIT = 1000
+DEFAULT_WINDOW = 15 * 60
+# Requests that can be sent at once before the refill rate applies
+DEFAULT_BURST = 50
+DEFAULT_MAX_RETRIES = 5
+# Transient statuses worth retrying, 429 is handled with Retry-After
+RETRY_STATUSES = {500, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+# POST endpoints that are safe to repeat: updates and moves set absolute values
+# and Sync API commands are deduplicated by their uuid
+IDEMPOTENT_POSTS = re.compile(r"/api/v1/(sync|tasks/[^/]+(/move)?)$")
+
+
+def parse_retry_after(value: str | None, now: float | None = None) -> float | None:
+    """!
+    Parse a Retry-After header
+
+    @param value The header value, seconds or an HTTP date
+    @param now The current Unix time, defaults to time.time()
+
+    @return The number of seconds to wait, or None if the header is missing or
+    invalid
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at - (time.time() if now is None else now))
+
+
+def is_idempotent(method: str, url: str) -> bool:
+    """!
+    Check if a request can be repeated without changing the result
+
+    @param method The HTTP method
+    @param url The request URL
+
+    @return True if the request can be retried
+    """
+    if method.upper() in IDEMPOTENT_METHODS:
+        return True
+    path = str(url).split("?", 1)[0]
+    return method.upper() == "POST" and IDEMPOTENT_POSTS.search(path) is not None
+
+
+class TokenBucket:
+    """
+    Token bucket that blocks callers to stay under a request quota
+    """
+
+    def __init__(self, rate: float, capacity: float, clock=time.monotonic):
+        """!
+        Initializes a TokenBucket object, full
+
+        @param rate Tokens added per second
+        @param capacity The maximum number of tokens
+        @param clock Returns the current time in seconds
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.updated = clock()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """!
+        Take a token if one is available
+
+        @return 0 if a token was taken, else the seconds to wait before trying
+        again
+        """
+        with self.lock:
+            now = self.clock()
+            if now < self.paused_until:
+                return self.paused_until - now
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self, sleep=time.sleep) -> None:
+        """!
+        Block until a token is available and take it
+
+        @param sleep The function used to wait
+        """
+        while True:
+            wait = self.reserve()
+            if wait <= 0:
+                return
+            sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """!
+        Stop handing out tokens for a while, e.g. after a 429 response
+
+        @param seconds The number of seconds to pause
+        """
+        with self.lock:
+            self.paused_until = max(self.paused_until, self.clock() + seconds)
+            self.tokens = 0
+
+
+class RequestGovernor:
+    """
+    Throttles requests with a token bucket per API token and retries throttled
+    and transient failures of idempotent requests
+    """
+
+    def __init__(
+        self,
+        limit: int = DEFAULT_LIMIT,
+        window: float = DEFAULT_WINDOW,
+        burst: int = DEFAULT_BURST,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        backoff: float = 0.5,
+        max_backoff: float = 60,
+        sleep=time.sleep,
+        clock=time.monotonic,
+    ):
+        """!
+        Initializes a RequestGovernor object
+
+        @param limit The number of requests allowed per window
+        @param window The quota window in seconds
+        @param burst The number of requests that can be sent at once, the refill
+        rate is lowered so that no window exceeds the limit
+        @param max_retries The number of retries of a failed request
+        @param backoff The first backoff in seconds, doubled on every retry
+        @param max_backoff The longest backoff in seconds
+        @param sleep The function used to wait
+        @param clock Returns the current time in seconds
+        """
+        self.burst = min(burst, limit)
+        self.rate = max(limit - self.burst, 1) / window
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.sleep = sleep
+        self.clock = clock
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def bucket(self, key: str | None) -> TokenBucket:
+        """!
+        Get the token bucket of an API token, the quota is per user
+
+        @param key The Authorization header of the request
+
+        @return The token bucket
+        """
+        with self.lock:
+            if key not in self.buckets:
+                self.buckets[key] = TokenBucket(self.rate, self.burst, self.clock)
+            return self.buckets[key]
+
+    def backoff_delay(self, attempt: int) -> float:
+        """!
+        Get the exponential backoff with full jitter of a retry
+
+        @param attempt The number of the retry, starting from 0
+
+        @return The number of seconds to wait
+        """
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2**attempt))
+
+    def send(self, method: str, url: str, key: str | None, send, errors: tuple):
+        """!
+        Send a request within the quota and retry it if it fails transiently
+
+        @param method The HTTP method
+        @param url The request URL
+        @param key The Authorization header of the request
+        @param send Sends the request and returns a response with status_code,
+        headers and close()
+        @param errors The connection and timeout exceptions of the client
+
+        @return The final response
+
+        @raises Exception: The last connection error if every attempt failed
+        """
+        bucket = self.bucket(key)
+        retry = is_idempotent(method, url)
+        attempt = 0
+        while True:
+            bucket.acquire(self.sleep)
+            start = time.perf_counter()
+            try:
+                response = send()
+            except errors as error:
+                registry.record_request(method, url, None, time.perf_counter() - start)
+                if not retry or attempt >= self.max_retries:
+                    raise
+                delay = self.backoff_delay(attempt)
+                logging.warning(
+                    f"{method} {url} failed: {error}, retry in {delay:.1f}s"
+                )
+            else:
+                status = response.status_code
+                registry.record_request(
+                    method, url, status, time.perf_counter() - start
+                )
+                if status == 429:
+                    delay = parse_retry_after(response.headers.get("Retry-After"))
+                    delay = self.backoff_delay(attempt) if delay is None else delay
+                    # Every request of the user waits, not only this one
+                    bucket.pause(delay)
+                elif status in RETRY_STATUSES and retry:
+                    delay = self.backoff_delay(attempt)
+                else:
+                    return response
+                if attempt >= self.max_retries or (status == 429 and not retry):
+                    return response
+                logging.warning(
+                    f"{method} {url} returned {status}, retry in {delay:.1f}s"
+                )
+                response.close()
+            registry.inc("api_retries_total", endpoint=endpoint_name(method, url))
+            attempt += 1
+            self.sleep(delay)
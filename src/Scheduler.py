@@ -0,0 +1,219 @@
+import datetime
+import json
+import logging
+import os
+import time
+
+# Get the directory of the script file
+script_dir = os.path.dirname(os.path.realpath(__file__))
+# Join the script directory with the relative path to the scheduler state file
+state_path = os.path.join(script_dir, "scheduler_state.json")
+
+
+def daily_expression(hour: int, minute: int) -> str:
+    """!
+    Get the cron expression for a daily run time
+
+    @param hour The hour to run, 24 hour format
+    @param minute The minute to run
+
+    @return The cron expression
+    """
+    return f"{int(minute)} {int(hour)} * * *"
+
+
+def parse_field(field: str, low: int, high: int) -> set:
+    """!
+    Parse one field of a cron expression
+
+    Supports *, single values, ranges a-b, steps */n and a-b/n, and lists.
+
+    @param field The field to parse
+    @param low The lowest allowed value
+    @param high The highest allowed value
+
+    @return The set of matching values
+
+    @raises ValueError: If the field is invalid
+    """
+    values = set()
+    for part in field.split(","):
+        step = 1
+        if "/" in part:
+            part, step_str = part.split("/", 1)
+            step = int(step_str)
+            if step < 1:
+                raise ValueError(f"Invalid cron step: {step_str}")
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start_str, end_str = part.split("-", 1)
+            start, end = int(start_str), int(end_str)
+        else:
+            start = int(part)
+            end = high if step > 1 else start
+        if start < low or end > high or start > end:
+            raise ValueError(f"Invalid cron field: {field}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronExpression:
+    """
+    A five field cron expression: minute hour day-of-month month day-of-week
+    """
+
+    def __init__(self, expression: str):
+        """!
+        Initializes a CronExpression object
+
+        @param expression The cron expression, day-of-week 0 and 7 are Sunday
+
+        @raises ValueError: If the expression is invalid
+        """
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Invalid cron expression: {expression}")
+        self.expression = expression
+        self.minutes = sorted(parse_field(fields[0], 0, 59))
+        self.hours = sorted(parse_field(fields[1], 0, 23))
+        self.days = parse_field(fields[2], 1, 31)
+        self.months = parse_field(fields[3], 1, 12)
+        # Python weekday() is Monday=0, cron is Sunday=0
+        self.weekdays = {(day - 1) % 7 for day in parse_field(fields[4], 0, 7)}
+        self.any_day = fields[2] == "*"
+        self.any_weekday = fields[4] == "*"
+
+    def matches_day(self, day: datetime.date) -> bool:
+        """!
+        Check if the expression runs on a day
+
+        As in cron, day-of-month and day-of-week match if either matches when
+        both are restricted.
+
+        @param day The day to check
+
+        @return True if the expression runs on the day
+        """
+        if day.month not in self.months:
+            return False
+        day_match = day.day in self.days
+        weekday_match = day.weekday() in self.weekdays
+        if self.any_day or self.any_weekday:
+            return day_match and weekday_match
+        return day_match or weekday_match
+
+    def next_after(self, after: datetime.datetime) -> datetime.datetime:
+        """!
+        Get the first fire time after a time
+
+        @param after The time to start from
+
+        @return The next fire time, at minute resolution
+
+        @raises ValueError: If the expression never fires
+        """
+        start = after.replace(second=0, microsecond=0) + datetime.timedelta(minutes=1)
+        day = start.date()
+        # Every valid day-of-month/month combination occurs within 8 years
+        for _ in range(366 * 8):
+            if self.matches_day(day):
+                for hour in self.hours:
+                    for minute in self.minutes:
+                        fire = datetime.datetime.combine(
+                            day, datetime.time(hour, minute)
+                        )
+                        if fire >= start:
+                            return fire
+            day += datetime.timedelta(days=1)
+        raise ValueError(f"Cron expression never fires: {self.expression}")
+
+
+class Scheduler:
+    """
+    Runs a job at the fire times of cron expressions and catches up missed runs
+    """
+
+    def __init__(self, expressions: list, path: str = state_path, max_sleep=300):
+        """!
+        Initializes a Scheduler object and loads the last successful run
+
+        @param expressions The cron expressions to run at
+        @param path The file the last successful run is persisted to
+        @param max_sleep The longest single sleep in seconds, the wall clock is
+        checked again after it to notice suspends and clock changes
+        """
+        self.expressions = [CronExpression(expression) for expression in expressions]
+        self.path = path
+        self.max_sleep = max_sleep
+        self.last_run = None
+        try:
+            with open(self.path, "r") as state_file:
+                self.last_run = datetime.datetime.fromisoformat(
+                    json.load(state_file)["last_run"]
+                )
+        except FileNotFoundError:
+            pass
+        except (ValueError, KeyError, TypeError) as error:
+            logging.error(f"Discarding unreadable scheduler state: {error}")
+
+    def next_fire(self, now: datetime.datetime) -> datetime.datetime:
+        """!
+        Get the next time the job should run
+
+        A fire time missed since the last successful run is returned as is, so
+        it is run immediately.
+
+        @param now The current time
+
+        @return The next fire time
+        """
+        after = self.last_run if self.last_run is not None else now
+        return min(expression.next_after(after) for expression in self.expressions)
+
+    def mark_run(self, run_time: datetime.datetime) -> None:
+        """!
+        Persist a successful run
+
+        @param run_time The time of the run
+        """
+        self.last_run = run_time
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as state_file:
+            json.dump({"last_run": run_time.isoformat()}, state_file)
+        os.replace(tmp_path, self.path)
+
+    def sleep_until(self, fire: datetime.datetime) -> None:
+        """!
+        Sleep until a wall clock time
+
+        @param fire The time to wake up at
+        """
+        while True:
+            remaining = (fire - datetime.datetime.now()).total_seconds()
+            if remaining <= 0:
+                return
+            time.sleep(min(remaining, self.max_sleep))
+
+    def run_forever(self, job) -> None:
+        """!
+        Run the job at every fire time
+
+        @param job The function to run, a raised exception marks the run failed
+        """
+        while True:
+            now = datetime.datetime.now()
+            fire = self.next_fire(now)
+            if fire <= now:
+                logging.info(f"Catching up the run missed at {fire:%d.%m.%Y %H:%M}")
+            else:
+                logging.info(f"Next run at {fire:%d.%m.%Y %H:%M}")
+                self.sleep_until(fire)
+            try:
+                job()
+            except Exception as error:
+                logging.error(f"Run failed: {error}")
+                # Retry at the next fire time
+                self.last_run = datetime.datetime.now()
+                continue
+            self.mark_run(datetime.datetime.now())
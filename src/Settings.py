@@ -0,0 +1,331 @@
+import configparser
+import dataclasses
+import logging
+import os
+import re
+from dataclasses import dataclass
+from Scheduler import CronExpression
+
+# Get the directory of the script file
+script_dir = os.path.dirname(os.path.realpath(__file__))
+# Join the script directory with the relative path to the ini file
+ini_path = os.path.join(script_dir, "config.ini")
+
+WRITE_MODES = {"sync", "rest", "parallel"}
+# Inclusive bounds of the numeric settings, the other numbers must not be negative
+BOUNDS = {
+    "run_hour": (0, 23),
+    "run_minute": (0, 59),
+    "webhook_port": (0, 65535),
+    "metrics_port": (0, 65535),
+    "max_workers": (1, None),
+    "account_workers": (1, None),
+    "pool_size": (1, None),
+    "rate_limit": (1, None),
+}
+RUN_TIME = re.compile(r"(\d{1,2}):(\d{2})")
+
+
+def parse_value(name: str, kind: type, value: str):
+    """!
+    Convert a config value to the type of its setting
+
+    @param name The setting name
+    @param kind The type of the setting: int, float, bool, str or str | None
+    @param value The value from the config file
+
+    @return The typed value
+
+    @raises ValueError: If the value is invalid for the setting
+    """
+    value = value.strip()
+    if kind is bool:
+        if value.lower() not in configparser.ConfigParser.BOOLEAN_STATES:
+            raise ValueError(f"{name} must be True or False, not {value!r}")
+        return configparser.ConfigParser.BOOLEAN_STATES[value.lower()]
+    if kind in (int, float):
+        try:
+            number = kind(value)
+        except ValueError:
+            raise ValueError(f"{name} must be a {kind.__name__}, not {value!r}")
+        low, high = BOUNDS.get(name, (0, None))
+        if number < low or (high is not None and number > high):
+            raise ValueError(f"{name} must be between {low} and {high}, not {value}")
+        return number
+    if kind == str | None:
+        return None if value in ("", "None") else value
+    return value
+
+
+def parse_quotas(value: str) -> dict:
+    """!
+    Parse per-project and per-label priority quotas
+
+    The quotas are separated by ";", each one is a project id or a label prefixed
+    with @, a colon and comma separated maximums, e.g.
+    "2203306141: p1=2, p2=4; @home: p1=1".
+
+    @param value The quotas setting
+
+    @return Dict of project id or @label to a dict of UI priority level to the
+    maximum number of tasks
+
+    @raises ValueError: If a quota is invalid
+    """
+    quotas = {}
+    for quota in value.split(";"):
+        if not quota.strip():
+            continue
+        key, _, limits = quota.partition(":")
+        key = key.strip()
+        if not key or not limits.strip() or key == "@":
+            raise ValueError(f"quotas must look like 'project_id: p1=2', not {quota!r}")
+        for limit in limits.split(","):
+            level, _, maximum = limit.strip().partition("=")
+            if level.strip().lower() not in ("p1", "p2", "p3"):
+                raise ValueError(f"quota levels must be p1, p2 or p3, not {level!r}")
+            if not maximum.strip().isdigit():
+                raise ValueError(f"quota maximums must be numbers, not {maximum!r}")
+            quotas.setdefault(key, {})[int(level.strip()[1])] = int(maximum)
+    return quotas
+
+
+def parse_run_times(value: str) -> list:
+    """!
+    Parse the extra daily run times
+
+    @param value The run_times setting, comma separated HH:MM times
+
+    @return The list of (hour, minute) tuples
+
+    @raises ValueError: If a run time is invalid
+    """
+    run_times = []
+    for run_time in value.split(","):
+        run_time = run_time.strip()
+        if not run_time:
+            continue
+        match = RUN_TIME.fullmatch(run_time)
+        if match is None or int(match[1]) > 23 or int(match[2]) > 59:
+            raise ValueError(f"run_times must be HH:MM times, not {run_time!r}")
+        run_times.append((int(match[1]), int(match[2])))
+    return run_times
+
+
+def parse_schedule(value: str) -> list:
+    """!
+    Parse the cron expressions of the schedule
+
+    @param value The schedule setting, cron expressions separated by ";"
+
+    @return The list of cron expressions
+
+    @raises ValueError: If an expression is invalid
+    """
+    expressions = [expression.strip() for expression in value.split(";")]
+    expressions = [expression for expression in expressions if expression]
+    for expression in expressions:
+        try:
+            CronExpression(expression)
+        except ValueError as error:
+            raise ValueError(f"schedule: {error}")
+    return expressions
+
+
+@dataclass(frozen=True)
+class Settings:
+    """
+    Typed and validated settings of one config section
+    """
+
+    p1_tasks: int = 5
+    p2_tasks: int = 10
+    p3_tasks: int = 15
+    run_hour: int = 3
+    run_minute: int = 0
+    number_of_tasks: int = 1
+    task_duration: int = 30
+    parent_id: str | None = None
+    write_mode: str = "sync"
+    incremental_sync: bool = True
+    max_workers: int = 8
+    run_times: str = ""
+    schedule: str = ""
+    webhook_port: int = 0
+    webhook_host: str = "127.0.0.1"
+    webhook_debounce: float = 10
+    account_workers: int = 4
+    pool_size: int = 10
+    http_timeout: float = 30
+    proxy: str = ""
+    update_check_hours: float = 24
+    metrics_file: str = ""
+    metrics_port: int = 0
+    metrics_host: str = "127.0.0.1"
+    rate_limit: int = 1000
+    max_retries: int = 5
+    quotas: str = ""
+    task_index: bool = False
+
+    @classmethod
+    def from_section(cls, section) -> "Settings":
+        """!
+        Parse and validate a config section, missing keys get their defaults
+
+        @param section The config section, or any mapping of names to strings
+
+        @return The settings
+
+        @raises ValueError: If a value is invalid or a key is not a setting
+        """
+        names = {setting.name for setting in dataclasses.fields(cls)}
+        unknown = sorted(set(section) - names)
+        if unknown:
+            raise ValueError(f"unknown settings: {', '.join(unknown)}")
+        values = {}
+        for setting in dataclasses.fields(cls):
+            if setting.name in section:
+                values[setting.name] = parse_value(
+                    setting.name, setting.type, section[setting.name]
+                )
+        if values.get("write_mode", cls.write_mode) not in WRITE_MODES:
+            raise ValueError(
+                f"write_mode must be one of {', '.join(sorted(WRITE_MODES))}"
+            )
+        parse_quotas(values.get("quotas", cls.quotas))
+        parse_run_times(values.get("run_times", cls.run_times))
+        parse_schedule(values.get("schedule", cls.schedule))
+        return cls(**values)
+
+    def targets(self) -> dict:
+        """!
+        Get the desired number of tasks of each priority level
+
+        @return Dict of UI priority level (1-3) to desired number of tasks
+        """
+        return {1: self.p1_tasks, 2: self.p2_tasks, 3: self.p3_tasks}
+
+    def quota_limits(self) -> dict:
+        """!
+        Get the per-project and per-label priority quotas
+
+        @return Dict of project id or @label to a dict of UI priority level to
+        the maximum number of tasks
+        """
+        return parse_quotas(self.quotas)
+
+
+class SettingsFile:
+    """
+    Settings of an ini file, parsed once and reloaded only when the file changes
+    """
+
+    def __init__(self, path: str = ini_path, defaults: dict | None = None):
+        """!
+        Initializes a SettingsFile object and loads the file
+
+        @param path The ini file
+        @param defaults Values the sections of the file fall back to
+        """
+        self.path = path
+        self.defaults = defaults
+        self.mtime = None
+        self.sections = {}
+        self.changed = False
+        self.load()
+
+    def load(self) -> None:
+        """
+        Reads the file, a missing file has no sections
+        """
+        self.config = configparser.ConfigParser(defaults=self.defaults)
+        try:
+            self.mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            self.mtime = None
+        self.config.read(self.path)
+        self.sections = {}
+        self.changed = False
+
+    def reload(self) -> bool:
+        """!
+        Read the file again if it was modified since it was loaded
+
+        Unsaved changes are kept until the file is modified by someone else.
+
+        @return True if the file was read again
+        """
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self.mtime:
+            return False
+        logging.info(f"Reloading {self.path}")
+        self.load()
+        return True
+
+    def get(self, section: str = "USER") -> Settings:
+        """!
+        Get the settings of a section, reloading the file if it changed
+
+        @param section The section name
+
+        @return The settings
+
+        @raises ValueError: If a value of the section is invalid
+        """
+        self.reload()
+        return self.parse(section)
+
+    def set(self, key: str, value, section: str = "USER") -> None:
+        """!
+        Change a value, written by save()
+
+        @param key The setting name
+        @param value The new value
+        @param section The section name
+        """
+        self.config.set(section, key, str(value))
+        self.sections.pop(section, None)
+        self.changed = True
+
+    def reset(self, section: str = "USER") -> None:
+        """!
+        Reset every setting of a section to the DEFAULT section
+
+        @param section The section name
+        """
+        for key, value in self.config.defaults().items():
+            self.set(key, value, section)
+
+    def save(self) -> None:
+        """!
+        Validate and write the changed values in one atomic write
+
+        @raises ValueError: If a changed value is invalid, nothing is written
+        """
+        if not self.changed:
+            return
+        for section in self.config.sections():
+            self.parse(section)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as configfile:
+            self.config.write(configfile)
+        os.replace(tmp_path, self.path)
+        self.mtime = os.stat(self.path).st_mtime_ns
+        self.changed = False
+
+    def parse(self, section: str) -> Settings:
+        """!
+        Get the settings of a section as loaded, parsed once per load
+
+        @param section The section name
+
+        @return The settings
+
+        @raises ValueError: If a value of the section is invalid
+        """
+        if section not in self.sections:
+            self.sections[section] = Settings.from_section(self.config[section])
+        return self.sections[section]
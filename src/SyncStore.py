@@ -0,0 +1,149 @@
+import logging
+import os
+import requests
+from SyncWriter import sync_request
+from TaskRecord import TaskRecord, from_columns, pack_snapshot, unpack_snapshot
+
+# Get the directory of the script file
+script_dir = os.path.dirname(os.path.realpath(__file__))
+# Join the script directory with the relative path to the sync state file
+state_path = os.path.join(script_dir, "sync_state.bin")
+
+
+def is_invalid_sync_token(error: Exception) -> bool:
+    """!
+    Check if a Sync API error means the sync token was rejected
+
+    The API answers an unknown or expired sync token with HTTP 400 and names
+    the sync_token argument in the error body.
+
+    @param error The error raised by the sync request
+
+    @return True if the sync token was rejected
+    """
+    if not isinstance(error, requests.HTTPError) or error.response is None:
+        return False
+    if error.response.status_code != 400:
+        return False
+    try:
+        body = error.response.json()
+    except ValueError:
+        return "sync_token" in error.response.text
+    extra = body.get("error_extra") or {}
+    return extra.get("argument") == "sync_token" or "sync_token" in str(
+        body.get("error", "")
+    )
+
+
+class SyncStore:
+    """
+    Local task store kept up to date with incremental Sync API requests
+
+    Only the fields the script reads are kept, as TaskRecord objects, and the
+    store is persisted as a binary columnar snapshot.
+    """
+
+    def __init__(self, token: str, path: str = state_path, index: object = None):
+        """!
+        Initializes a SyncStore object and loads the persisted state
+
+        @param token The Todoist API token
+        @param path The file the sync token and the tasks are persisted to
+        @param index The TaskIndex to mirror the tasks to, if any. It is rebuilt
+        if it is not at the sync token of the store.
+        """
+        self.token = token
+        self.path = path
+        self.index = index
+        self.sync_token = "*"
+        self.items = {}
+        self.load()
+        if index is not None and index.sync_token() != self.sync_token:
+            logging.info("Rebuilding the task index")
+            index.update(self.sync_token, self.items.values(), full=True)
+
+    def load(self) -> None:
+        """
+        Loads the sync token and the tasks from disk, starts from scratch if the
+        file is missing or unreadable
+        """
+        try:
+            with open(self.path, "rb") as state_file:
+                self.sync_token, columns = unpack_snapshot(state_file.read())
+            self.items = {record.id: record for record in from_columns(columns)}
+        except FileNotFoundError:
+            pass
+        except ValueError as error:
+            logging.error(f"Discarding unreadable sync state: {error}")
+            self.sync_token = "*"
+            self.items = {}
+
+    def save(self) -> None:
+        """
+        Persists the sync token and the tasks atomically
+        """
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as state_file:
+            state_file.write(pack_snapshot(self.sync_token, self.items.values()))
+        os.replace(tmp_path, self.path)
+
+    def apply(self, response: dict) -> None:
+        """!
+        Applies a Sync API response to the local store
+
+        Only the changed tasks are read into records.
+
+        @param response The decoded Sync API response
+        """
+        full = bool(response.get("full_sync"))
+        if full:
+            self.items = {}
+        changed, removed = [], []
+        for item in response.get("items", []):
+            if item.get("is_deleted") or item.get("checked"):
+                self.items.pop(item["id"], None)
+                removed.append(item["id"])
+            else:
+                record = TaskRecord.from_item(item)
+                self.items[item["id"]] = record
+                changed.append(record)
+        self.sync_token = response["sync_token"]
+        if self.index is not None:
+            self.index.update(self.sync_token, changed, removed, full)
+
+    def sync(self) -> list:
+        """!
+        Fetches the changes since the last sync and applies them
+
+        Falls back to a full sync if the sync token is rejected.
+
+        @return The list of all active tasks
+
+        @raises requests.RequestException: If the request fails for any other
+        reason
+        """
+        data = {"resource_types": ["items"]}
+        try:
+            response = sync_request(self.token, {**data, "sync_token": self.sync_token})
+        except requests.HTTPError as error:
+            if self.sync_token == "*" or not is_invalid_sync_token(error):
+                raise
+            logging.info(f"Sync token rejected, running a full sync: {error}")
+            response = sync_request(self.token, {**data, "sync_token": "*"})
+        logging.debug(
+            "%s sync: %d changed tasks",
+            "Full" if response.get("full_sync") else "Incremental",
+            len(response.get("items", [])),
+        )
+        self.apply(response)
+        self.save()
+        return self.tasks()
+
+    def tasks(self) -> list:
+        """!
+        Get the tasks in the local store
+
+        @return The list of copies of the active tasks, so applied changes do not
+        modify the store before the server confirms them
+        """
+        return [record.copy() for record in self.items.values()]
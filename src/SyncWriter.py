@@ -0,0 +1,176 @@
+import json
+import logging
+import uuid
+import http_session
+
+SYNC_URL = "https://api.todoist.com/api/v1/sync"
+# The Sync API accepts at most 100 commands per request
+MAX_COMMANDS = 100
+
+
+def sync_request(token: str, data: dict) -> dict:
+    """!
+    Send a request to the Todoist Sync API
+
+    @param token The Todoist API token
+    @param data The form fields to send, lists and dicts are JSON encoded
+
+    @return The decoded JSON response
+
+    @raises requests.HTTPError: If the API request fails
+    """
+    form = {
+        key: json.dumps(value) if isinstance(value, (list, dict)) else value
+        for key, value in data.items()
+    }
+    response = http_session.get_session().post(
+        SYNC_URL,
+        headers={"Authorization": f"Bearer {token}"},
+        data=form,
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+def item_update_args(task_id: str, fields: dict) -> dict:
+    """!
+    Convert REST style update_task() arguments to Sync API item_update arguments
+
+    @param task_id The id of the task to update
+    @param fields The update_task() keyword arguments
+
+    @return The item_update command arguments
+    """
+    args = {"id": task_id}
+    for key, value in fields.items():
+        if key == "due_string":
+            args["due"] = {"string": value}
+        elif key == "duration":
+            args["duration"] = {
+                "amount": value,
+                "unit": fields.get("duration_unit", "minute"),
+            }
+        elif key != "duration_unit":
+            args[key] = value
+    return args
+
+
+class SyncWriter:
+    """
+    Collects task mutations as Sync API commands and sends them in batches
+    """
+
+    def __init__(self, token: str, chunk_size: int = MAX_COMMANDS):
+        """!
+        Initializes a SyncWriter object
+
+        @param token The Todoist API token
+        @param chunk_size The maximum number of commands sent in one request
+        """
+        self.token = token
+        self.chunk_size = min(chunk_size, MAX_COMMANDS)
+        self.commands = []
+        self.messages = {}
+
+    def queue(
+        self,
+        command_type: str,
+        args: dict,
+        message: str | None = None,
+        operation_id: str | None = None,
+    ) -> str:
+        """!
+        Queue a Sync API command
+
+        @param command_type The command type, e.g. item_update
+        @param args The command arguments
+        @param message Logged when the command succeeds
+        @param operation_id The command uuid, generated if not given. The API
+        ignores a command whose uuid it has already applied.
+
+        @return The uuid of the queued command
+        """
+        command_uuid = operation_id or str(uuid.uuid4())
+        self.commands.append({"type": command_type, "uuid": command_uuid, "args": args})
+        self.messages[command_uuid] = message
+        return command_uuid
+
+    def update_task(
+        self,
+        task: object,
+        message: str | None = None,
+        operation_id: str | None = None,
+        **fields,
+    ) -> str:
+        """!
+        Queue an item_update command for a task
+
+        @param task The task to update
+        @param message Logged when the update succeeds
+        @param operation_id The command uuid, generated if not given
+        @param fields The update_task() keyword arguments
+
+        @return The uuid of the queued command
+        """
+        return self.queue(
+            "item_update", item_update_args(task.id, fields), message, operation_id
+        )
+
+    def move_task(
+        self,
+        task: object,
+        project_id: str,
+        message: str | None = None,
+        operation_id: str | None = None,
+    ) -> str:
+        """!
+        Queue an item_move command for a task
+
+        @param task The task to move
+        @param project_id The project to move the task to
+        @param message Logged when the move succeeds
+        @param operation_id The command uuid, generated if not given
+
+        @return The uuid of the queued command
+        """
+        return self.queue(
+            "item_move",
+            {"id": task.id, "project_id": project_id},
+            message,
+            operation_id,
+        )
+
+    def flush(self) -> dict:
+        """!
+        Send all queued commands in chunks
+
+        A failed chunk or command is logged and does not stop the other chunks.
+
+        @return Dict of failed command uuids and their errors
+        """
+        failed = {}
+        commands, self.commands = self.commands, []
+        for i in range(0, len(commands), self.chunk_size):
+            chunk = commands[i : i + self.chunk_size]
+            try:
+                response = sync_request(self.token, {"commands": chunk})
+            except Exception as error:
+                logging.error(f"Sync API request failed: {error}")
+                for command in chunk:
+                    failed[command["uuid"]] = str(error)
+                continue
+            sync_status = response.get("sync_status", {})
+            for command in chunk:
+                status = sync_status.get(command["uuid"])
+                message = self.messages.get(command["uuid"])
+                if status == "ok":
+                    if message:
+                        logging.info(message)
+                else:
+                    failed[command["uuid"]] = status
+                    logging.error(
+                        f"{command['type']} failed for task {command['args']['id']}: {status}"
+                    )
+        self.messages = {}
+        logging.debug("Sent %d commands, %d failed", len(commands), len(failed))
+        return failed
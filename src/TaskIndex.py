@@ -0,0 +1,282 @@
+import datetime
+import json
+import os
+import sqlite3
+import threading
+from TaskRecord import TaskRecord, Duration, Due
+
+# Get the directory of the script file
+script_dir = os.path.dirname(os.path.realpath(__file__))
+# Join the script directory with the relative path to the index file
+index_path = os.path.join(script_dir, "tasks.sqlite3")
+
+# Version of the tables, an index of another version is rebuilt by the next sync
+SCHEMA_VERSION = 2
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY,
+    content TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    duration_amount INTEGER,
+    duration_unit TEXT,
+    -- Minutes for today's capacity, NULL without duration, 0 for days
+    minutes INTEGER,
+    -- Local due date as a proleptic Gregorian ordinal
+    due INTEGER,
+    -- Local due time in minutes after midnight, NULL without a time
+    due_time INTEGER,
+    project_id TEXT,
+    -- JSON list of label names
+    labels TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tasks_by_priority ON tasks (priority, created_at);
+CREATE INDEX IF NOT EXISTS tasks_by_due ON tasks (due, created_at);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+COLUMNS = (
+    "id, content, priority, created_at, duration_amount, duration_unit, minutes, "
+    "due, due_time, project_id, labels"
+)
+# Conditions of due_on() for tasks with a duration, without one or all
+DURATION_CONDITIONS = {
+    True: " AND minutes IS NOT NULL",
+    False: " AND minutes IS NULL",
+    None: "",
+}
+
+
+def task_row(record: TaskRecord) -> tuple:
+    """!
+    Convert a record to a row of the tasks table
+
+    @param record The record
+
+    @return The row in the order of COLUMNS
+    """
+    duration = record.duration
+    due = record.due
+    minutes = None
+    if duration is not None:
+        minutes = duration.amount if duration.unit == "minute" else 0
+    return (
+        record.id,
+        record.content,
+        record.priority,
+        record.created_at,
+        duration and duration.amount,
+        duration and duration.unit,
+        minutes,
+        due.date.toordinal() if due else None,
+        due.time.hour * 60 + due.time.minute if due and due.time else None,
+        record.project_id,
+        json.dumps(record.labels),
+    )
+
+
+def task_record(row: tuple) -> TaskRecord:
+    """!
+    Convert a row of the tasks table to a record
+
+    @param row The row in the order of COLUMNS
+
+    @return The record
+    """
+    (
+        task_id,
+        content,
+        priority,
+        created_at,
+        amount,
+        unit,
+        _,
+        due,
+        due_time,
+        project,
+        labels,
+    ) = row
+    if due is not None:
+        due = Due(
+            datetime.date.fromordinal(due),
+            datetime.time(*divmod(due_time, 60)) if due_time is not None else None,
+        )
+    return TaskRecord(
+        task_id,
+        content,
+        priority,
+        created_at,
+        Duration(amount, unit) if unit is not None else None,
+        due,
+        project,
+        tuple(json.loads(labels)),
+    )
+
+
+class TaskIndex:
+    """
+    SQLite index of the synced tasks for selections by priority and due date
+
+    The database is in WAL mode, so readers in other processes, e.g. --status,
+    see the last committed sync while the daemon writes the next one.
+    """
+
+    def __init__(self, path: str = index_path, readonly: bool = False):
+        """!
+        Initializes a TaskIndex object and opens the database
+
+        @param path The database file
+        @param readonly Open an existing database for reading only
+
+        @raises sqlite3.Error: If the database cannot be opened
+        """
+        self.path = path
+        if readonly:
+            self.connection = sqlite3.connect(
+                f"file:{path}?mode=ro", uri=True, check_same_thread=False
+            )
+        else:
+            self.connection = sqlite3.connect(path, check_same_thread=False)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+            if version != SCHEMA_VERSION:
+                # Without a sync token the store rebuilds the tasks
+                self.connection.executescript(
+                    "DROP TABLE IF EXISTS tasks; DROP TABLE IF EXISTS meta;"
+                )
+                self.connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            self.connection.executescript(SCHEMA)
+        self.connection.execute("PRAGMA busy_timeout=5000")
+        # The connection is shared by the run and the webhook threads
+        self.lock = threading.Lock()
+
+    def close(self) -> None:
+        """
+        Closes the database
+        """
+        with self.lock:
+            self.connection.close()
+
+    def sync_token(self) -> str | None:
+        """!
+        Get the sync token of the indexed tasks
+
+        @return The sync token or None if nothing was indexed
+        """
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT value FROM meta WHERE key = 'sync_token'"
+            ).fetchone()
+        return row and row[0]
+
+    def update(self, sync_token: str, changed, removed=(), full: bool = False) -> None:
+        """!
+        Write the changes of a sync in one transaction
+
+        @param sync_token The sync token after the changes
+        @param changed An iterable of new or changed records
+        @param removed An iterable of ids of completed or deleted tasks
+        @param full Replace every task with the changed ones
+        """
+        with self.lock, self.connection:
+            if full:
+                self.connection.execute("DELETE FROM tasks")
+            self.connection.executemany(
+                "DELETE FROM tasks WHERE id = ?", ((task_id,) for task_id in removed)
+            )
+            self.connection.executemany(
+                f"INSERT OR REPLACE INTO tasks ({COLUMNS}) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                map(task_row, changed),
+            )
+            self.connection.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('sync_token', ?)",
+                (sync_token,),
+            )
+
+    def query(self, sql: str, parameters: tuple = ()) -> list:
+        """!
+        Run a query on the database
+
+        @param sql The query
+        @param parameters The query parameters
+
+        @return The list of rows
+        """
+        with self.lock:
+            return self.connection.execute(sql, parameters).fetchall()
+
+    def oldest(self, priority: int, k: int) -> list:
+        """!
+        Get the k oldest tasks of a priority
+
+        @param priority The API priority, 4 is the highest
+        @param k The number of tasks to get
+
+        @return The k oldest tasks, oldest to newest
+        """
+        rows = self.query(
+            f"SELECT {COLUMNS} FROM tasks WHERE priority = ? "
+            "ORDER BY created_at LIMIT ?",
+            (priority, max(k, 0)),
+        )
+        return [task_record(row) for row in rows]
+
+    def counts(self) -> dict:
+        """!
+        Count the tasks of every priority
+
+        @return Dict of API priority (1-4) to the number of tasks
+        """
+        counts = {priority: 0 for priority in (1, 2, 3, 4)}
+        for priority, count in self.query(
+            "SELECT priority, COUNT(*) FROM tasks GROUP BY priority"
+        ):
+            counts[priority] = count
+        return counts
+
+    def due_on(self, date: datetime.date, with_duration: bool | None = None) -> list:
+        """!
+        Get the tasks due on a date
+
+        @param date The due date
+        @param with_duration True for the tasks with a duration, False for the
+        tasks without one, None for all
+
+        @return The tasks, oldest to newest
+        """
+        rows = self.query(
+            f"SELECT {COLUMNS} FROM tasks WHERE due = ?"
+            f"{DURATION_CONDITIONS[with_duration]} ORDER BY created_at",
+            (date.toordinal(),),
+        )
+        return [task_record(row) for row in rows]
+
+    def count_due(self, date: datetime.date, with_duration: bool | None = None) -> int:
+        """!
+        Count the tasks due on a date without reading them
+
+        @param date The due date
+        @param with_duration True for the tasks with a duration, False for the
+        tasks without one, None for all
+
+        @return The number of tasks
+        """
+        return self.query(
+            "SELECT COUNT(*) FROM tasks WHERE due = ?"
+            f"{DURATION_CONDITIONS[with_duration]}",
+            (date.toordinal(),),
+        )[0][0]
+
+    def minutes_due(self, date: datetime.date) -> int:
+        """!
+        Sum the minutes of the tasks due on a date
+
+        @param date The due date
+
+        @return The total duration in minutes
+        """
+        return self.query(
+            "SELECT COALESCE(SUM(minutes), 0) FROM tasks WHERE due = ?",
+            (date.toordinal(),),
+        )[0][0]
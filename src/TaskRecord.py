@@ -0,0 +1,332 @@
+import datetime
+import marshal
+from array import array
+from typing import NamedTuple
+
+# Version of the binary snapshot layout, a snapshot of another version is discarded
+FORMAT_VERSION = 2
+# Duration unit codes of the binary snapshot, other units are stored as days,
+# the script schedules neither by minutes
+UNIT_CODES = {None: 0, "minute": 1, "day": 2}
+UNITS = {code: unit for unit, code in UNIT_CODES.items()}
+# Columns stored as packed numbers and their array type codes
+NUMBER_COLUMNS = {
+    "priority": "b",
+    "created_at": "d",
+    "duration": "i",
+    "duration_unit": "B",
+    "due": "i",
+    "due_time": "h",
+}
+
+
+class Duration(NamedTuple):
+    """
+    Duration of a task, hours are converted to minutes when a task is read
+    """
+
+    amount: int
+    unit: str
+
+
+class Due(NamedTuple):
+    """
+    Local due date of a task and its local time of day, None for all day tasks
+    """
+
+    date: datetime.date
+    time: datetime.time | None = None
+
+
+def epoch_seconds(value) -> float:
+    """!
+    Convert a creation time to seconds since the epoch
+
+    @param value An ISO 8601 string or a datetime, naive times are UTC
+
+    @return The seconds since the epoch
+    """
+    if isinstance(value, str):
+        value = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    return value.timestamp()
+
+
+def local_due(value) -> Due:
+    """!
+    Get the local due date and time of a due date
+
+    @param value An ISO 8601 string, a date or a datetime
+
+    @return The due date, in local time if the value has a time zone
+    """
+    if isinstance(value, str):
+        if "T" not in value:
+            return Due(datetime.date.fromisoformat(value))
+        value = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if isinstance(value, datetime.datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone()
+        # Todoist schedules by the minute
+        return Due(value.date(), value.time().replace(second=0, microsecond=0))
+    return Due(value)
+
+
+def normalize_duration(amount: int, unit: str) -> Duration:
+    """!
+    Normalize a duration to minutes, units other than minutes and hours are kept
+
+    @param amount The amount
+    @param unit The unit
+
+    @return The duration
+    """
+    if unit == "hour":
+        return Duration(amount * 60, "minute")
+    return Duration(amount, unit)
+
+
+class TaskRecord:
+    """
+    The fields of a task the script reads, without the rest of the API object
+    """
+
+    __slots__ = (
+        "id",
+        "content",
+        "priority",
+        "created_at",
+        "duration",
+        "due",
+        "project_id",
+        "labels",
+    )
+
+    def __init__(
+        self,
+        id: str,
+        content: str,
+        priority: int,
+        created_at: float,
+        duration: Duration | None = None,
+        due: Due | None = None,
+        project_id: str | None = None,
+        labels: tuple = (),
+    ):
+        """!
+        Initializes a TaskRecord object
+
+        @param id The task id
+        @param content The task content
+        @param priority The API priority, 4 is the highest
+        @param created_at The creation time in seconds since the epoch
+        @param duration The duration or None
+        @param due The local due date and time or None
+        @param project_id The project id
+        @param labels The tuple of label names
+        """
+        self.id = id
+        self.content = content
+        self.priority = priority
+        self.created_at = created_at
+        self.duration = duration
+        self.due = due
+        self.project_id = project_id
+        self.labels = labels
+
+    @classmethod
+    def from_item(cls, item: dict) -> "TaskRecord":
+        """!
+        Read a task of the Todoist API v1, as returned by the Sync API
+
+        @param item The task dict
+
+        @return The record
+        """
+        duration = item.get("duration")
+        due = item.get("due")
+        return cls(
+            item["id"],
+            item["content"],
+            item["priority"],
+            epoch_seconds(item.get("added_at") or item["created_at"]),
+            duration and normalize_duration(duration["amount"], duration["unit"]),
+            due and local_due(due["date"]),
+            item.get("project_id"),
+            tuple(item.get("labels") or ()),
+        )
+
+    @classmethod
+    def from_task(cls, task: object) -> "TaskRecord":
+        """!
+        Read a task of the Todoist API Python client
+
+        @param task The Task object
+
+        @return The record
+        """
+        duration = task.duration
+        due = task.due
+        return cls(
+            task.id,
+            task.content,
+            task.priority,
+            epoch_seconds(task.created_at),
+            duration and normalize_duration(duration.amount, duration.unit),
+            due and local_due(due.date),
+            task.project_id,
+            tuple(task.labels or ()),
+        )
+
+    def copy(self) -> "TaskRecord":
+        """!
+        Copy the record, so a planned change does not modify the original
+
+        @return The copy
+        """
+        return TaskRecord(*(getattr(self, name) for name in self.__slots__))
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, TaskRecord):
+            return NotImplemented
+        return all(
+            getattr(self, name) == getattr(other, name) for name in self.__slots__
+        )
+
+    def __repr__(self) -> str:
+        return f"TaskRecord({self.id!r}, {self.content!r}, priority={self.priority})"
+
+
+def to_columns(records) -> dict:
+    """!
+    Store records as columns, one list or number array per field
+
+    @param records An iterable of records
+
+    @return Dict of field name to its column
+    """
+    records = list(records)
+    durations = [record.duration or Duration(-1, None) for record in records]
+    times = [record.due and record.due.time for record in records]
+    return {
+        "id": [record.id for record in records],
+        "content": [record.content for record in records],
+        "project_id": [record.project_id for record in records],
+        "labels": [record.labels for record in records],
+        "priority": array("b", [record.priority for record in records]),
+        "created_at": array("d", [record.created_at for record in records]),
+        "duration": array("i", [duration.amount for duration in durations]),
+        "duration_unit": array(
+            "B", [UNIT_CODES.get(d.unit, UNIT_CODES["day"]) for d in durations]
+        ),
+        "due": array(
+            "i",
+            [record.due.date.toordinal() if record.due else 0 for record in records],
+        ),
+        # Minutes after midnight, -1 without a time
+        "due_time": array(
+            "h", [time.hour * 60 + time.minute if time else -1 for time in times]
+        ),
+    }
+
+
+def from_columns(columns: dict) -> list:
+    """!
+    Read records from columns
+
+    @param columns Dict of field name to its column, see to_columns()
+
+    @return The list of records
+    """
+    records = []
+    for (
+        task_id,
+        content,
+        priority,
+        created_at,
+        amount,
+        unit,
+        due,
+        due_time,
+        project_id,
+        labels,
+    ) in zip(
+        columns["id"],
+        columns["content"],
+        columns["priority"],
+        columns["created_at"],
+        columns["duration"],
+        columns["duration_unit"],
+        columns["due"],
+        columns["due_time"],
+        columns["project_id"],
+        columns["labels"],
+    ):
+        records.append(
+            TaskRecord(
+                task_id,
+                content,
+                priority,
+                created_at,
+                Duration(amount, UNITS[unit]) if unit else None,
+                (
+                    Due(
+                        datetime.date.fromordinal(due),
+                        (
+                            datetime.time(*divmod(due_time, 60))
+                            if due_time >= 0
+                            else None
+                        ),
+                    )
+                    if due
+                    else None
+                ),
+                project_id,
+                labels,
+            )
+        )
+    return records
+
+
+def pack_snapshot(sync_token: str, records) -> bytes:
+    """!
+    Encode records in the binary snapshot format
+
+    The columns are written with marshal and the numbers as packed arrays, so a
+    snapshot is read without parsing any text.
+
+    @param sync_token The sync token of the records
+    @param records An iterable of records
+
+    @return The snapshot
+    """
+    columns = to_columns(records)
+    for name in NUMBER_COLUMNS:
+        columns[name] = columns[name].tobytes()
+    return marshal.dumps((FORMAT_VERSION, sync_token, columns))
+
+
+def unpack_snapshot(data: bytes) -> tuple:
+    """!
+    Decode a binary snapshot
+
+    @param data The snapshot
+
+    @return The sync token and the columns, see to_columns()
+
+    @raises ValueError: If the snapshot is unreadable or of another version
+    """
+    try:
+        version, sync_token, columns = marshal.loads(data)
+        if version != FORMAT_VERSION:
+            raise ValueError(f"unsupported snapshot version {version}")
+        for name, typecode in NUMBER_COLUMNS.items():
+            packed = array(typecode)
+            packed.frombytes(columns[name])
+            columns[name] = packed
+    except (EOFError, TypeError, KeyError) as error:
+        raise ValueError(f"unreadable snapshot: {error}")
+    if any(len(column) != len(columns["id"]) for column in columns.values()):
+        raise ValueError("unreadable snapshot: columns of different lengths")
+    return sync_token, columns
@@ -0,0 +1,189 @@
+import datetime
+import json
+import logging
+import os
+import re
+import threading
+import http_session
+from metrics import registry
+
+RELEASES_URL = "https://api.github.com/repos/ussaka/todoist-prioritizer/releases"
+# Get the directory of the script file
+script_dir = os.path.dirname(os.path.realpath(__file__))
+# Join the script directory with the relative path to the update state file
+state_path = os.path.join(script_dir, "update_state.json")
+
+
+def parse_version(tag: str) -> tuple:
+    """!
+    Parse a release tag into a comparable version
+
+    Missing components are zero and a pre-release (e.g. v1.3.0-rc1) sorts
+    before the release.
+
+    @param tag The release tag, e.g. v1.2.0
+
+    @return The version as a tuple
+
+    @raises ValueError: If the tag is not a version
+    """
+    match = re.fullmatch(r"v?(\d+(?:\.\d+)*)([-+.]?.*)", tag.strip())
+    if match is None:
+        raise ValueError(f"Invalid version: {tag}")
+    numbers = [int(part) for part in match.group(1).split(".")]
+    numbers += [0] * (3 - len(numbers))
+    is_release = not match.group(2) or match.group(2).startswith("+")
+    return (*numbers, int(is_release))
+
+
+class UpdateChecker:
+    """
+    Checks the repository releases for a newer version
+
+    The result is cached on disk with the response ETag, so the releases are
+    fetched at most once per interval and only downloaded again when changed.
+    """
+
+    def __init__(
+        self,
+        current_version: str,
+        path: str | None = state_path,
+        interval: float = 24 * 60 * 60,
+    ):
+        """!
+        Initializes an UpdateChecker object and loads the cached result
+
+        @param current_version The version of the running script
+        @param path The file the result is cached to, None keeps it in memory
+        @param interval The minimum number of seconds between requests
+        """
+        self.current_version = current_version
+        self.path = path
+        self.interval = interval
+        self.checked_at = None
+        self.etag = None
+        self.latest = None
+        self.thread = None
+        self.load()
+
+    def load(self) -> None:
+        """
+        Loads the cached result, a missing or unreadable cache is ignored
+        """
+        if self.path is None:
+            return
+        try:
+            with open(self.path, "r") as state_file:
+                state = json.load(state_file)
+            self.checked_at = datetime.datetime.fromisoformat(state["checked_at"])
+            self.etag = state["etag"]
+            self.latest = state["latest"]
+        except FileNotFoundError:
+            pass
+        except (ValueError, KeyError, TypeError) as error:
+            logging.error(f"Discarding unreadable update state: {error}")
+            self.checked_at = self.etag = self.latest = None
+
+    def save(self) -> None:
+        """
+        Persists the result atomically
+        """
+        if self.path is None:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as state_file:
+            json.dump(
+                {
+                    "checked_at": self.checked_at.isoformat(),
+                    "etag": self.etag,
+                    "latest": self.latest,
+                },
+                state_file,
+            )
+        os.replace(tmp_path, self.path)
+
+    def is_due(self, now: datetime.datetime) -> bool:
+        """!
+        Check if the interval since the last successful check has passed
+
+        @param now The current time
+
+        @return True if the releases should be requested
+        """
+        if self.checked_at is None:
+            return True
+        return (now - self.checked_at).total_seconds() >= self.interval
+
+    def check(self, force: bool = False):
+        """!
+        Request the releases unless the cached result is recent, then report it
+
+        @param force Request the releases even if the cached result is recent
+
+        @return Response, or None if the cached result was used
+        """
+        now = datetime.datetime.now()
+        if not force and not self.is_due(now):
+            self.report()
+            return None
+        headers = {"Accept": "application/vnd.github+json"}
+        if self.etag is not None and self.latest is not None:
+            headers["If-None-Match"] = self.etag
+        response = http_session.get_session().get(
+            RELEASES_URL, params={"per_page": 1}, headers=headers
+        )
+        if response.status_code == 304:
+            logging.debug("Releases not modified since the last check")
+        elif response.status_code == 200:
+            releases = response.json()
+            self.latest = None
+            if releases:
+                self.latest = {
+                    key: releases[0][key] for key in ("tag_name", "body", "html_url")
+                }
+            self.etag = response.headers.get("ETag")
+        else:
+            logging.error(
+                "Update checker failed, failed to fetch releases from the repository"
+            )
+            return response
+        self.checked_at = now
+        self.save()
+        self.report()
+        return response
+
+    def report(self) -> None:
+        """
+        Log the latest release if it is newer than the running version
+        """
+        if self.latest is None:
+            return
+        latest_version = self.latest["tag_name"]
+        try:
+            newer = parse_version(latest_version) > parse_version(self.current_version)
+        except ValueError as error:
+            logging.debug("Cannot compare versions: %s", error)
+            return
+        if newer:
+            logging.info(f"New version available: {latest_version}")
+            logging.info(f"Changelog: {self.latest['body']}")
+            logging.info(f"Download link: {self.latest['html_url']}\n")
+
+    def run(self) -> None:
+        """
+        Run a check, errors are logged
+        """
+        try:
+            with registry.phase("update_check"):
+                self.check()
+        except Exception as error:
+            logging.error(f"Checking for updates failed: {error}")
+
+    def start(self) -> None:
+        """
+        Run a check in a background thread, unless one is already running
+        """
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
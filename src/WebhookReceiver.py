@@ -0,0 +1,163 @@
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Events that can leave a priority level below its target
+WEBHOOK_EVENTS = {"item:completed", "item:deleted", "item:updated"}
+
+
+def affected_levels(payload: dict) -> set:
+    """!
+    Get the UI priority levels whose task count a webhook event can lower
+
+    @param payload The decoded webhook payload
+
+    @return The set of affected UI priority levels, 1-4
+    """
+    if payload.get("event_name") not in WEBHOOK_EVENTS:
+        return set()
+    priority = payload.get("event_data", {}).get("priority")
+    if payload["event_name"] != "item:updated":
+        return {5 - priority} if priority in {1, 2, 3, 4} else set()
+    # An update only matters if it changed the priority
+    old_item = (payload.get("event_data_extra") or {}).get("old_item") or {}
+    old_priority = old_item.get("priority")
+    if old_priority == priority:
+        return set()
+    return {5 - p for p in (priority, old_priority) if p in {1, 2, 3, 4}}
+
+
+def verify_signature(secret: str, body: bytes, signature: str | None) -> bool:
+    """!
+    Verify the X-Todoist-Hmac-SHA256 header of a webhook request
+
+    @param secret The client secret of the Todoist app
+    @param body The raw request body
+    @param signature The header value
+
+    @return True if the signature matches
+    """
+    if signature is None:
+        return False
+    digest = hmac.new(secret.encode(), body, hashlib.sha256).digest()
+    return hmac.compare_digest(base64.b64encode(digest).decode(), signature)
+
+
+class WebhookReceiver:
+    """
+    Receives Todoist webhook events and reports the affected priority levels
+    after the events have settled
+    """
+
+    def __init__(
+        self,
+        callback,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        secret: str | None = None,
+        debounce: float = 10,
+    ):
+        """!
+        Initializes a WebhookReceiver object and binds the HTTP server
+
+        @param callback Called with the set of affected levels after the debounce
+        @param host The host to listen on
+        @param port The port to listen on, 0 picks a free port
+        @param secret The client secret used to verify requests, None disables it
+        @param debounce Seconds without new events before the callback is called
+        """
+        self.callback = callback
+        self.secret = secret
+        self.debounce = debounce
+        self.pending = set()
+        self.timer = None
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self.make_handler())
+        self.port = self.server.server_address[1]
+        self.thread = None
+
+    def make_handler(self):
+        """!
+        Create the request handler class bound to this receiver
+
+        @return The request handler class
+        """
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if receiver.secret is not None and not verify_signature(
+                    receiver.secret, body, self.headers.get("X-Todoist-Hmac-SHA256")
+                ):
+                    self.send_response(403)
+                    self.end_headers()
+                    return
+                try:
+                    payload = json.loads(body)
+                except ValueError:
+                    self.send_response(400)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.end_headers()
+                receiver.receive(payload)
+
+            def log_message(self, format, *args):
+                logging.debug("Webhook: " + format, *args)
+
+        return Handler
+
+    def receive(self, payload: dict) -> None:
+        """!
+        Record a webhook event and restart the debounce timer
+
+        @param payload The decoded webhook payload
+        """
+        levels = affected_levels(payload)
+        logging.debug("Webhook %s: levels %s", payload.get("event_name"), levels)
+        if not levels:
+            return
+        with self.lock:
+            self.pending |= levels
+            if self.timer is not None:
+                self.timer.cancel()
+            self.timer = threading.Timer(self.debounce, self.fire)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def fire(self) -> None:
+        """
+        Pass the pending levels to the callback
+        """
+        with self.lock:
+            levels, self.pending = self.pending, set()
+            self.timer = None
+        if levels:
+            try:
+                self.callback(levels)
+            except Exception as error:
+                logging.error(f"Webhook reprioritization failed: {error}")
+
+    def start(self) -> None:
+        """
+        Serve requests in a background thread
+        """
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        logging.info(f"Listening for Todoist webhooks on port {self.port}")
+
+    def stop(self) -> None:
+        """
+        Stop serving requests and drop pending events
+        """
+        self.server.shutdown()
+        self.server.server_close()
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+            self.pending = set()
@@ -0,0 +1,236 @@
+import threading
+import time
+import urllib.request
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from metrics import registry
+from RequestGovernor import RequestGovernor
+
+# Connections kept open per host
+DEFAULT_POOL_SIZE = 10
+# Seconds to wait for a connection or a response
+DEFAULT_TIMEOUT = 30
+ACCEPT_ENCODING = "gzip, deflate"
+TODOIST_URL = "https://api.todoist.com"
+
+settings = {
+    "pool_size": DEFAULT_POOL_SIZE,
+    "timeout": DEFAULT_TIMEOUT,
+    "proxy": None,
+    "api_url": None,
+}
+# Throttles and retries the Todoist API requests of all sessions and clients
+governor = RequestGovernor()
+shared_session = None
+session_lock = threading.Lock()
+
+
+def rewrite_url(url: str) -> str:
+    """!
+    Redirect a Todoist API URL to the configured API URL
+
+    @param url The request URL
+
+    @return The URL to send the request to
+    """
+    if settings["api_url"] is not None and url.startswith(TODOIST_URL):
+        return settings["api_url"].rstrip("/") + url[len(TODOIST_URL) :]
+    return url
+
+
+def is_todoist_url(url: str) -> bool:
+    """!
+    Check if a URL, after rewrite_url(), points to the Todoist API
+
+    @param url The request URL
+
+    @return True if the request counts against the Todoist quota
+    """
+    url = str(url)
+    if settings["api_url"] is not None and url.startswith(settings["api_url"]):
+        return True
+    return url.startswith(TODOIST_URL)
+
+
+def send_request(method: str, url: str, key: str | None, send, errors: tuple):
+    """!
+    Send a request through the governor if it goes to the Todoist API, record
+    its metrics otherwise
+
+    @param method The HTTP method
+    @param url The request URL
+    @param key The Authorization header of the request
+    @param send Sends the request and returns the response
+    @param errors The connection and timeout exceptions of the client
+
+    @return The response
+    """
+    if is_todoist_url(url):
+        return governor.send(method, url, key, send, errors)
+    start = time.perf_counter()
+    status = None
+    try:
+        response = send()
+        status = response.status_code
+        return response
+    finally:
+        registry.record_request(method, url, status, time.perf_counter() - start)
+
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """
+    HTTPAdapter that applies a default timeout to requests sent without one,
+    redirects Todoist API requests to the configured API URL and sends them
+    through the governor
+    """
+
+    def __init__(self, timeout: float, **kwargs):
+        """!
+        Initializes a TimeoutHTTPAdapter object
+
+        @param timeout The default timeout in seconds
+        @param kwargs Passed to HTTPAdapter
+        """
+        self.timeout = timeout
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        request.url = rewrite_url(request.url)
+        return send_request(
+            request.method,
+            request.url,
+            request.headers.get("Authorization"),
+            lambda: HTTPAdapter.send(self, request, **kwargs),
+            (requests.ConnectionError, requests.Timeout),
+        )
+
+
+class MeteredTransport(httpx.HTTPTransport):
+    """
+    httpx transport that sends Todoist API requests through the governor
+    """
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        return send_request(
+            request.method,
+            str(request.url),
+            request.headers.get("Authorization"),
+            lambda: super(MeteredTransport, self).handle_request(request),
+            (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError),
+        )
+
+
+def configure(
+    pool_size: int = DEFAULT_POOL_SIZE,
+    timeout: float = DEFAULT_TIMEOUT,
+    proxy: str | None = None,
+    api_url: str | None = None,
+    rate_limit: int = 1000,
+    max_retries: int = 5,
+) -> None:
+    """!
+    Configure the HTTP connections of the script
+
+    Applies to sessions and clients created after the call, the shared session
+    is recreated on next use.
+
+    @param pool_size The number of connections kept open per host
+    @param timeout The default timeout in seconds
+    @param proxy The proxy URL for all requests, None uses the environment
+    @param api_url The URL to send Todoist API requests to instead, e.g. a local
+    mock server
+    @param rate_limit The number of Todoist API requests allowed per user in 15
+    minutes
+    @param max_retries The number of retries of a throttled or failed request
+    """
+    global shared_session, governor
+    governor = RequestGovernor(rate_limit, max_retries=max_retries)
+    settings.update(
+        pool_size=max(1, pool_size),
+        timeout=timeout,
+        proxy=proxy or None,
+        api_url=api_url or None,
+    )
+    with session_lock:
+        if shared_session is not None:
+            shared_session.close()
+        shared_session = None
+
+
+def new_session() -> requests.Session:
+    """!
+    Create a requests session with pooled keep-alive connections
+
+    @return The session
+    """
+    session = requests.Session()
+    adapter = TimeoutHTTPAdapter(
+        settings["timeout"],
+        pool_connections=settings["pool_size"],
+        pool_maxsize=settings["pool_size"],
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["Accept-Encoding"] = ACCEPT_ENCODING
+    if settings["proxy"] is not None:
+        session.proxies = {"http": settings["proxy"], "https": settings["proxy"]}
+    return session
+
+
+def get_session() -> requests.Session:
+    """!
+    Get the requests session shared by the whole script
+
+    @return The shared session
+    """
+    global shared_session
+    with session_lock:
+        if shared_session is None:
+            shared_session = new_session()
+        return shared_session
+
+
+def new_client() -> httpx.Client:
+    """!
+    Create an httpx client with pooled keep-alive connections for TodoistAPI
+
+    TodoistAPI closes its client when used as a context manager, so every
+    TodoistAPI object gets its own client.
+
+    @return The client
+    """
+    event_hooks = {}
+    if settings["api_url"] is not None:
+        event_hooks["request"] = [rewrite_request]
+    proxy = settings["proxy"]
+    if proxy is None:
+        # A custom transport does not read the proxy environment variables
+        proxy = urllib.request.getproxies().get("https")
+    transport = MeteredTransport(
+        limits=httpx.Limits(
+            max_connections=settings["pool_size"],
+            max_keepalive_connections=settings["pool_size"],
+        ),
+        proxy=proxy,
+    )
+    return httpx.Client(
+        transport=transport,
+        timeout=settings["timeout"],
+        headers={"Accept-Encoding": ACCEPT_ENCODING},
+        event_hooks=event_hooks,
+    )
+
+
+def rewrite_request(request: httpx.Request) -> None:
+    """!
+    httpx request hook that redirects Todoist API requests to the API URL
+
+    @param request The request about to be sent
+    """
+    url = rewrite_url(str(request.url))
+    if url != str(request.url):
+        request.url = httpx.URL(url)
+        request.headers["Host"] = request.url.netloc.decode()
@@ -0,0 +1,94 @@
+import atexit
+import datetime
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+
+TEXT_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+DATE_FORMAT = "%d.%m.%Y %H:%M:%S"
+
+# The listener writing the records of the current configuration, when set
+listener = None
+# The handler that queues the records of the root logger, when set
+queue_handler = None
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats records as one JSON object per line
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        """!
+        Format a record as JSON
+
+        @param record The record
+
+        @return The JSON line with the time, level, logger, thread and message
+        """
+        entry = {
+            "time": datetime.datetime.fromtimestamp(record.created)
+            .astimezone()
+            .isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def configure_logging(
+    level: int = logging.INFO, json_output: bool = False, stream=None
+) -> logging.handlers.QueueListener:
+    """!
+    Send the records of the root logger through a queue to a background writer
+
+    Records below the level are dropped before their message is formatted, and
+    the listener thread does the formatting of the line and the I/O. Calling
+    the function again replaces the previous configuration.
+
+    @param level The logging level
+    @param json_output Write one JSON object per line instead of text
+    @param stream The stream to write to, defaults to stderr
+
+    @return The started listener, stopped at exit to flush the queue
+    """
+    global listener, queue_handler
+    stop_logging()
+    handler = logging.StreamHandler(stream or sys.stderr)
+    if json_output:
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT, DATE_FORMAT))
+
+    records = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(records)
+    listener = logging.handlers.QueueListener(records, handler)
+    root = logging.getLogger()
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+    listener.start()
+    return listener
+
+
+def stop_logging() -> None:
+    """
+    Write the queued records and remove the handler added by configure_logging()
+    """
+    global listener, queue_handler
+    if queue_handler is not None:
+        logging.getLogger().removeHandler(queue_handler)
+        queue_handler = None
+    if listener is not None:
+        listener.stop()
+        listener = None
+
+
+atexit.register(stop_logging)
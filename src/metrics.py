@@ -0,0 +1,304 @@
+import contextlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PREFIX = "todoist_prioritizer_"
+# Upper bounds in seconds of the API latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+# Path segments that are ids, e.g. /api/v1/tasks/6X7rM8997g3RQmvh
+ID_SEGMENT = re.compile(r"^(?=.*\d)[A-Za-z0-9_-]{6,}$")
+
+HELP = {
+    "api_requests_total": "API requests by endpoint and status",
+    "api_request_duration_seconds": "API request latency by endpoint",
+    "api_errors_total": "Failed API requests by endpoint",
+    "api_retries_total": "Retried API requests by endpoint",
+    "phase_duration_seconds": "Duration of each phase of the last run",
+    "run_duration_seconds": "Duration of the last run",
+    "last_run_timestamp_seconds": "End time of the last run",
+    "runs_total": "Runs by result",
+    "tasks_changed": "Tasks changed by the last run",
+    "tasks_changed_total": "Tasks changed by all runs",
+    "write_failures_total": "Task changes the API rejected",
+    "writes_saved": "API writes the last plan saved by merging and dropping changes",
+}
+
+
+def endpoint_name(method: str, url: str) -> str:
+    """!
+    Get the endpoint of a request with ids replaced by {id}
+
+    @param method The HTTP method
+    @param url The request URL
+
+    @return The endpoint, e.g. POST /api/v1/tasks/{id}/move
+    """
+    path = re.sub(r"^[a-z]+://[^/]+", "", str(url)).split("?", 1)[0]
+    segments = [
+        "{id}" if ID_SEGMENT.match(segment) else segment for segment in path.split("/")
+    ]
+    return f"{method} {'/'.join(segments)}"
+
+
+def format_labels(labels: tuple) -> str:
+    """!
+    Format labels in the Prometheus text format
+
+    @param labels Tuple of (name, value) pairs
+
+    @return The formatted labels, empty if there are none
+    """
+    if not labels:
+        return ""
+    pairs = []
+    for name, value in labels:
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"')
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class Metrics:
+    """
+    Thread safe registry of counters, gauges and histograms
+    """
+
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+        """!
+        Initializes a Metrics object
+
+        @param buckets The upper bounds of the histogram buckets
+        """
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        # Labels added to everything recorded by the current thread
+        self.context = threading.local()
+
+    def key(self, name: str, labels: dict) -> tuple:
+        """!
+        Get the registry key of a metric
+
+        @param name The metric name
+        @param labels The metric labels
+
+        @return Tuple of the name and the sorted labels
+        """
+        labels = {**getattr(self.context, "labels", {}), **labels}
+        return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    @contextlib.contextmanager
+    def labels(self, **labels):
+        """!
+        Add labels to everything the current thread records in the block
+
+        @param labels The labels to add
+        """
+        previous = getattr(self.context, "labels", {})
+        self.context.labels = {**previous, **labels}
+        try:
+            yield
+        finally:
+            self.context.labels = previous
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        """!
+        Increase a counter
+
+        @param name The metric name
+        @param value The amount to add
+        @param labels The metric labels
+        """
+        key = self.key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels) -> None:
+        """!
+        Set a gauge
+
+        @param name The metric name
+        @param value The value
+        @param labels The metric labels
+        """
+        key = self.key(name, labels)
+        with self.lock:
+            self.gauges[key] = value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        """!
+        Record a value in a histogram
+
+        @param name The metric name
+        @param value The value
+        @param labels The metric labels
+        """
+        key = self.key(name, labels)
+        with self.lock:
+            histogram = self.histograms.setdefault(
+                key, {"buckets": [0] * len(self.buckets), "sum": 0, "count": 0}
+            )
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram["buckets"][i] += 1
+            histogram["sum"] += value
+            histogram["count"] += 1
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        """!
+        Time a phase of a run into phase_duration_seconds
+
+        @param name The phase name
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.set("phase_duration_seconds", time.perf_counter() - start, phase=name)
+
+    @contextlib.contextmanager
+    def run(self):
+        """
+        Record the duration, result and end time of a run
+        """
+        start = time.perf_counter()
+        result = "failed"
+        try:
+            yield
+            result = "ok"
+        finally:
+            self.set("run_duration_seconds", time.perf_counter() - start)
+            self.set("last_run_timestamp_seconds", time.time())
+            self.inc("runs_total", result=result)
+
+    def record_request(
+        self, method: str, url: str, status: int | None, seconds: float
+    ) -> None:
+        """!
+        Record an API request
+
+        @param method The HTTP method
+        @param url The request URL
+        @param status The HTTP status, None if no response was received
+        @param seconds The request latency
+        """
+        endpoint = endpoint_name(method, url)
+        self.inc("api_requests_total", endpoint=endpoint, status=status or "error")
+        self.observe("api_request_duration_seconds", seconds, endpoint=endpoint)
+        if status is None or status >= 400:
+            self.inc("api_errors_total", endpoint=endpoint)
+
+    def to_dict(self) -> dict:
+        """!
+        Get all metrics as a JSON serializable dict
+
+        @return Dict of metric name to a list of samples
+        """
+        samples = {}
+        with self.lock:
+            for kind in ("counters", "gauges"):
+                for (name, labels), value in getattr(self, kind).items():
+                    samples.setdefault(name, []).append(
+                        {"labels": dict(labels), "value": value}
+                    )
+            for (name, labels), histogram in self.histograms.items():
+                samples.setdefault(name, []).append(
+                    {
+                        "labels": dict(labels),
+                        "buckets": dict(zip(self.buckets, histogram["buckets"])),
+                        "sum": histogram["sum"],
+                        "count": histogram["count"],
+                    }
+                )
+        return samples
+
+    def to_prometheus(self) -> str:
+        """!
+        Get all metrics in the Prometheus text exposition format
+
+        @return The metrics text
+        """
+        lines = []
+        with self.lock:
+            families = {}
+            for kind, values in (
+                ("counter", self.counters),
+                ("gauge", self.gauges),
+                ("histogram", self.histograms),
+            ):
+                for (name, labels), value in values.items():
+                    families.setdefault((name, kind), []).append((labels, value))
+            for (name, kind), samples in sorted(families.items()):
+                full_name = PREFIX + name
+                lines.append(f"# HELP {full_name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {full_name} {kind}")
+                for labels, value in sorted(samples, key=lambda sample: sample[0]):
+                    if kind != "histogram":
+                        lines.append(f"{full_name}{format_labels(labels)} {value}")
+                        continue
+                    bounds = [*self.buckets, "+Inf"]
+                    counts = [*value["buckets"], value["count"]]
+                    for bound, count in zip(bounds, counts):
+                        bucket_labels = format_labels(labels + (("le", bound),))
+                        lines.append(f"{full_name}_bucket{bucket_labels} {count}")
+                    lines.append(
+                        f"{full_name}_sum{format_labels(labels)} {value['sum']}"
+                    )
+                    lines.append(
+                        f"{full_name}_count{format_labels(labels)} {value['count']}"
+                    )
+        return "\n".join(lines) + "\n"
+
+    def write_json(self, path: str) -> None:
+        """!
+        Write all metrics to a JSON file atomically
+
+        @param path The file to write
+        """
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as metrics_file:
+            json.dump(self.to_dict(), metrics_file, indent=2)
+        os.replace(tmp_path, path)
+
+    def serve(self, host: str, port: int) -> ThreadingHTTPServer:
+        """!
+        Serve the metrics in the Prometheus text format in a background thread
+
+        @param host The host to listen on
+        @param port The port to listen on
+
+        @return The HTTP server
+        """
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                body = registry.to_prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logging.debug("Metrics: " + format, *args)
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        logging.info(f"Serving metrics on port {server.server_address[1]}")
+        return server
+
+
+# The registry the whole script records to
+registry = Metrics()
@@ -0,0 +1,578 @@
+import logging
+import datetime
+import heapq
+import itertools
+import re
+import uuid
+from dataclasses import dataclass, field
+from metrics import registry
+from TaskRecord import normalize_duration
+
+# The due strings the planner writes
+TODAY_AT = re.compile(r"today at (\d{2}):(\d{2})")
+
+
+@dataclass
+class Change:
+    """
+    A planned task mutation, kind is "update" or "move"
+
+    A move can carry update fields, they are written before the task is moved.
+    The id is sent as the Sync API command uuid, so a replayed change is not
+    applied twice.
+    """
+
+    task: object
+    kind: str
+    fields: dict = field(default_factory=dict)
+    message: str | None = None
+    id: str = field(default_factory=lambda: str(uuid.uuid4()))
+
+    def __str__(self) -> str:
+        args = ", ".join(f"{key}={value}" for key, value in self.fields.items())
+        return f"{self.kind} {self.task.content} ({self.task.id}): {args}"
+
+    def operations(self) -> list:
+        """!
+        Split the change into its API writes
+
+        The update of a move gets an id derived from the change id, so a replay
+        sends the same command uuids.
+
+        @return The list of (operation id, kind, fields, message) tuples, the
+        message is logged after the last one
+        """
+        if self.kind != "move":
+            return [(self.id, self.kind, self.fields, self.message)]
+        fields = dict(self.fields)
+        move = {"project_id": fields.pop("project_id")}
+        operations = []
+        if fields:
+            update_id = str(uuid.uuid5(uuid.NAMESPACE_URL, f"{self.id}/update"))
+            operations.append((update_id, "update", fields, None))
+        operations.append((self.id, "move", move, self.message))
+        return operations
+
+
+def created_at_key(task: object) -> float:
+    """!
+    Get the creation time of a task as a sortable timestamp
+
+    @param task The task, created_at can be seconds since the epoch, a datetime
+    or an ISO 8601 string
+
+    @return The creation time in seconds since the epoch
+    """
+    created_at = task.created_at
+    if isinstance(created_at, float):
+        return created_at
+    if isinstance(created_at, str):
+        created_at = datetime.datetime.fromisoformat(created_at.replace("Z", "+00:00"))
+    return created_at.timestamp()
+
+
+def select_oldest(tasks, k: int) -> list:
+    """!
+    Select the k oldest tasks from an iterable with a bounded heap
+
+    Only k tasks are kept in memory, so the iterable can be a stream of pages.
+
+    @param tasks An iterable of tasks
+    @param k The number of tasks to select
+
+    @return The k oldest tasks, oldest to newest
+    """
+    if k <= 0:
+        return []
+    return heapq.nsmallest(k, tasks, key=created_at_key)
+
+
+def iter_oldest(tasks: list):
+    """!
+    Iterate tasks from oldest to newest, sorting lazily
+
+    The heap is built in linear time and each task is popped only when the
+    caller asks for it, so stopping early avoids sorting the whole list.
+
+    @param tasks The list of tasks
+
+    @return A generator of tasks, oldest to newest
+    """
+    heap = [(created_at_key(task), i, task) for i, task in enumerate(tasks)]
+    heapq.heapify(heap)
+    while heap:
+        yield heapq.heappop(heap)[2]
+
+
+def duration_minutes(task: object) -> int | None:
+    """!
+    Get the duration of a task in minutes
+
+    @param task The task
+
+    @return The duration in minutes, 0 for unsupported units or None if the task
+    has no duration
+    """
+    if task.duration is None:
+        return None
+    if task.duration.unit == "minute":
+        return task.duration.amount
+    if task.duration.unit == "hour":
+        return task.duration.amount * 60
+    return 0
+
+
+def quota_keys(task: object) -> list:
+    """!
+    Get the quota keys a task counts against
+
+    @param task The task
+
+    @return The project id and the task's labels prefixed with @
+    """
+    keys = [str(getattr(task, "project_id", None))]
+    keys += [f"@{label}" for label in getattr(task, "labels", None) or ()]
+    return keys
+
+
+def index_tasks(tasks) -> dict:
+    """!
+    Group tasks by project, labels and priority, each group oldest first
+
+    @param tasks An iterable of tasks
+
+    @return Dict of (project id, sorted labels, priority) to a list of tasks
+    """
+    groups = {}
+    for task in tasks:
+        key = (
+            str(getattr(task, "project_id", None)),
+            tuple(sorted(getattr(task, "labels", None) or ())),
+            task.priority,
+        )
+        groups.setdefault(key, []).append(task)
+    for group in groups.values():
+        group.sort(key=created_at_key)
+    return groups
+
+
+class QuotaLedger:
+    """
+    Number of tasks per quota key and priority level, checked against the
+    per-project and per-label maximums
+    """
+
+    def __init__(self, quotas: dict, buckets: dict):
+        """!
+        Initializes a QuotaLedger object, counting the tasks in one pass
+
+        @param quotas Dict of quota key (project id or @label) to a dict of UI
+        priority level to the maximum number of tasks
+        @param buckets Dict of "P1"-"P4" task lists
+        """
+        self.quotas = quotas
+        self.counts = {}
+        for level in (1, 2, 3, 4):
+            for task in buckets[f"P{level}"]:
+                for key in quota_keys(task):
+                    if key in quotas:
+                        self.counts[key, level] = self.counts.get((key, level), 0) + 1
+
+    def allows(self, task: object, level: int) -> bool:
+        """!
+        Check if a task can move to a priority level without exceeding a quota
+
+        @param task The task
+        @param level The UI priority level
+
+        @return True if every quota of the task has room at the level
+        """
+        for key in quota_keys(task):
+            limit = self.quotas.get(key, {}).get(level)
+            if limit is not None and self.counts.get((key, level), 0) >= limit:
+                return False
+        return True
+
+    def move(self, task: object, source: int, target: int) -> None:
+        """!
+        Count a task at a new priority level
+
+        @param task The task
+        @param source The UI priority level the task leaves
+        @param target The UI priority level the task moves to
+        """
+        for key in quota_keys(task):
+            if key in self.quotas:
+                self.counts[key, source] = self.counts.get((key, source), 0) - 1
+                self.counts[key, target] = self.counts.get((key, target), 0) + 1
+
+    def select(self, tasks: list, level: int, k: int) -> list:
+        """!
+        Select the k oldest tasks that fit the quotas of a priority level
+
+        The tasks are indexed once and the groups are merged oldest first. The
+        tasks of a group share their quota keys, so a group whose quota is full
+        is dropped from the merge without looking at its other tasks.
+
+        @param tasks The tasks one level below
+        @param level The UI priority level the tasks are promoted to
+        @param k The number of tasks to select
+
+        @return The selected tasks, oldest to newest
+        """
+        selected = []
+        if k <= 0:
+            return selected
+        groups = list(index_tasks(tasks).values())
+        # The oldest unselected task of each group: (created at, group, position)
+        heap = [(created_at_key(group[0]), i, 0) for i, group in enumerate(groups)]
+        heapq.heapify(heap)
+        while heap and len(selected) < k:
+            _, i, position = heapq.heappop(heap)
+            task = groups[i][position]
+            # A full quota stays full at this level, the group is not pushed again
+            if not self.allows(task, level):
+                continue
+            self.move(task, level + 1, level)
+            selected.append(task)
+            if position + 1 < len(groups[i]):
+                next_task = groups[i][position + 1]
+                heapq.heappush(heap, (created_at_key(next_task), i, position + 1))
+        return selected
+
+
+def plan_promotions(
+    buckets: dict, targets: dict, quotas: dict | None = None, first_level: int = 1
+) -> list:
+    """!
+    Plan the promotion cascade P4 -> P3 -> P2 -> P1
+
+    Each level is filled with the oldest tasks of the next lower level. The
+    buckets are updated in place so later stages see the planned priorities.
+
+    @param buckets Dict of "P1"-"P4" task lists
+    @param targets Dict of UI priority level (1-3) to desired number of tasks
+    @param quotas Dict of project id or @label to a dict of UI priority level to
+    the maximum number of tasks, tasks that would exceed one are not promoted
+    @param first_level The highest UI priority level to fill, the levels above
+    it are left as they are
+
+    @return The list of planned changes
+    """
+    plan = []
+    ledger = QuotaLedger(quotas, buckets) if quotas else None
+    for level in range(first_level, 4):
+        with registry.phase(f"promote_p{level}"):
+            level_tasks = buckets[f"P{level}"]
+            target_size = targets[level]
+            if len(level_tasks) >= target_size:
+                continue
+            logging.info(f"You have {len(level_tasks)}/{target_size} P{level} tasks")
+            lower_tasks = buckets[f"P{level + 1}"]
+            if ledger is None:
+                promoted = select_oldest(lower_tasks, target_size - len(level_tasks))
+            else:
+                promoted = ledger.select(
+                    lower_tasks, level, target_size - len(level_tasks)
+                )
+            promoted_ids = {task.id for task in promoted}
+            for task in promoted:
+                plan.append(
+                    Change(
+                        task,
+                        "update",
+                        {"priority": 5 - level},
+                        f"Priority changed:\n- {task.content}: P{level + 1} -> P{level}\n",
+                    )
+                )
+            buckets[f"P{level}"] = level_tasks + promoted
+            buckets[f"P{level + 1}"] = [
+                task for task in lower_tasks if task.id not in promoted_ids
+            ]
+    return plan
+
+
+@dataclass
+class TodayLedger:
+    """
+    Running capacity of the today view: the tasks without duration, the minutes
+    of the tasks with duration and the time the next task is rescheduled to
+    """
+
+    no_duration_target: int
+    duration_target: int
+    next_start: datetime.datetime
+    count: int = 0
+    minutes: int = 0
+
+    def add_today(self, today_tasks) -> None:
+        """!
+        Count the tasks already due today
+
+        @param today_tasks The tasks already due today
+        """
+        for task in today_tasks:
+            minutes = duration_minutes(task)
+            if minutes is None:
+                self.count += 1
+            elif minutes > 0:
+                self.minutes += minutes
+
+    def is_full(self) -> bool:
+        """!
+        Check if both targets are met, a task can overshoot the duration target
+
+        @return True if no more tasks are needed today
+        """
+        return (
+            self.count >= self.no_duration_target
+            and self.minutes >= self.duration_target
+        )
+
+    def take(self, task: object) -> list:
+        """!
+        Reschedule a task for today if it fits a target that is not met yet
+
+        @param task The task
+
+        @return The list of planned changes, empty if the task is not needed
+        """
+        minutes = duration_minutes(task)
+        # Tasks with no duration
+        if minutes is None and self.count < self.no_duration_target:
+            self.count += 1
+            due_str = f"today at {self.next_start.hour:02}:{self.next_start.minute:02}"
+            return [
+                Change(
+                    task,
+                    "update",
+                    {"due_string": due_str},
+                    f"Rescheduled {task.content} for today\n",
+                )
+            ]
+        # Tasks with duration
+        if minutes and self.minutes < self.duration_target:
+            self.minutes += minutes
+            self.next_start += datetime.timedelta(minutes=minutes)
+            due_str = f"today at {self.next_start.hour:02}:{self.next_start.minute:02}"
+            return [
+                Change(
+                    task,
+                    "update",
+                    {
+                        "due_string": due_str,
+                        "duration": task.duration.amount,
+                        "duration_unit": task.duration.unit,
+                    },
+                    f"Rescheduled {task.content} for today\n",
+                )
+            ]
+        return []
+
+
+def merge_pools(pools: list):
+    """!
+    Merge task pools into one iterator in priority order
+
+    A pool is only started once the pools before it are exhausted, so a lazy
+    pool is never sorted if the targets are met before it.
+
+    @param pools The task iterables, in priority order
+
+    @return An iterator of the tasks of all pools
+    """
+    return itertools.chain.from_iterable(pools)
+
+
+def plan_today_fill(tasks, ledger: TodayLedger) -> list:
+    """!
+    Plan rescheduling tasks for today in one pass until the ledger is full
+
+    @param tasks The tasks to pick from in priority order, e.g. merge_pools()
+    @param ledger The capacity ledger of today, updated in place
+
+    @return The list of planned changes
+    """
+    plan = []
+    # Stop before pulling a task, so nothing is sorted once the targets are met
+    if ledger.is_full():
+        return plan
+    for task in tasks:
+        plan += ledger.take(task)
+        if ledger.is_full():
+            break
+    return plan
+
+
+def plan_parent_move(task: object, parent_id: str) -> list:
+    """!
+    Plan scheduling a task for today and moving it to a parent project
+
+    @param task The task to move
+    @param parent_id The id of the parent project
+
+    @return The list of planned changes, one move with the schedule fields
+    """
+    task_duration = 60 if task.duration is None else task.duration.amount
+    return [
+        Change(
+            task,
+            "move",
+            {
+                "due_string": "today at 18:00",
+                "duration": task_duration,
+                "duration_unit": "minute",
+                "project_id": parent_id,
+            },
+            f"Moved {task.content} to project: '{parent_id}'\n",
+        )
+    ]
+
+
+def local_due_at(task: object) -> datetime.datetime | None:
+    """!
+    Get the local due time of a task
+
+    @param task The task, a TaskRecord or a task of the REST client
+
+    @return The naive local due time or None if the task is not due at a time
+    """
+    due = getattr(task, "due", None)
+    if due is None:
+        return None
+    if getattr(due, "time", None) is not None:
+        return datetime.datetime.combine(due.date, due.time)
+    if isinstance(due.date, datetime.datetime):
+        if due.date.tzinfo is not None:
+            return due.date.astimezone().replace(tzinfo=None, second=0, microsecond=0)
+        return due.date.replace(second=0, microsecond=0)
+    return None
+
+
+def unchanged_fields(task: object, fields: dict, today: datetime.date) -> set:
+    """!
+    Find the fields of a write that already equal the task's current state
+
+    @param task The task
+    @param fields The update_task() keyword arguments, and project_id of a move
+    @param today The date "today" in a due string refers to
+
+    @return The set of field names that do not change the task
+    """
+    unchanged = set()
+    if "priority" in fields and fields["priority"] == task.priority:
+        unchanged.add("priority")
+    if "project_id" in fields and fields["project_id"] == getattr(
+        task, "project_id", None
+    ):
+        unchanged.add("project_id")
+    if "duration" in fields and task.duration is not None:
+        duration = normalize_duration(
+            fields["duration"], fields.get("duration_unit", "minute")
+        )
+        if duration == normalize_duration(task.duration.amount, task.duration.unit):
+            unchanged |= {"duration", "duration_unit"}
+    match = TODAY_AT.fullmatch(str(fields.get("due_string")))
+    if match is not None:
+        hour, minute = map(int, match.groups())
+        target = datetime.datetime.combine(today, datetime.time(hour, minute))
+        if local_due_at(task) == target:
+            unchanged.add("due_string")
+    return unchanged
+
+
+def write_calls(plan: list) -> int:
+    """!
+    Count the API writes of a plan
+
+    @param plan The list of planned changes
+
+    @return The number of update and move calls
+    """
+    return sum(len(change.operations()) for change in plan)
+
+
+def coalesce_plan(plan: list, today: datetime.date) -> list:
+    """!
+    Merge the changes of each task into one final write and drop the fields
+    that would not change the task
+
+    A later value of a field wins. A task that is moved gets a single move
+    carrying its update fields. A change left without fields is dropped, as is
+    the message of a change whose fields were all dropped, the message of a
+    move is about its project.
+
+    @param plan The list of planned changes
+    @param today The date "today" in a due string refers to
+
+    @return The list of coalesced changes, one per task at most, in the order
+    the tasks first appear in the plan
+    """
+    merged = {}
+    for change in plan:
+        fields, messages = merged.setdefault(change.task.id, ({}, []))
+        fields.update(change.fields)
+        names = {"project_id"} if change.kind == "move" else set(change.fields)
+        messages.append((names, change.message))
+    tasks = {change.task.id: change.task for change in plan}
+    coalesced = []
+    for task_id, (fields, messages) in merged.items():
+        task = tasks[task_id]
+        for name in unchanged_fields(task, fields, today):
+            del fields[name]
+        if not fields:
+            continue
+        message = "".join(
+            message for names, message in messages if message and names & set(fields)
+        )
+        kind = "move" if "project_id" in fields else "update"
+        coalesced.append(Change(task, kind, fields, message or None))
+    return coalesced
+
+
+def plan_run(
+    snapshot: dict,
+    targets: dict,
+    no_duration_target: int,
+    duration_target: int,
+    parent_id: str | None,
+    task_reschedule_time: datetime.datetime,
+    quotas: dict | None = None,
+) -> list:
+    """!
+    Plan a whole prioritization pass in one go over a snapshot
+
+    The snapshot is not modified.
+
+    @param snapshot Dict with "P1"-"P4" priority buckets and the "today" view
+    @param targets Dict of UI priority level (1-3) to desired number of tasks
+    @param no_duration_target The number of tasks without duration for today
+    @param duration_target The total duration in minutes of tasks for today
+    @param parent_id The project to move the oldest P1 task to, or None
+    @param task_reschedule_time The starting time to reschedule today's tasks to
+    @param quotas Dict of project id or @label to a dict of UI priority level to
+    the maximum number of tasks
+
+    @return The list of planned changes in the order they should be applied, one
+    per task
+    """
+    buckets = {level: list(snapshot[level]) for level in ("P1", "P2", "P3", "P4")}
+    plan = plan_promotions(buckets, targets, quotas)
+
+    with registry.phase("fill_today"):
+        ledger = TodayLedger(no_duration_target, duration_target, task_reschedule_time)
+        ledger.add_today(snapshot["today"])
+        pools = [iter_oldest(buckets[level]) for level in ("P1", "P2", "P3", "P4")]
+        plan += plan_today_fill(merge_pools(pools), ledger)
+
+    with registry.phase("parent_move"):
+        if parent_id is not None and buckets["P1"]:
+            plan += plan_parent_move(select_oldest(buckets["P1"], 1)[0], parent_id)
+
+    with registry.phase("coalesce"):
+        coalesced = coalesce_plan(plan, task_reschedule_time.date())
+    calls, saved = write_calls(plan), write_calls(plan) - write_calls(coalesced)
+    registry.set("writes_saved", saved)
+    if saved:
+        logging.info(f"Coalesced {calls} task writes, saved {saved} API calls")
+    return coalesced
@@ -0,0 +1,92 @@
+import cProfile
+import datetime
+import logging
+import os
+import pstats
+import time
+import tracemalloc
+
+# Get the directory of the script file
+script_dir = os.path.dirname(os.path.realpath(__file__))
+
+
+def hottest_functions(stats: pstats.Stats, top: int) -> list:
+    """!
+    Get the functions of the script with the most cumulative time
+
+    @param stats The profile statistics
+    @param top The number of functions to get
+
+    @return List of (function, calls, own seconds, cumulative seconds), hottest
+    first
+    """
+    functions = []
+    for (filename, line, name), (_, calls, own, cumulative, _) in stats.stats.items():
+        if os.path.realpath(filename).startswith(script_dir):
+            location = f"{os.path.basename(filename)}:{line}"
+            functions.append((f"{name} ({location})", calls, own, cumulative))
+    functions.sort(key=lambda function: function[3], reverse=True)
+    return functions[:top]
+
+
+def profile_run(run, directory: str, top: int = 15) -> dict:
+    """!
+    Run a function under cProfile and tracemalloc and write the reports
+
+    Writes a cProfile dump (.prof, readable with pstats or snakeviz), the top
+    allocations by line and a summary of the hottest functions of the script.
+
+    @param run The function to profile, called without arguments
+    @param directory The directory to write the reports to, created if missing
+    @param top The number of functions and allocations in the reports
+
+    @return Dict of the report paths
+    """
+    os.makedirs(directory, exist_ok=True)
+    name = f"profile-{datetime.datetime.now():%Y%m%d-%H%M%S}"
+    paths = {
+        "profile": os.path.join(directory, f"{name}.prof"),
+        "allocations": os.path.join(directory, f"{name}-allocations.txt"),
+        "summary": os.path.join(directory, f"{name}-summary.txt"),
+    }
+
+    profiler = cProfile.Profile()
+    tracemalloc.start(10)
+    start = time.perf_counter()
+    try:
+        profiler.runcall(run)
+    finally:
+        wall_time = time.perf_counter() - start
+        snapshot = tracemalloc.take_snapshot()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        profiler.dump_stats(paths["profile"])
+
+        snapshot = snapshot.filter_traces(
+            [tracemalloc.Filter(False, tracemalloc.__file__)]
+        )
+        with open(paths["allocations"], "w") as allocations_file:
+            allocations_file.write(f"Top {top} allocations by line\n\n")
+            for statistic in snapshot.statistics("lineno")[:top]:
+                allocations_file.write(f"{statistic}\n")
+            allocations_file.write(f"\nTop {top} allocations by call stack\n")
+            for statistic in snapshot.statistics("traceback")[:top]:
+                allocations_file.write(
+                    f"\n{statistic.size / 1024:.1f} KiB in {statistic.count} blocks\n"
+                )
+                allocations_file.write("\n".join(statistic.traceback.format()) + "\n")
+
+        with open(paths["summary"], "w") as summary_file:
+            summary_file.write(f"Wall time: {wall_time:.3f} s (profiled)\n")
+            summary_file.write(f"Peak traced memory: {peak / 1024 / 1024:.2f} MiB\n\n")
+            summary_file.write(
+                f"{'calls':>8} {'own s':>9} {'cumulative s':>13}  function\n"
+            )
+            for function, calls, own, cumulative in hottest_functions(
+                pstats.Stats(profiler), top
+            ):
+                summary_file.write(
+                    f"{calls:>8} {own:>9.4f} {cumulative:>13.4f}  {function}\n"
+                )
+        logging.info(f"Profile written to {paths['summary']}")
+    return paths
@@ -0,0 +1,474 @@
+import argparse
+import datetime
+import itertools
+import json
+import logging
+import math
+import numpy as np
+from Settings import SettingsFile
+from SyncStore import state_path
+from TaskRecord import TaskRecord, UNIT_CODES, to_columns, unpack_snapshot
+
+# The settings a sweep can vary, in the column order of the report
+PARAMETERS = ("p1_tasks", "p2_tasks", "p3_tasks", "number_of_tasks", "task_duration")
+# Minutes of a task without duration
+NO_DURATION = -1
+# Combinations times tasks simulated at once, bounds the memory of a sweep
+CHUNK_CELLS = 1 << 22
+SECONDS_PER_DAY = 86400
+
+
+def column_arrays(columns: dict, today: datetime.date) -> dict:
+    """!
+    Convert the columns of a task snapshot to arrays
+
+    @param columns The columns, see TaskRecord.to_columns()
+    @param today The date of the today view
+
+    @return Dict of "level" (UI priority 1-4), "created_at" (seconds since the
+    epoch), "minutes" and "today" (due today) arrays
+    """
+    amounts = np.asarray(columns["duration"])
+    units = np.asarray(columns["duration_unit"])
+    return {
+        "level": (5 - np.asarray(columns["priority"])).astype(np.int8),
+        "created_at": np.asarray(columns["created_at"], dtype=np.float64),
+        "minutes": np.where(
+            units == UNIT_CODES[None],
+            NO_DURATION,
+            np.where(units == UNIT_CODES["minute"], amounts, 0),
+        ).astype(np.int32),
+        "today": np.asarray(columns["due"]) == today.toordinal(),
+    }
+
+
+def snapshot_arrays(items, today: datetime.date) -> dict:
+    """!
+    Convert tasks to arrays
+
+    @param items An iterable of task dicts in the Todoist API v1 format
+    @param today The date of the today view
+
+    @return The task arrays, see column_arrays()
+    """
+    return column_arrays(to_columns(map(TaskRecord.from_item, items)), today)
+
+
+def load_snapshot(path: str = state_path, today: datetime.date | None = None) -> dict:
+    """!
+    Load the tasks recorded by the sync store, straight from its columns
+
+    @param path The sync state file
+    @param today The date of the today view, defaults to the current date
+
+    @return The task arrays, see column_arrays()
+
+    @raises ValueError: If the file is not a readable snapshot
+    """
+    with open(path, "rb") as state_file:
+        columns = unpack_snapshot(state_file.read())[1]
+    return column_arrays(columns, today or datetime.date.today())
+
+
+def parse_range(value: str) -> list:
+    """!
+    Parse the values of a swept setting
+
+    @param value A number, comma separated numbers or an inclusive range
+    "start:stop" or "start:stop:step"
+
+    @return The list of values
+
+    @raises ValueError: If the value is not a number, a list or a range
+    """
+    if ":" in value:
+        bounds = [int(bound) for bound in value.split(":")]
+        if len(bounds) not in (2, 3) or (len(bounds) == 3 and bounds[2] <= 0):
+            raise ValueError(f"ranges must look like 'start:stop[:step]', not {value}")
+        step = bounds[2] if len(bounds) == 3 else 1
+        return list(range(bounds[0], bounds[1] + 1, step))
+    return [int(number) for number in value.split(",")]
+
+
+def parameter_grid(values: dict) -> dict:
+    """!
+    Build every combination of the swept settings
+
+    @param values Dict of setting name to its list of values
+
+    @return Dict of setting name to an array with one value per combination
+    """
+    combinations = list(itertools.product(*(values[name] for name in PARAMETERS)))
+    grid = np.array(combinations, dtype=np.int32).reshape(-1, len(PARAMETERS))
+    return {name: grid[:, i] for i, name in enumerate(PARAMETERS)}
+
+
+def relevant_tasks(snapshot: dict, grid: dict, days: int) -> tuple:
+    """!
+    Drop the tasks no combination can reach within the simulated days
+
+    Tasks leave a level oldest first and a task only leaves it after being
+    promoted or completed, so of every level and kind of duration only as many
+    of the oldest tasks as the targets plus the tasks rescheduled over the run
+    are kept. The others never move and are only counted.
+
+    @param snapshot The task arrays
+    @param grid The parameter grid
+    @param days The number of simulated days
+
+    @return The kept task arrays sorted oldest first, and the number of dropped
+    tasks of every level (index 1-4)
+    """
+    positive = snapshot["minutes"][snapshot["minutes"] > 0]
+    shortest = int(positive.min()) if positive.size else 1
+    # The most tasks rescheduled on one day
+    daily = int(grid["number_of_tasks"].max()) + math.ceil(
+        int(grid["task_duration"].max()) / shortest
+    )
+    targets = int((grid["p1_tasks"] + grid["p2_tasks"] + grid["p3_tasks"]).max())
+    horizon = targets + (days + 1) * daily
+
+    kinds = np.sign(snapshot["minutes"])
+    order = np.lexsort((snapshot["created_at"], kinds, snapshot["level"]))
+    keys = np.stack((snapshot["level"][order], kinds[order]))
+    starts = np.flatnonzero(np.any(keys[:, 1:] != keys[:, :-1], axis=0)) + 1
+    rank = np.arange(order.size) - np.repeat(
+        np.concatenate(([0], starts)),
+        np.diff(np.concatenate(([0], starts, [order.size]))),
+    )
+    keep = np.zeros(order.size, dtype=bool)
+    keep[order] = rank < horizon
+    keep |= snapshot["today"]
+
+    dropped = np.bincount(snapshot["level"][~keep], minlength=5)
+    kept = np.flatnonzero(keep)
+    kept = kept[np.argsort(snapshot["created_at"][kept], kind="stable")]
+    return {name: array[kept] for name, array in snapshot.items()}, dropped
+
+
+def take_oldest(select, limits: np.ndarray, weights: np.ndarray, size: int) -> tuple:
+    """!
+    Take the oldest selected tasks of every combination until a limit is met
+
+    The columns are scanned in blocks of doubling width and the scan stops as
+    soon as every combination has met its limit, so only the oldest tasks of a
+    large level are read.
+
+    @param select Function of a column slice to the selected cells of the block
+    @param limits The limit of every combination, a task is taken while the
+    weight taken before it is below the limit
+    @param weights The weight of every column, e.g. 1 or its minutes
+    @param size The number of columns
+
+    @return The rows and the columns of the taken cells
+    """
+    found = np.zeros(limits.size, dtype=np.int64)
+    rows, columns = [], []
+    start, width = 0, 64
+    while start < size:
+        open_rows = found < limits
+        if not open_rows.any():
+            break
+        block = slice(start, start + width)
+        weight = (select(block) & open_rows[:, None]) * weights[block]
+        before = found[:, None] + np.cumsum(weight, axis=1) - weight
+        take = (weight > 0) & (before < limits[:, None])
+        found += (weight * take).sum(axis=1)
+        taken_rows, taken_columns = np.nonzero(take)
+        rows.append(taken_rows)
+        columns.append(taken_columns + start)
+        start += width
+        width *= 2
+    if not rows:
+        return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+    return np.concatenate(rows), np.concatenate(columns)
+
+
+def take_prefix(pool: np.ndarray, weight: np.ndarray, taken: np.ndarray, limit):
+    """!
+    Take the oldest tasks of a small pool while the weight before is below a limit
+
+    @param pool The selected cells, one row per combination, oldest first
+    @param weight The weight of every cell
+    @param taken The weight already taken by every combination, updated in place
+    @param limit The limit of every combination
+
+    @return The taken cells
+    """
+    weight = pool * weight
+    before = taken[:, None] + np.cumsum(weight, axis=1) - weight
+    take = (weight > 0) & (before < limit[:, None])
+    taken += (weight * take).sum(axis=1)
+    return take
+
+
+def simulate_chunk(
+    tasks: dict,
+    dropped: np.ndarray,
+    grid: dict,
+    days: int,
+    completion_rate: float,
+    rng: np.random.Generator,
+    now: float,
+) -> dict:
+    """!
+    Simulate a run per day for a chunk of combinations at once
+
+    The few tasks of P1-P3 are kept in slots per combination, sorted oldest
+    first. P4 is a matrix of the waiting tasks that is only scanned from its
+    oldest tasks with take_oldest().
+
+    @param tasks The task arrays, oldest first
+    @param dropped The number of tasks of every level that never move
+    @param grid The parameter grid of the chunk
+    @param days The number of simulated days
+    @param completion_rate The chance a task rescheduled for today is completed
+    @param rng The random generator
+    @param now The start of the simulation in seconds since the epoch
+
+    @return Dict of result name to an array with one value per combination
+    """
+    combinations = grid["p1_tasks"].size
+    size = tasks["level"].size
+    # Column arrays with one more empty column the free slots point to
+    untimed = np.append(tasks["minutes"] == NO_DURATION, False)
+    positive = np.append(np.maximum(tasks["minutes"], 0), 0)
+    due_today = np.append(tasks["today"], False)
+    ones = np.ones(size, dtype=np.int64)
+    high = np.flatnonzero(tasks["level"] < 4)
+    targets = {1: grid["p1_tasks"], 2: grid["p2_tasks"], 3: grid["p3_tasks"]}
+    capacity = high.size + int(sum(values.max() for values in targets.values()))
+
+    slots = np.full((combinations, capacity), size, dtype=np.intp)
+    slots[:, : high.size] = high
+    slot_level = np.zeros(slots.shape, dtype=np.int8)
+    slot_level[:, : high.size] = tasks["level"][high]
+    waiting = np.repeat((tasks["level"] == 4)[None, :], combinations, axis=0)
+    waiting_count = np.full(combinations, np.count_nonzero(tasks["level"] == 4))
+    results = {
+        name: np.zeros(combinations)
+        for name in ("completed", "minutes", "age", "promotions", "p1_short_days")
+    }
+
+    def level_count(level: int) -> np.ndarray:
+        return (slot_level == level).sum(axis=1) + dropped[level]
+
+    def sort_slots() -> None:
+        order = np.argsort(slots, axis=1, kind="stable")
+        slots[:] = np.take_along_axis(slots, order, axis=1)
+        slot_level[:] = np.take_along_axis(slot_level, order, axis=1)
+
+    for day in range(days):
+        not_today = ~tasks["today"] if day == 0 else np.ones(size, dtype=bool)
+
+        # Promotion cascade P4 -> P3 -> P2 -> P1, a level is counted after the
+        # tasks promoted out of it
+        for target_level in (1, 2):
+            need = targets[target_level] - level_count(target_level)
+            lower = slot_level == target_level + 1
+            promote = lower & (np.cumsum(lower, axis=1) <= need[:, None])
+            slot_level[promote] = target_level
+            results["promotions"] += promote.sum(axis=1)
+        need = targets[3] - level_count(3)
+        rows, columns = take_oldest(lambda block: waiting[:, block], need, ones, size)
+        waiting[rows, columns] = False
+        waiting_count -= np.bincount(rows, minlength=combinations)
+        results["promotions"] += np.bincount(rows, minlength=combinations)
+        order = np.lexsort((columns, rows))
+        rows, columns = rows[order], columns[order]
+        used = (slots < size).sum(axis=1)
+        rank = np.arange(rows.size) - np.searchsorted(rows, rows)
+        slots[rows, used[rows] + rank] = columns
+        slot_level[rows, used[rows] + rank] = 3
+        sort_slots()
+        results["p1_short_days"] += level_count(1) < targets[1]
+
+        # Fill today from P1 to P4, oldest first, like TodayLedger
+        scheduled = due_today[slots] if day == 0 else np.zeros(slots.shape, bool)
+        waiting_rows, waiting_columns = np.nonzero(waiting & ~not_today)
+        count = (scheduled * untimed[slots]).sum(axis=1) + np.bincount(
+            waiting_rows, untimed[waiting_columns], minlength=combinations
+        ).astype(np.int64)
+        total = (scheduled * positive[slots]).sum(axis=1) + np.bincount(
+            waiting_rows, positive[waiting_columns], minlength=combinations
+        ).astype(np.int64)
+        for source_level in (1, 2, 3):
+            pool = (slot_level == source_level) & ~scheduled
+            scheduled |= take_prefix(
+                pool & untimed[slots], 1, count, grid["number_of_tasks"]
+            )
+            scheduled |= take_prefix(
+                pool, positive[slots], total, grid["task_duration"]
+            )
+        untimed_rows, untimed_columns = take_oldest(
+            lambda block: waiting[:, block] & (untimed[block] & not_today[block]),
+            grid["number_of_tasks"] - count,
+            ones,
+            size,
+        )
+        timed_rows, timed_columns = take_oldest(
+            lambda block: waiting[:, block] & not_today[block],
+            grid["task_duration"] - total,
+            positive[:size],
+            size,
+        )
+        waiting_rows = np.concatenate((waiting_rows, untimed_rows, timed_rows))
+        waiting_columns = np.concatenate(
+            (waiting_columns, untimed_columns, timed_columns)
+        )
+
+        # Every task rescheduled for today is completed with the same chance
+        cells = np.flatnonzero(scheduled)
+        done = cells[rng.random(cells.size) < completion_rate]
+        done_rows, done_columns = np.divmod(done, capacity)
+        done_columns = slots[done_rows, done_columns]
+        slots.flat[done] = size
+        slot_level.flat[done] = 0
+        sort_slots()
+        finished = rng.random(waiting_rows.size) < completion_rate
+        waiting[waiting_rows[finished], waiting_columns[finished]] = False
+        waiting_count -= np.bincount(waiting_rows[finished], minlength=combinations)
+        done_rows = np.concatenate((done_rows, waiting_rows[finished]))
+        done_columns = np.concatenate((done_columns, waiting_columns[finished]))
+
+        results["completed"] += np.bincount(done_rows, minlength=combinations)
+        results["minutes"] += np.bincount(
+            done_rows, positive[done_columns], minlength=combinations
+        )
+        ages = (now + day * SECONDS_PER_DAY - tasks["created_at"][done_columns]) / (
+            SECONDS_PER_DAY
+        )
+        results["age"] += np.bincount(done_rows, ages, minlength=combinations)
+
+    results["age"] /= np.maximum(results["completed"], 1)
+    for name in ("completed", "minutes", "promotions"):
+        results[name] /= days
+    for source_level in (1, 2, 3):
+        results[f"p{source_level}_final"] = level_count(source_level)
+    results["p4_final"] = waiting_count + dropped[4]
+    return results
+
+
+def simulate(
+    snapshot: dict,
+    grid: dict,
+    days: int = 30,
+    completion_rate: float = 0.8,
+    seed: int = 0,
+    now: float | None = None,
+) -> dict:
+    """!
+    Replay the promotion cascade and the today fill for every combination
+
+    Every day the levels are topped up and today is filled as a scheduled run
+    would, then each task rescheduled for today is completed with the
+    completion rate. Tasks that are not completed are candidates again the
+    next day.
+
+    @param snapshot The task arrays, see column_arrays()
+    @param grid The parameter grid, see parameter_grid()
+    @param days The number of simulated days
+    @param completion_rate The chance a task rescheduled for today is completed
+    @param seed The random seed, the same seed gives the same results
+    @param now The start of the simulation in seconds since the epoch, defaults
+    to the current time
+
+    @return Dict of result name to an array with one value per combination:
+    completed tasks, completed minutes and promotions per day, the mean age in
+    days of the completed tasks, the days P1 was short of its target and the
+    final size of every level
+    """
+    if now is None:
+        now = datetime.datetime.now(datetime.timezone.utc).timestamp()
+    tasks, dropped = relevant_tasks(snapshot, grid, days)
+    logging.debug(
+        "Simulating %d of %d tasks", tasks["level"].size, snapshot["level"].size
+    )
+    rng = np.random.default_rng(seed)
+    combinations = grid["p1_tasks"].size
+    size = max(1, CHUNK_CELLS // max(1, tasks["level"].size))
+    chunks = []
+    for start in range(0, combinations, size):
+        chunk = {name: values[start : start + size] for name, values in grid.items()}
+        chunks.append(
+            simulate_chunk(tasks, dropped, chunk, days, completion_rate, rng, now)
+        )
+    return {name: np.concatenate([c[name] for c in chunks]) for name in chunks[0]}
+
+
+def print_report(grid: dict, results: dict, top: int) -> None:
+    """!
+    Print the combinations that complete the most tasks
+
+    Ties are broken by the fewest promotions, which are the task updates a run
+    sends.
+
+    @param grid The parameter grid
+    @param results The simulation results
+    @param top The number of combinations to print
+    """
+    order = np.lexsort((results["promotions"], -results["completed"]))[:top]
+    print(
+        f"{'P1':>4} {'P2':>4} {'P3':>4} {'tasks':>5} {'min':>5} | "
+        f"{'done/day':>8} {'min/day':>7} {'age':>6} {'promo/day':>9} "
+        f"{'P1 short':>8}"
+    )
+    for i in order:
+        print(
+            f"{grid['p1_tasks'][i]:>4} {grid['p2_tasks'][i]:>4} "
+            f"{grid['p3_tasks'][i]:>4} {grid['number_of_tasks'][i]:>5} "
+            f"{grid['task_duration'][i]:>5} | {results['completed'][i]:>8.2f} "
+            f"{results['minutes'][i]:>7.1f} {results['age'][i]:>6.1f} "
+            f"{results['promotions'][i]:>9.2f} {int(results['p1_short_days'][i]):>8}"
+        )
+
+
+if __name__ == "__main__":
+    defaults = SettingsFile().get()
+    parser = argparse.ArgumentParser(
+        description="Simulate settings on a recorded task snapshot"
+    )
+    parser.add_argument(
+        "--state", default=state_path, help="The sync state file to simulate"
+    )
+    for name in PARAMETERS:
+        parser.add_argument(
+            f"--{name.replace('_', '-')}",
+            default=str(getattr(defaults, name)),
+            help=f"Values of {name}, e.g. 5, 3,5,8 or 1:20:2 "
+            f"(default: {getattr(defaults, name)})",
+        )
+    parser.add_argument("-d", "--days", type=int, default=30, help="Simulated days")
+    parser.add_argument(
+        "-c",
+        "--completion-rate",
+        type=float,
+        default=0.8,
+        help="Chance a task rescheduled for today is completed",
+    )
+    parser.add_argument("-s", "--seed", type=int, default=0, help="Random seed")
+    parser.add_argument(
+        "-t", "--top", type=int, default=20, help="Combinations to print"
+    )
+    parser.add_argument("-o", "--output", help="Write every result to a JSON file")
+    args = parser.parse_args()
+
+    values = {name: parse_range(getattr(args, name)) for name in PARAMETERS}
+    grid = parameter_grid(values)
+    results = simulate(
+        load_snapshot(args.state), grid, args.days, args.completion_rate, args.seed
+    )
+    print_report(grid, results, args.top)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(
+                [
+                    {
+                        name: values[i].item()
+                        for name, values in {**grid, **results}.items()
+                    }
+                    for i in range(grid["p1_tasks"].size)
+                ],
+                output_file,
+                indent=2,
+            )
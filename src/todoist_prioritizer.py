@@ -1,79 +1,250 @@
-from todoist_api_python.api import TodoistAPI
-import keyring
-import configparser
+import functools
 import logging
 import datetime
 import sys
-import requests
-from time import sleep
+import threading
+import os
+import http_session
 from CommandLineParser import CommandLineParser
-from CommandLineParser import ini_path
+from Settings import Settings, SettingsFile, ini_path
+from Settings import parse_run_times, parse_schedule
+from SyncWriter import SyncWriter
+from SyncStore import SyncStore
+from SyncStore import state_path as sync_state_path
+from TaskRecord import TaskRecord
+from TaskIndex import TaskIndex, index_path
+from ParallelExecutor import ParallelExecutor
+from planner import Change, plan_run, plan_promotions, select_oldest
+from Scheduler import Scheduler, daily_expression
+from Scheduler import state_path as scheduler_state_path
+from AccountDaemon import AccountDaemon
+from WebhookReceiver import WebhookReceiver
+from UpdateChecker import UpdateChecker
+from Journal import Journal, journal_path
+from metrics import registry
+from profiler import profile_run
 
 current_version = "v1.2.0"
+# Exit statuses of --once
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_PARTIAL = 2
 api_token = None
+# Queues task mutations when set, a SyncWriter or a ParallelExecutor
+task_writer = None
+# Incrementally synced local task store, when set
+sync_store = None
+# SQLite index of the task store, when set
+task_index = None
+# Cached release checker, when set
+update_checker = None
+# Settings of config.ini, reloaded when the file changes
+settings_file = None
+# Write-ahead journal of the scheduled runs, when set
+run_journal = None
+# Serializes scheduled runs and webhook triggered reprioritization
+run_lock = threading.Lock()
+
+
+@functools.cache
+def get_secret(name: str) -> str | None:
+    """!
+    Get a secret from the system keyring
+
+    Each secret is looked up once per process, a keyring lookup can be a slow
+    D-Bus round trip. keyring is imported on first use.
 
+    @param name The name of the secret, e.g. todoist-api-token
 
-def check_for_updates():
+    @return The secret, or None if it is not set
     """
+    import keyring
+
+    return keyring.get_password("system", name)
+
+
+def new_api(token: str) -> object:
+    """!
+    Create a TodoistAPI object with a pooled HTTP client
+
+    The Todoist SDK is imported on first use, so commands that do not talk to
+    Todoist start without it.
+
+    @param token The Todoist API token
+
+    @return The TodoistAPI object
+    """
+    from todoist_api_python.api import TodoistAPI
+
+    return TodoistAPI(token, client=http_session.new_client())
+
+
+def check_for_updates(checker: UpdateChecker | None = None):
+    """!
     Check for updates in the repository releases
 
-    @return Response
+    @param checker The UpdateChecker to use, defaults to update_checker or a
+    checker without a cache
+
+    @return Response, or None if a recent cached result was used
     """
+    checker = checker or update_checker or UpdateChecker(current_version, None)
+    return checker.check()
 
-    repo_url = "https://api.github.com/repos/ussaka/todoist-prioritizer/releases"
-    response = requests.get(repo_url)
-    if response.status_code == 200:
-        releases = response.json()
-        latest_release = releases[0]
-        latest_version = latest_release["tag_name"]
-        if latest_version > current_version:
-            logging.info(f"New version available: {latest_version}")
-            logging.info(f"Changelog: {latest_release['body']}")
-            logging.info(f"Download link: {latest_release['html_url']}\n")
-    else:
-        logging.error(
-            "Update checker failed, failed to fetch releases from the repository"
-        )
-    return response
 
+def get_tasks_stream(filters: str):
+    """!
+    Get filtered tasks from the Todoist API one page at a time
+
+    @param filters The filters to apply to the tasks
 
-def get_tasks(filters: str) -> list:
+    @return A generator of the tasks from the Todoist API
+
+    @raises Exception: If the tasks cannot be fetched after the retries
+    """
+
+    # Checked once, a disabled debug call per task still costs a call
+    debug = logging.getLogger().isEnabledFor(logging.DEBUG)
+    logging.debug("(%s) filtered tasks:\n", filters)
+    try:
+        for task_list in api_token.filter_tasks(query=filters):
+            for task in task_list:
+                if debug:
+                    logging.debug("%s", task.content)
+                yield task
+    except Exception as error:
+        logging.error(f"Failed to fetch ({filters}) tasks: {error}")
+        raise
+
+
+def get_oldest_tasks(filters: str, k: int) -> list:
     """!
-    Get filtered tasks from the Todoist API
+    Get the k oldest filtered tasks without keeping the other tasks in memory
 
     @param filters The filters to apply to the tasks
+    @param k The number of tasks to get
 
-    @return The list of tasks from the Todoist API
+    @return The k oldest tasks, oldest to newest
     """
+    return select_oldest(get_tasks_stream(filters), k)
+
+
+def get_all_tasks(api: object = None, store: object = None) -> list:
+    """!
+    Get all active tasks from the Todoist API in as few pages as possible
+
+    Every page is read into TaskRecord objects before the next one is fetched,
+    so the API objects of the whole account are never kept.
+
+    @param api The TodoistAPI object to use, defaults to api_token
+    @param store The SyncStore to use, defaults to sync_store
+
+    @return The list of all active tasks as TaskRecord objects
 
-    tasks_lists = []
+    @raises Exception: If the tasks cannot be fetched after the retries
+    """
+
+    api = api or api_token
+    store = store or sync_store
     tasks_list = []
     try:
-        tasks_lists = api_token.filter_tasks(query=filters)
+        if store is not None:
+            tasks_list = store.sync()
+        else:
+            for task_list in api.get_tasks(limit=200):
+                tasks_list.extend(TaskRecord.from_task(task) for task in task_list)
     except Exception as error:
-        logging.error(error)
-        sys.exit(1)
-    logging.debug(f"({filters}) filtered tasks:\n")
-    for task_list in tasks_lists:
-        for task in task_list:
-            tasks_list.append(task)
-            logging.debug(f"{task.content}")
+        logging.error(f"Failed to fetch tasks: {error}")
+        raise
+    logging.debug("Fetched %d active tasks", len(tasks_list))
     return tasks_list
 
 
-def sort_tasks_date(tasks: list) -> list:
+def get_due_date(task: object) -> datetime.date | None:
+    """!
+    Get the local due date of a task
+
+    @param task The task to get the due date from
+
+    @return The due date or None if the task has no due date
+    """
+    due = getattr(task, "due", None)
+    if due is None:
+        return None
+    if isinstance(due.date, datetime.datetime):
+        if due.date.tzinfo is not None:
+            return due.date.astimezone().date()
+        return due.date.date()
+    return due.date
+
+
+def bucket_tasks(tasks: list, today: datetime.date | None = None) -> dict:
     """!
-    Sort the tasks by date, oldest to newest
+    Partition tasks locally into priority buckets and a today view
 
-    @param tasks The list of tasks to sort
+    @param tasks The list of tasks to partition
+    @param today The date of the today view, defaults to the current date
 
-    @return The sorted list of tasks, oldest to newest
+    @return Dict with "P1"-"P4" priority buckets and the "today" view
     """
-    tasks.sort(key=lambda x: x.created_at)
-    logging.debug(f"Sorted tasks:\n")
+    if today is None:
+        today = datetime.date.today()
+    snapshot = {"P1": [], "P2": [], "P3": [], "P4": [], "today": []}
     for task in tasks:
-        logging.debug(f"{task.content}")
-    return tasks
+        snapshot[f"P{convert_priority(task.priority)}"].append(task)
+        if get_due_date(task) == today:
+            snapshot["today"].append(task)
+    return snapshot
+
+
+def get_snapshot(api: object = None, store: object = None) -> dict:
+    """!
+    Fetch all active tasks once and partition them into an in-memory snapshot
+
+    @param api The TodoistAPI object to use, defaults to api_token
+    @param store The SyncStore to use, defaults to sync_store
+
+    @return Dict with "P1"-"P4" priority buckets and the "today" view
+    """
+    with registry.phase("fetch"):
+        snapshot = bucket_tasks(get_all_tasks(api, store))
+    logging.debug(
+        "Snapshot: "
+        + ", ".join(f"{name}={len(tasks)}" for name, tasks in snapshot.items())
+    )
+    return snapshot
+
+
+def update_task(task: object, message: str | None = None, **fields) -> None:
+    """!
+    Update a task through the task writer or directly with the REST client
+
+    @param task The task to update
+    @param message Logged when the update succeeds
+    @param fields The update_task() keyword arguments
+    """
+    if task_writer is not None:
+        task_writer.update_task(task, message, **fields)
+        return
+    api_token.update_task(task_id=task.id, **fields)
+    if message:
+        logging.info(message)
+
+
+def move_task(task: object, project_id: str, message: str | None = None) -> None:
+    """!
+    Move a task through the task writer or directly with the REST client
+
+    @param task The task to move
+    @param project_id The project to move the task to
+    @param message Logged when the move succeeds
+    """
+    if task_writer is not None:
+        task_writer.move_task(task, project_id, message)
+        return
+    api_token.move_task(task_id=task.id, project_id=project_id)
+    if message:
+        logging.info(message)
 
 
 def convert_priority(priority):
@@ -93,6 +264,111 @@ def convert_priority(priority):
     return priority_map[priority]
 
 
+def apply_plan(plan: list, writer: object = None, journal: object = None) -> set:
+    """!
+    Apply planned changes through the task writer or the REST client
+
+    A failed change only fails its task, the rest of the plan is applied.
+
+    @param plan The list of planned changes
+    @param writer The task writer to queue the changes into, defaults to
+    task_writer
+    @param journal The Journal to record the applied changes in, if any
+
+    @return The set of ids of the tasks that failed
+    """
+    writer = writer or task_writer
+    # Queued operation id to its change id and task id, to count the failures
+    queued = {}
+    # Tasks whose change failed, their later changes are skipped
+    failed_tasks = set()
+    with registry.phase("apply"):
+        for change in plan:
+            if change.task.id in failed_tasks:
+                continue
+            try:
+                for operation_id, kind, fields, message in change.operations():
+                    if kind == "move":
+                        if writer is not None:
+                            writer.move_task(
+                                change.task, fields["project_id"], message, operation_id
+                            )
+                        else:
+                            move_task(change.task, fields["project_id"], message)
+                    elif writer is not None:
+                        writer.update_task(change.task, message, operation_id, **fields)
+                    else:
+                        update_task(change.task, message, **fields)
+                    if writer is not None:
+                        queued[operation_id] = (change.id, change.task.id)
+                if "priority" in change.fields:
+                    change.task.priority = change.fields["priority"]
+                if writer is None and journal is not None:
+                    journal.complete([change.id])
+            except Exception as error:
+                # Only this task fails, the rest of the plan is still applied
+                logging.error(f"Failed to change {change.task.content}: {error}")
+                failed_tasks.add(change.task.id)
+        failed = writer.flush() if writer is not None else {}
+        if journal is not None:
+            # A change is complete once all of its operations succeeded
+            failed_changes = {queued[operation_id][0] for operation_id in failed}
+            journal.complete(
+                dict.fromkeys(
+                    change_id
+                    for change_id, _ in queued.values()
+                    if change_id not in failed_changes
+                )
+            )
+    failed_tasks |= {queued[operation_id][1] for operation_id in failed}
+    changed_tasks = {change.task.id for change in plan} - failed_tasks
+    registry.set("tasks_changed", len(changed_tasks))
+    registry.inc("tasks_changed_total", len(changed_tasks))
+    registry.inc("write_failures_total", len(failed_tasks))
+    return failed_tasks
+
+
+def apply_journaled(make_plan, journal: object = None, writer: object = None) -> set:
+    """!
+    Apply a plan through a write-ahead journal
+
+    If the journal holds unfinished changes of an interrupted run, only those are
+    replayed and no new plan is made. The replay is idempotent: updates and
+    moves set absolute values and the Sync API ignores already applied command
+    uuids.
+
+    @param make_plan Returns the list of planned changes, called without
+    arguments
+    @param journal The Journal to use, None applies the plan without one
+    @param writer The task writer to queue the changes into, defaults to
+    task_writer
+
+    @return The set of ids of the tasks that failed
+    """
+    if journal is None:
+        return apply_plan(make_plan(), writer)
+    plan = journal.pending()
+    if plan:
+        logging.info(f"Resuming {len(plan)} unfinished changes of an interrupted run")
+    else:
+        plan = make_plan()
+        journal.begin(plan)
+    failed_tasks = apply_plan(plan, writer, journal)
+    journal.finish()
+    return failed_tasks
+
+
+def print_plan(plan: list) -> None:
+    """!
+    Print planned changes without applying them
+
+    @param plan The list of planned changes
+    """
+    print(f"Planned changes ({len(plan)}):")
+    for change in plan:
+        print(f"- {change}")
+
+
 def prioritize_tasks(tasks: list, p: int, max_size: int) -> list:
     """!
     Prioritize the tasks
@@ -103,129 +379,268 @@ def prioritize_tasks(tasks: list, p: int, max_size: int) -> list:
 
     @return The list of tasks with the new priority
     """
-    for i in range(0, max_size):
-        try:
-            is_success = api_token.update_task(task_id=tasks[i].id, priority=p)
-            logging.info(
-                f"Priority changed:\n- {is_success['content']}: P{convert_priority(tasks[i].priority)} -> P{convert_priority(p)}\n"
-            )
-        except Exception as error:
-            logging.error(error)
-            sys.exit(1)
-    logging.debug(f"Prioritized tasks:\n{tasks}\n")
+    plan = [
+        Change(
+            task,
+            "update",
+            {"priority": p},
+            f"Priority changed:\n- {task.content}: P{convert_priority(task.priority)} -> P{convert_priority(p)}\n",
+        )
+        for task in tasks[:max_size]
+    ]
+    apply_plan(plan)
+    logging.debug("Prioritized tasks:\n%s\n", tasks)
     return tasks
 
 
-def move_task_to_a_parent(task: object, parent_id: str) -> None:
+def build_plan(snapshot: dict, settings: Settings | None = None) -> list:
     """!
-    Move a task to today
+    Plan a prioritization pass over a snapshot with the user's configuration
 
-    @param task The task to move
-    """
+    @param snapshot The snapshot from get_snapshot()
+    @param settings The settings to read the targets from, defaults to the USER
+    section
 
-    task_duration = task.duration
-    if task_duration == None:
-        task_duration = 60
-    else:
-        task_duration = task.duration.amount
-    retval = api_token.update_task(
-        task_id=task.id,
-        due_string="today at 18:00",
-        duration=task_duration,
-        duration_unit="minute",
+    @return The list of planned changes
+    """
+    if settings is None:
+        settings = settings_file.get()
+    reschedule_starting_time = datetime.datetime.now().replace(hour=18, minute=0)
+    return plan_run(
+        snapshot,
+        settings.targets(),
+        settings.number_of_tasks,
+        settings.task_duration,
+        settings.parent_id,
+        reschedule_starting_time,
+        settings.quota_limits(),
     )
-    if retval is None:
-        logging.error(f"Failed to move {task.content} to today")
-        sys.exit(1)
 
+
+def run_once(dry_run: bool = False) -> set:
+    """!
+    Run one prioritization pass over a single snapshot of the active tasks
+
+    An interrupted scheduled run is resumed from the journal instead.
+
+    @param dry_run If True only print the planned changes
+
+    @return The set of ids of the tasks that failed
+    """
+    # Read once per run, edits to config.ini apply from the next run
+    settings = settings_file.get()
     try:
-        api_token.move_task(
-            task_id=task.id,
-            project_id=parent_id,
-        )
-        logging.info(f"Moved {task.content} to project: '{parent_id}'\n")
+        with registry.run():
+            if dry_run:
+                print_plan(build_plan(get_snapshot(), settings))
+                return set()
+            return apply_journaled(
+                lambda: build_plan(get_snapshot(), settings), run_journal
+            )
+    finally:
+        export_metrics(settings)
+
+
+def run_status(run) -> int:
+    """!
+    Run one pass and get the exit status of --once
+
+    @param run Runs the pass and returns the set of ids of the tasks that failed
+
+    @return EXIT_OK, EXIT_PARTIAL if some task changes failed or EXIT_FAILED if
+    the run failed
+    """
+    try:
+        failed_tasks = run()
     except Exception as error:
-        logging.error(error)
-        sys.exit(1)
+        logging.error(f"Run failed: {error}")
+        return EXIT_FAILED
+    if failed_tasks:
+        logging.error(f"Failed to change {len(failed_tasks)} tasks")
+        return EXIT_PARTIAL
+    return EXIT_OK
 
 
-def fill_today_tasks(
-    tasks_pool: list, task_reschedule_time: datetime.datetime
-) -> datetime.datetime:
+def export_metrics(settings: Settings, name: str | None = None) -> None:
     """!
-    Fill the tasks for today based on the user's configuration
+    Write the metrics to the configured JSON file, if any
+
+    @param settings The settings to read metrics_file from
+    @param name The account name of the multi-account daemon, each account
+    writes its own file so parallel runs do not share one
+    """
+    metrics_file = settings.metrics_file
+    if not metrics_file:
+        return
+    path = os.path.join(os.path.dirname(ini_path), metrics_file)
+    if name is not None:
+        root, extension = os.path.splitext(path)
+        path = f"{root}_{name}{extension}"
+    try:
+        registry.write_json(path)
+    except OSError as error:
+        logging.error(f"Failed to write metrics: {error}")
 
-    @param tasks_pool The list of tasks to reschedule for today
-    @param task_reschedule_time The starting time to reschedule the tasks to
 
-    @return The new reschedule starting time to use for the next tasks
+def make_writer(settings: Settings, api: object, token: str) -> object:
+    """!
+    Create the task writer selected by write_mode
+
+    @param settings The settings to read write_mode from
+    @param api The TodoistAPI object
+    @param token The Todoist API token
+
+    @return A SyncWriter, a ParallelExecutor or None for direct REST calls
     """
-    today_tasks = get_tasks("today")
-    no_duration_tasks_pcs = 0
-    tasks_duration_min = 0
-    usr_no_duration_tasks_pcs = int(config.get("USER", "number_of_tasks"))
-    usr_tasks_duration_min = int(config.get("USER", "task_duration"))
-
-    # Get current number of tasks with no duration and total duration
-    for task in today_tasks:
-        logging.debug(f"Task: {task}")
-        if task.duration == None:
-            no_duration_tasks_pcs += 1
-        elif task.duration.amount > 0:
-            if task.duration.unit == "minute":
-                tasks_duration_min += task.duration.amount
-            elif task.duration.unit == "hour":
-                tasks_duration_min += task.duration.amount * 60
-
-    for task in tasks_pool:
-        # Tasks with no duration
-        if no_duration_tasks_pcs < usr_no_duration_tasks_pcs:
-            logging.debug(f"Task: {task}")
-            if task.duration == None:
-                no_duration_tasks_pcs += 1
-                due_str = f"today at {task_reschedule_time.hour:02}:{task_reschedule_time.minute:02}"
-                api_token.update_task(
-                    task_id=task.id,
-                    due_string=due_str,
-                )
-                logging.info(f"Rescheduled {task.content} for today\n")
-        # Tasks with duration
-        if tasks_duration_min < usr_tasks_duration_min:
-            if task.duration != None:
-                if task.duration.amount > 0:
-                    if task.duration.unit == "minute":
-                        tasks_duration_min += task.duration.amount
-                        task_reschedule_time = (
-                            task_reschedule_time
-                            + datetime.timedelta(minutes=task.duration.amount)
-                        )
-                        due_str = f"today at {task_reschedule_time.hour:02}:{task_reschedule_time.minute:02}"
-                        api_token.update_task(
-                            task_id=task.id,
-                            due_string=due_str,
-                            duration=task.duration.amount,
-                            duration_unit=task.duration.unit,
-                        )
-                        logging.info(f"Rescheduled {task.content} for today\n")
-                    elif task.duration.unit == "hour":
-                        tasks_duration_min += task.duration.amount * 60
-                        task_reschedule_time = (
-                            task_reschedule_time
-                            + datetime.timedelta(hours=task.duration.amount)
-                        )
-                        due_str = f"today at {task_reschedule_time.hour:02}:{task_reschedule_time.minute:02}"
-                        api_token.update_task(
-                            task_id=task.id,
-                            due_string=due_str,
-                            duration=task.duration.amount,
-                            duration_unit=task.duration.unit,
-                        )
-        if (
-            no_duration_tasks_pcs == usr_no_duration_tasks_pcs
-            and tasks_duration_min == usr_tasks_duration_min
-        ):
-            break
-    return task_reschedule_time
+    if settings.write_mode == "sync":
+        return SyncWriter(token)
+    if settings.write_mode == "parallel":
+        return ParallelExecutor(api, settings.max_workers)
+    return None
+
+
+def schedule_expressions(settings: Settings) -> list:
+    """!
+    Get the cron expressions of the configured schedule
+
+    @param settings The settings to read the schedule from
+
+    @return The list of cron expressions
+    """
+    expressions = parse_schedule(settings.schedule)
+    if expressions:
+        return expressions
+    run_times = [(settings.run_hour, settings.run_minute)]
+    run_times += parse_run_times(settings.run_times)
+    return [daily_expression(hour, minute) for hour, minute in run_times]
+
+
+def account_index_path(name: str) -> str:
+    """!
+    Get the task index file of an account of the multi-account daemon
+
+    @param name The account name
+
+    @return The path of the task index
+    """
+    return index_path.replace(".sqlite3", f"_{name}.sqlite3")
+
+
+def run_account(name: str, settings: Settings) -> set:
+    """!
+    Run one prioritization pass for an account of the multi-account daemon
+
+    The account gets its own API client, task writer and task store for the pass,
+    so nothing is shared with the other accounts.
+
+    @param name The account name
+    @param settings The account's settings
+
+    @return The set of ids of the tasks that failed
+
+    @raises Exception: If the account has no API token
+    """
+    token = get_secret(f"todoist-api-token-{name}")
+    if not token:
+        raise Exception(f"No API token provided for account {name}")
+    logging.info(f"\nRunning account {name}...\n")
+    try:
+        with registry.labels(account=name), registry.run():
+            with new_api(token) as api:
+                # Queue REST calls too, so nothing falls back to the global client
+                writer = make_writer(settings, api, token) or ParallelExecutor(api, 1)
+                store = index = None
+                if settings.incremental_sync:
+                    if settings.task_index:
+                        index = TaskIndex(account_index_path(name))
+                    store = SyncStore(
+                        token, sync_state_path.replace(".bin", f"_{name}.bin"), index
+                    )
+                try:
+                    return apply_journaled(
+                        lambda: build_plan(get_snapshot(api, store), settings),
+                        Journal(journal_path.replace(".jsonl", f"_{name}.jsonl")),
+                        writer,
+                    )
+                finally:
+                    if index is not None:
+                        index.close()
+    finally:
+        export_metrics(settings, name)
+
+
+def reprioritize_levels(levels: set) -> None:
+    """!
+    Re-run the promotion steps from the highest affected priority level down
+
+    Only the affected levels and the levels below them are fetched. With a task
+    index the store is synced once and the levels are counted and selected by
+    indexed queries instead. With quotas every task is read once, the synced
+    store when there is one, and promoted within the quotas like a daily run.
+
+    @param levels The UI priority levels whose task count may have dropped
+    """
+    with run_lock:
+        settings = settings_file.get()
+        targets = settings.targets()
+        quotas = settings.quota_limits()
+        if quotas:
+            # A quota counts the tasks of a project or label on every level
+            buckets = bucket_tasks(get_all_tasks())
+            apply_plan(plan_promotions(buckets, targets, quotas, min(levels)))
+            return
+        counts = None
+        if task_index is not None and sync_store is not None:
+            sync_store.sync()
+            counts = task_index.counts()
+        for level in range(min(levels), 4):
+            logging.info(f"\nPrioritizing P{level} tasks...\n")
+            if counts is None:
+                level_size = sum(1 for _ in get_tasks_stream(f"P{level}"))
+            else:
+                level_size = counts[convert_priority(level)]
+            target_size = targets[level]
+            if level_size < target_size:
+                logging.info(f"You have {level_size}/{target_size} P{level} tasks")
+                max_size = target_size - level_size
+                if counts is None:
+                    oldest = get_oldest_tasks(f"P{level + 1}", max_size)
+                else:
+                    oldest = task_index.oldest(convert_priority(level + 1), max_size)
+                    # The index sees the new priorities at the next sync
+                    counts[convert_priority(level)] += len(oldest)
+                    counts[convert_priority(level + 1)] -= len(oldest)
+                prioritize_tasks(oldest, convert_priority(level), max_size)
+
+
+def print_status(path: str = index_path) -> int:
+    """!
+    Print the task counts of a task index
+
+    The index is opened read-only, so it can be read while a daemon syncs it.
+
+    @param path The task index file
+
+    @return EXIT_OK or EXIT_FAILED if there is no task index
+    """
+    if not os.path.exists(path):
+        logging.error(f"No task index at {path}, set task_index = True")
+        return EXIT_FAILED
+    index = TaskIndex(path, readonly=True)
+    try:
+        counts = index.counts()
+        today = datetime.date.today()
+        print(f"{path}: {sum(counts.values())} tasks")
+        for level in (1, 2, 3, 4):
+            print(f"P{level}: {counts[convert_priority(level)]}")
+        print(
+            f"Today: {index.count_due(today)} tasks, "
+            f"{index.count_due(today, with_duration=False)} without duration, "
+            f"{index.minutes_due(today)} minutes"
+        )
+    finally:
+        index.close()
+    return EXIT_OK
 
 
 if __name__ == "__main__":
@@ -233,95 +648,116 @@ if __name__ == "__main__":
     cmd = CommandLineParser()
     cmd.user_input()
 
-    # Create the config parser
-    config = configparser.ConfigParser()
-    config.read(ini_path)
-
-    # API token must be set
+    # Parsed once, reloaded by the runs when config.ini changes
+    settings_file = SettingsFile(ini_path)
     try:
-        if keyring.get_password("system", "todoist-api-token") is None:
-            raise Exception("No API token provided")
-    except Exception as error:
-        logging.error(error)
+        settings = settings_file.get()
+    except ValueError as error:
+        logging.error(f"Invalid configuration: {error}")
+        sys.exit(EXIT_FAILED)
+
+    # Parallel writes need a pooled connection per worker
+    http_session.configure(
+        max(settings.pool_size, settings.max_workers),
+        settings.http_timeout,
+        settings.proxy,
+        rate_limit=settings.rate_limit,
+        max_retries=settings.max_retries,
+    )
 
-    # Create the TodoistAPI object
-    api_token = TodoistAPI(keyring.get_password("system", "todoist-api-token"))
+    if settings.metrics_port > 0:
+        registry.serve(settings.metrics_host, settings.metrics_port)
+
+    if cmd.args.accounts is not None:
+        # Account profiles fall back to the USER section
+        accounts_file = SettingsFile(
+            cmd.args.accounts, defaults=dict(settings_file.config["USER"])
+        )
+        if accounts_file.mtime is None:
+            logging.error(f"Failed to read accounts file {cmd.args.accounts}")
+            sys.exit(EXIT_FAILED)
+        try:
+            schedulers = {
+                name: Scheduler(
+                    schedule_expressions(accounts_file.get(name)),
+                    scheduler_state_path.replace(".json", f"_{name}.json"),
+                )
+                for name in accounts_file.config.sections()
+            }
+        except ValueError as error:
+            logging.error(f"Invalid accounts file: {error}")
+            sys.exit(EXIT_FAILED)
+        if cmd.args.status:
+            sys.exit(max(print_status(account_index_path(name)) for name in schedulers))
+        if cmd.args.once:
+            sys.exit(
+                max(
+                    run_status(lambda: run_account(name, accounts_file.get(name)))
+                    for name in schedulers
+                )
+            )
+        logging.info(f"todoist-prioritizer {current_version}\n")
+        daemon = AccountDaemon(
+            schedulers,
+            lambda name: run_account(name, accounts_file.get(name)),
+            settings.account_workers,
+        )
+        daemon.run_forever()
+
+    if cmd.args.status:
+        sys.exit(print_status())
 
-    run_hour = int(config.get("USER", "run_hour"))
-    run_minute = int(config.get("USER", "run_minute"))
+    # API token must be set, it is looked up once
+    token = get_secret("todoist-api-token")
+    if token is None:
+        logging.error("No API token provided")
+        sys.exit(EXIT_FAILED)
+
+    # Create the TodoistAPI object
+    api_token = new_api(token)
+    task_writer = make_writer(settings, api_token, token)
+    if settings.incremental_sync:
+        if settings.task_index:
+            task_index = TaskIndex()
+        sync_store = SyncStore(token, index=task_index)
+    elif settings.task_index:
+        logging.warning("task_index needs incremental_sync = True, not indexing")
+    run_journal = Journal()
+
+    if cmd.args.once:
+        sys.exit(run_status(run_once))
+
+    if cmd.args.dry_run:
+        run_once(dry_run=True)
+        sys.exit(0)
+
+    if cmd.args.profile is not None:
+        profile_run(run_once, cmd.args.profile)
+        sys.exit(0)
+
+    scheduler = Scheduler(schedule_expressions(settings))
+    update_checker = UpdateChecker(
+        current_version, interval=settings.update_check_hours * 60 * 60
+    )
 
     logging.info(f"todoist-prioritizer {current_version}\n")
     logging.info("todoist-prioritizer is running...")
 
-    while True:
-        current_time = datetime.datetime.now().time()
-        run_time = datetime.time(run_hour, run_minute)
-        if (
-            current_time.hour == run_time.hour
-            and current_time.minute == run_time.minute
-        ):
-            # Prioritize the tasks
-            logging.info("\nPrioritizing P1 tasks...\n")
-            p1_tasks = get_tasks("P1")
-            p1_tasks_size = len(p1_tasks)
-            p1_tasks_target_size = int(config.get("USER", "p1_tasks"))
-            p2_tasks = sort_tasks_date(get_tasks("P2"))
-            if p1_tasks_size < p1_tasks_target_size:
-                logging.info(
-                    f"You have {p1_tasks_size}/{p1_tasks_target_size} P1 tasks"
-                )
-                prioritize_tasks(p2_tasks, 4, p1_tasks_target_size - p1_tasks_size)
-
-            logging.info("\nPrioritizing P2 tasks...\n")
-            p2_tasks = get_tasks("P2")
-            p2_tasks_size = len(p2_tasks)
-            p2_tasks_target_size = int(config.get("USER", "p2_tasks"))
-            p3_tasks = sort_tasks_date(get_tasks("P3"))
-            if p2_tasks_size < p2_tasks_target_size:
-                logging.info(
-                    f"You have {p2_tasks_size}/{p2_tasks_target_size} P2 tasks"
-                )
-                prioritize_tasks(p3_tasks, 3, p2_tasks_target_size - p2_tasks_size)
-
-            logging.info("\nPrioritizing P3 tasks...\n")
-            p3_tasks = get_tasks("P3")
-            p3_tasks_size = len(p3_tasks)
-            p3_tasks_target_size = int(config.get("USER", "p3_tasks"))
-            p4_tasks = sort_tasks_date(get_tasks("P4"))
-            if p3_tasks_size < p3_tasks_target_size:
-                logging.info(
-                    f"You have {p3_tasks_size}/{p3_tasks_target_size} P3 tasks"
-                )
-                prioritize_tasks(p4_tasks, 2, p3_tasks_target_size - p3_tasks_size)
-
-            # Fill tasks for today
-            logging.info("\nFilling tasks for today...\n")
-            reschedule_starting_time = datetime.datetime.now()
-            reschedule_starting_time = reschedule_starting_time.replace(
-                hour=18, minute=0
-            )
-            reschedule_starting_time = fill_today_tasks(
-                p1_tasks, reschedule_starting_time
-            )
-            reschedule_starting_time = fill_today_tasks(
-                p2_tasks, reschedule_starting_time
-            )
-            reschedule_starting_time = fill_today_tasks(
-                p3_tasks, reschedule_starting_time
-            )
-            reschedule_starting_time = fill_today_tasks(
-                p4_tasks, reschedule_starting_time
-            )
+    if settings.webhook_port > 0:
+        receiver = WebhookReceiver(
+            reprioritize_levels,
+            settings.webhook_host,
+            settings.webhook_port,
+            get_secret("todoist-webhook-secret"),
+            settings.webhook_debounce,
+        )
+        receiver.start()
 
-            # Move the first P1 task to a parent
-            parent_id = config.get("USER", "parent_id")
-            if parent_id != "None" and p1_tasks:
-                logging.info(
-                    f"\nMoving the first P1 task to a parent (id={parent_id})\n"
-                )
-                move_task_to_a_parent(p1_tasks[0], parent_id)
+    def job():
+        with run_lock:
+            run_once()
+        # The run is marked by run_once alone, the update check runs in the
+        # background and cannot delay or fail it
+        update_checker.start()
 
-            check_for_updates()
-            sleep(60)  # Run only once
-        else:
-            sleep(60)
+    scheduler.run_forever(job)
@@ -0,0 +1,68 @@
+import unittest
+import datetime
+import tempfile
+import threading
+import sys
+import os
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+from AccountDaemon import AccountDaemon
+from Scheduler import Scheduler, daily_expression
+
+
+class AccountDaemonTest(unittest.TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.schedulers = {}
+        for name in ("alice", "bob", "carol"):
+            scheduler = Scheduler(
+                [daily_expression(3, 0)],
+                os.path.join(tmp_dir.name, f"scheduler_state_{name}.json"),
+            )
+            # Missed yesterday's run, so the account is due now
+            scheduler.last_run = datetime.datetime.now() - datetime.timedelta(days=2)
+            self.schedulers[name] = scheduler
+
+    def test_dispatch_isolates_account_errors(self):
+        ran = []
+
+        def job(name):
+            ran.append(name)
+            if name == "bob":
+                raise SystemExit(1)
+
+        daemon = AccountDaemon(self.schedulers, job, max_workers=2)
+        daemon.dispatch(datetime.datetime.now())
+        # Waits for the workers, which run the done callbacks before exiting
+        daemon.pool.shutdown(wait=True)
+
+        self.assertEqual(sorted(ran), ["alice", "bob", "carol"])
+        self.assertEqual(daemon.running, set())
+        now = datetime.datetime.now()
+        # Every account, including the failed one, waits for its next fire time
+        self.assertTrue(all(fire > now for fire in daemon.next_fires.values()))
+        # Only the successful runs are persisted
+        self.assertTrue(os.path.exists(self.schedulers["alice"].path))
+        self.assertFalse(os.path.exists(self.schedulers["bob"].path))
+
+    def test_running_account_is_not_dispatched_twice(self):
+        release = threading.Event()
+        calls = []
+
+        def job(name):
+            calls.append(name)
+            release.wait(5)
+
+        daemon = AccountDaemon({"alice": self.schedulers["alice"]}, job)
+        daemon.dispatch(datetime.datetime.now())
+        daemon.dispatch(datetime.datetime.now())
+        release.set()
+        daemon.pool.shutdown()
+        self.assertEqual(calls, ["alice"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -11,16 +11,15 @@ from CommandLineParser import CommandLineParser
 
 class CommandLineParserTest(unittest.TestCase):
     def setUp(self):
-        # Patch configparser to avoid writing to disk
-        patcher = patch("CommandLineParser.configparser.ConfigParser")
+        # Patch the settings file to avoid writing to disk
+        patcher = patch("CommandLineParser.SettingsFile")
         self.addCleanup(patcher.stop)
-        self.mock_config = patcher.start()()
-        self.mock_config.read.return_value = None
+        self.mock_settings = patcher.start()()
 
     def test_parse_args_with_api_token(self):
         test_args = ["prog", "-a", "test-token"]
         with patch.object(sys, "argv", test_args), patch(
-            "CommandLineParser.keyring.set_password"
+            "keyring.set_password"
         ) as mock_set_password:
             parser = CommandLineParser()
             self.assertEqual(parser.args.api, "test-token")
@@ -35,6 +34,10 @@ class CommandLineParserTest(unittest.TestCase):
             self.assertEqual(parser.args.p1, 3)
             self.assertEqual(parser.args.p2, 5)
             self.assertEqual(parser.args.p3, 7)
+        self.mock_settings.set.assert_any_call("p1_tasks", 3)
+        self.mock_settings.set.assert_any_call("p3_tasks", 7)
+        # All flags are saved in one write
+        self.mock_settings.save.assert_called_once()
 
     def test_parse_args_with_run_time(self):
         test_args = ["prog", "-hh", "10", "-mm", "30"]
@@ -64,9 +67,20 @@ class CommandLineParserTest(unittest.TestCase):
             parser = CommandLineParser()
             self.assertTrue(parser.args.debug)
 
+    def test_once_does_not_prompt(self):
+        for flag, arg in (("-o", "once"), ("-s", "status")):
+            with self.subTest(flag=flag):
+                with patch.object(sys, "argv", ["prog", flag]), patch(
+                    "builtins.input"
+                ) as mock:
+                    parser = CommandLineParser()
+                    parser.user_input()
+                self.assertTrue(getattr(parser.args, arg))
+                mock.assert_not_called()
+
     def test_user_input_configure(self):
         user_inputs = iter(
-            ["y", "n", "api-token", "2", "3", "4", "12", "34", "5", "60", "n", "n"]
+            ["y", "n", "api-token", "2", "3", "4", "12", "34", "5", "60", "n", "n", "n"]
         )
         with patch("builtins.input", lambda prompt: next(user_inputs)), patch(
             "sys.exit"
@@ -77,6 +91,37 @@ class CommandLineParserTest(unittest.TestCase):
                 parser.user_input()
                 mock_parse_args.assert_called_with(True)
 
+    def test_user_input_configure_webhook(self):
+        user_inputs = iter(
+            ["y", "n", "api-token", "2", "3", "4", "12", "34", "5", "60", "n"]
+            + ["y", "8080", "client-secret", "n"]
+        )
+        with patch("builtins.input", lambda prompt: next(user_inputs)), patch(
+            "sys.exit"
+        ):
+            parser = CommandLineParser()
+            parser.args.api = None
+            with patch.object(CommandLineParser, "parse_args"):
+                parser.user_input()
+        self.assertEqual(parser.args.webhook, "8080")
+        self.assertEqual(parser.args.webhook_secret, "client-secret")
+
+    def test_reset_writes_once(self):
+        test_args = ["prog", "-w", "8080", "-r"]
+        with patch.object(sys, "argv", test_args), patch("sys.exit") as mock_exit:
+            CommandLineParser()
+        self.mock_settings.set.assert_called_once_with("webhook_port", 8080)
+        self.mock_settings.reset.assert_called_once()
+        self.mock_settings.save.assert_called_once()
+        mock_exit.assert_called_with(0)
+
+    def test_invalid_value_is_not_saved(self):
+        test_args = ["prog", "-hh", "25"]
+        self.mock_settings.save.side_effect = ValueError("run_hour")
+        with patch.object(sys, "argv", test_args), patch("sys.exit") as mock_exit:
+            CommandLineParser()
+        mock_exit.assert_called_with(1)
+
 
 if __name__ == "__main__":
     unittest.main()
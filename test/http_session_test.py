@@ -0,0 +1,67 @@
+import unittest
+from unittest.mock import patch
+import httpx
+import requests
+import sys
+import os
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+import http_session
+
+
+class HttpSessionTest(unittest.TestCase):
+    def setUp(self):
+        self.addCleanup(http_session.configure)
+
+    def test_shared_session_is_reused_until_reconfigured(self):
+        session = http_session.get_session()
+        self.assertIs(http_session.get_session(), session)
+        http_session.configure(pool_size=4)
+        self.assertIsNot(http_session.get_session(), session)
+
+    def test_session_settings(self):
+        http_session.configure(pool_size=4, timeout=5, proxy="http://proxy:3128")
+        session = http_session.get_session()
+        adapter = session.get_adapter("https://api.todoist.com")
+        self.assertEqual(adapter._pool_maxsize, 4)
+        self.assertEqual(adapter.timeout, 5)
+        self.assertEqual(session.proxies["https"], "http://proxy:3128")
+        self.assertIn("gzip", session.headers["Accept-Encoding"])
+
+    def test_default_timeout(self):
+        http_session.configure(timeout=5)
+        adapter = http_session.get_session().get_adapter("https://api.todoist.com")
+        request = requests.Request("GET", "https://example.com").prepare()
+        with patch("requests.adapters.HTTPAdapter.send") as mock_send:
+            mock_send.return_value.status_code = 200
+            adapter.send(request)
+            adapter.send(request, timeout=1)
+        self.assertEqual(mock_send.call_args_list[0].kwargs["timeout"], 5)
+        self.assertEqual(mock_send.call_args_list[1].kwargs["timeout"], 1)
+
+    def test_api_url_rewrite(self):
+        http_session.configure(api_url="http://127.0.0.1:8765/")
+        self.assertEqual(
+            http_session.rewrite_url("https://api.todoist.com/api/v1/sync"),
+            "http://127.0.0.1:8765/api/v1/sync",
+        )
+        self.assertEqual(
+            http_session.rewrite_url("https://api.github.com/repos"),
+            "https://api.github.com/repos",
+        )
+        request = httpx.Request("GET", "https://api.todoist.com/api/v1/tasks")
+        http_session.rewrite_request(request)
+        self.assertEqual(str(request.url), "http://127.0.0.1:8765/api/v1/tasks")
+        self.assertEqual(request.headers["Host"], "127.0.0.1:8765")
+
+    def test_client_settings(self):
+        http_session.configure(pool_size=3, timeout=7)
+        with http_session.new_client() as client:
+            self.assertEqual(client.timeout.read, 7)
+            self.assertEqual(client.headers["Accept-Encoding"], "gzip, deflate")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+import unittest
+from unittest.mock import MagicMock, patch
+from types import SimpleNamespace
+import datetime
+import tempfile
+import sys
+import os
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+from Journal import Journal
+from planner import Change
+from SyncWriter import SyncWriter
+from todoist_prioritizer import apply_journaled, apply_plan
+
+TODAY = datetime.date(2024, 5, 1)
+
+
+class JournalTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.journal = Journal(os.path.join(directory.name, "journal.jsonl"))
+        self.tasks = [
+            SimpleNamespace(id=str(i), content=f"data{i}", priority=1) for i in range(3)
+        ]
+        self.plan = [
+            Change(self.tasks[0], "update", {"priority": 4}, "Promoted data0"),
+            Change(self.tasks[1], "update", {"due_string": "today at 18:00"}),
+            Change(self.tasks[1], "move", {"project_id": "parent"}),
+        ]
+
+    def test_pending_returns_unfinished_changes(self):
+        self.assertEqual(self.journal.pending(TODAY), [])
+        self.journal.begin(self.plan, TODAY)
+        self.journal.complete([self.plan[0].id])
+        pending = self.journal.pending(TODAY)
+        self.assertEqual(
+            [change.id for change in pending], [c.id for c in self.plan[1:]]
+        )
+        self.assertEqual(pending[1].task.id, "1")
+        self.assertEqual(pending[1].fields, {"project_id": "parent"})
+
+    def test_truncated_line_is_ignored(self):
+        self.journal.begin(self.plan, TODAY)
+        with open(self.journal.path, "a") as journal_file:
+            journal_file.write('{"done": ["')
+        self.assertEqual(len(self.journal.pending(TODAY)), 3)
+
+    def test_journal_of_an_earlier_day_is_discarded(self):
+        self.journal.begin(self.plan, TODAY)
+        self.assertEqual(self.journal.pending(TODAY + datetime.timedelta(days=1)), [])
+        self.assertFalse(os.path.exists(self.journal.path))
+
+    def test_resume_replays_only_unfinished_changes(self):
+        api = MagicMock()
+        api.update_task.side_effect = [None, KeyboardInterrupt()]
+        make_plan = MagicMock(return_value=self.plan)
+        with patch("todoist_prioritizer.api_token", api):
+            # The process is interrupted at the second change
+            with self.assertRaises(KeyboardInterrupt):
+                apply_journaled(make_plan, self.journal, None)
+            api.reset_mock(side_effect=True)
+            apply_journaled(make_plan, self.journal, None)
+        make_plan.assert_called_once()
+        api.update_task.assert_called_once_with(
+            task_id="1", due_string="today at 18:00"
+        )
+        api.move_task.assert_called_once_with(task_id="1", project_id="parent")
+        self.assertFalse(os.path.exists(self.journal.path))
+
+    def test_replay_reuses_sync_command_uuids(self):
+        self.journal.begin(self.plan)
+        writer = SyncWriter("token")
+
+        def mock_sync_request(token, data):
+            return {"sync_status": {c["uuid"]: "ok" for c in data["commands"]}}
+
+        with patch("SyncWriter.sync_request", side_effect=mock_sync_request) as mock:
+            apply_journaled(MagicMock(), self.journal, writer)
+        commands = mock.call_args.args[1]["commands"]
+        self.assertEqual([c["uuid"] for c in commands], [c.id for c in self.plan])
+
+    def test_merged_move_completes_when_both_commands_succeed(self):
+        plan = [
+            Change(
+                self.tasks[0],
+                "move",
+                {"due_string": "today at 18:00", "project_id": "parent"},
+            )
+        ]
+        self.journal.begin(plan)
+        update_id, move_id = [operation[0] for operation in plan[0].operations()]
+        writer = SyncWriter("token")
+        responses = [
+            {"sync_status": {update_id: {"error": "failed"}, move_id: "ok"}},
+            {"sync_status": {update_id: "ok", move_id: "ok"}},
+        ]
+        with patch("SyncWriter.sync_request", side_effect=responses) as mock:
+            self.assertEqual(apply_plan(plan, writer, self.journal), {"0"})
+            self.assertEqual(len(self.journal.pending()), 1)
+            apply_journaled(MagicMock(), self.journal, writer)
+        # The replay sends the same command uuids
+        for call in mock.call_args_list:
+            commands = call.args[1]["commands"]
+            self.assertEqual(
+                [c["type"] for c in commands], ["item_update", "item_move"]
+            )
+            self.assertEqual([c["uuid"] for c in commands], [update_id, move_id])
+        self.assertFalse(os.path.exists(self.journal.path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+import io
+import json
+import logging
+import threading
+import sys
+import os
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+import logging_setup
+from logging_setup import configure_logging, stop_logging
+
+
+class Counted:
+    def __init__(self):
+        self.formatted = 0
+
+    def __str__(self):
+        self.formatted += 1
+        return "counted"
+
+
+class LoggingSetupTest(unittest.TestCase):
+    def setUp(self):
+        level = logging.getLogger().level
+        self.addCleanup(logging.getLogger().setLevel, level)
+        self.addCleanup(stop_logging)
+        self.stream = io.StringIO()
+
+    def test_text_output(self):
+        configure_logging(logging.INFO, stream=self.stream)
+        logging.info("Rescheduled %s for today", "data1")
+        stop_logging()
+        self.assertRegex(
+            self.stream.getvalue(),
+            r"^\d\d\.\d\d\.\d{4} [\d:]{8} - INFO - Rescheduled data1 for today\n$",
+        )
+
+    def test_json_output(self):
+        configure_logging(logging.INFO, json_output=True, stream=self.stream)
+        logging.warning("Failed to change %s", "data1")
+        stop_logging()
+        entry = json.loads(self.stream.getvalue())
+        self.assertEqual(entry["level"], "WARNING")
+        self.assertEqual(entry["message"], "Failed to change data1")
+        self.assertIn("time", entry)
+
+    def test_disabled_records_are_not_formatted(self):
+        configure_logging(logging.INFO, stream=self.stream)
+        disabled, enabled = Counted(), Counted()
+        logging.debug("%s", disabled)
+        logging.info("%s", enabled)
+        stop_logging()
+        self.assertEqual(disabled.formatted, 0)
+        self.assertGreater(enabled.formatted, 0)
+        self.assertEqual(self.stream.getvalue().count("counted"), 1)
+
+    def test_output_is_written_by_the_listener_thread(self):
+        threads = []
+
+        class Stream(io.StringIO):
+            def write(self, text):
+                threads.append(threading.current_thread())
+                return super().write(text)
+
+        configure_logging(logging.INFO, stream=Stream())
+        logging.info("Reset")
+        stop_logging()
+        self.assertTrue(threads)
+        self.assertNotIn(threading.main_thread(), threads)
+
+    def test_reconfigure_replaces_handler(self):
+        configure_logging(logging.INFO, stream=io.StringIO())
+        configure_logging(logging.DEBUG, stream=self.stream)
+        logging.debug("Sorted tasks")
+        stop_logging()
+        self.assertEqual(self.stream.getvalue().count("Sorted tasks"), 1)
+        self.assertIsNone(logging_setup.queue_handler)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+import json
+import tempfile
+import urllib.request
+import sys
+import os
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+from metrics import Metrics, endpoint_name
+
+
+class MetricsTest(unittest.TestCase):
+    def setUp(self):
+        self.metrics = Metrics(buckets=(0.1, 1))
+
+    def test_endpoint_name(self):
+        self.assertEqual(
+            endpoint_name(
+                "POST", "https://api.todoist.com/api/v1/tasks/6X7rM8997g3RQmvh/move"
+            ),
+            "POST /api/v1/tasks/{id}/move",
+        )
+        self.assertEqual(
+            endpoint_name("GET", "https://api.todoist.com/api/v1/tasks?cursor=abc123"),
+            "GET /api/v1/tasks",
+        )
+
+    def test_record_request(self):
+        self.metrics.record_request("GET", "https://x/api/v1/tasks", 200, 0.05)
+        self.metrics.record_request("GET", "https://x/api/v1/tasks", 503, 2)
+        self.metrics.record_request("GET", "https://x/api/v1/tasks", None, 0.5)
+        text = self.metrics.to_prometheus()
+        self.assertIn(
+            'todoist_prioritizer_api_requests_total{endpoint="GET /api/v1/tasks",status="503"} 1',
+            text,
+        )
+        self.assertIn(
+            'todoist_prioritizer_api_errors_total{endpoint="GET /api/v1/tasks"} 2', text
+        )
+        histogram = 'todoist_prioritizer_api_request_duration_seconds_bucket{endpoint="GET /api/v1/tasks",le='
+        self.assertIn(histogram + '"0.1"} 1', text)
+        self.assertIn(histogram + '"1"} 2', text)
+        self.assertIn(histogram + '"+Inf"} 3', text)
+        self.assertIn(
+            "# TYPE todoist_prioritizer_api_request_duration_seconds histogram", text
+        )
+
+    def test_run_phases_and_labels(self):
+        with self.metrics.labels(account="alice"):
+            with self.assertRaises(SystemExit):
+                with self.metrics.run():
+                    with self.metrics.phase("fetch"):
+                        pass
+                    raise SystemExit(1)
+        samples = self.metrics.to_dict()
+        self.assertEqual(
+            samples["runs_total"],
+            [{"labels": {"account": "alice", "result": "failed"}, "value": 1}],
+        )
+        self.assertEqual(
+            samples["phase_duration_seconds"][0]["labels"],
+            {"account": "alice", "phase": "fetch"},
+        )
+        # Labels only apply inside the block
+        self.metrics.inc("runs_total", result="ok")
+        self.assertEqual(samples["runs_total"][0]["labels"]["account"], "alice")
+        self.assertEqual(
+            self.metrics.to_dict()["runs_total"][1]["labels"], {"result": "ok"}
+        )
+
+    def test_write_json_and_serve(self):
+        self.metrics.inc("tasks_changed_total", 3)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "metrics.json")
+            self.metrics.write_json(path)
+            with open(path) as metrics_file:
+                self.assertEqual(
+                    json.load(metrics_file)["tasks_changed_total"][0]["value"], 3
+                )
+        server = self.metrics.serve("127.0.0.1", 0)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        with urllib.request.urlopen(url) as response:
+            self.assertIn(
+                "todoist_prioritizer_tasks_changed_total 3", response.read().decode()
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+import tempfile
+import sys
+import os
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "bench"))
+)
+import http_session
+from generate_account import generate_tasks
+from mock_todoist import MockTodoist
+from run_bench import run_pipeline
+from Settings import Settings
+
+
+def make_settings(write_mode, incremental_sync):
+    return Settings(
+        write_mode=write_mode, incremental_sync=incremental_sync, max_workers=4
+    )
+
+
+class MockTodoistTest(unittest.TestCase):
+    def setUp(self):
+        self.addCleanup(http_session.configure)
+        self.start_mock()
+
+    def start_mock(self):
+        self.mock = MockTodoist(generate_tasks(300))
+        self.mock.start()
+        self.addCleanup(self.mock.stop)
+        http_session.configure(api_url=self.mock.url, rate_limit=10**9)
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.state_path = os.path.join(tmp_dir.name, "sync_state.bin")
+
+    def priorities(self):
+        return [
+            sum(item["priority"] == 5 - level for item in self.mock.items.values())
+            for level in (1, 2, 3)
+        ]
+
+    def test_pipeline_against_mock(self):
+        for write_mode in ("sync", "rest"):
+            for incremental_sync in (True, False):
+                with self.subTest(write_mode=write_mode, sync=incremental_sync):
+                    self.start_mock()
+                    self.assertEqual(self.priorities(), [3, 7, 12])
+                    settings = make_settings(write_mode, incremental_sync)
+                    self.assertGreater(run_pipeline(settings, self.state_path), 0)
+                    # The levels reach the default targets
+                    self.assertEqual(self.priorities(), [5, 10, 15])
+                    # A second pass finds nothing to do
+                    self.assertEqual(run_pipeline(settings, self.state_path), 0)
+
+    def test_rejects_unknown_sync_token(self):
+        status, body = self.mock.sync({"sync_token": "999"})
+        self.assertEqual(status, 400)
+        self.assertEqual(body["error_extra"]["argument"], "sync_token")
+
+
+if __name__ == "__main__":
+    unittest.main()
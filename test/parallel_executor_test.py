@@ -0,0 +1,68 @@
+import unittest
+from unittest.mock import MagicMock
+from types import SimpleNamespace
+import threading
+import sys
+import os
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+from ParallelExecutor import ParallelExecutor
+
+
+class ParallelExecutorTest(unittest.TestCase):
+    def setUp(self):
+        self.tasks = [
+            SimpleNamespace(id=str(i), content=f"data{i}") for i in range(1, 21)
+        ]
+
+    def test_flush_runs_all_updates(self):
+        api = MagicMock()
+        executor = ParallelExecutor(api, max_workers=4)
+        for task in self.tasks:
+            executor.update_task(task, priority=4)
+
+        self.assertEqual(executor.flush(), {})
+        self.assertEqual(api.update_task.call_count, len(self.tasks))
+        self.assertEqual(executor.operations, [])
+
+    def test_concurrency_limit(self):
+        lock = threading.Lock()
+        running = []
+        peak = []
+
+        def update_task(**kwargs):
+            with lock:
+                running.append(kwargs["task_id"])
+                peak.append(len(running))
+            threading.Event().wait(0.01)
+            with lock:
+                running.remove(kwargs["task_id"])
+
+        api = MagicMock()
+        api.update_task.side_effect = update_task
+        executor = ParallelExecutor(api, max_workers=3)
+        for task in self.tasks:
+            executor.update_task(task, priority=4)
+        executor.flush()
+        self.assertLessEqual(max(peak), 3)
+
+    def test_failed_task_operations(self):
+        api = MagicMock()
+        api.update_task.side_effect = [Exception("HTTP 500"), None]
+        executor = ParallelExecutor(api, max_workers=1)
+        failed_update = executor.update_task(self.tasks[0], priority=4)
+        skipped_move = executor.move_task(self.tasks[0], "parent")
+        executor.update_task(self.tasks[1], priority=4)
+
+        with self.assertLogs(level="ERROR") as logs:
+            failed = executor.flush()
+        self.assertEqual(set(failed), {failed_update, skipped_move})
+        api.move_task.assert_not_called()
+        self.assertIn("update_task failed for data1", logs.output[0])
+        self.assertIn("move_task failed for data1", logs.output[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
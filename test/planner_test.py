@@ -0,0 +1,309 @@
+import unittest
+from unittest.mock import patch
+from types import SimpleNamespace
+import datetime
+import sys
+import os
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+from planner import plan_promotions, plan_today_fill, plan_parent_move, plan_run
+from planner import select_oldest, iter_oldest, merge_pools, TodayLedger
+from planner import index_tasks, coalesce_plan, QuotaLedger, write_calls, Change
+from TaskRecord import TaskRecord, Duration, Due
+
+
+def make_task(
+    id, priority, created_at, duration=None, unit="minute", project="inbox", labels=()
+):
+    return SimpleNamespace(
+        id=id,
+        content=f"data{id}",
+        priority=priority,
+        created_at=created_at,
+        duration=(
+            None if duration is None else SimpleNamespace(amount=duration, unit=unit)
+        ),
+        project_id=project,
+        labels=list(labels),
+    )
+
+
+class PlannerTest(unittest.TestCase):
+    def setUp(self):
+        self.start = datetime.datetime(2024, 6, 5, 18, 0)
+
+    def test_select_oldest(self):
+        tasks = (
+            make_task(str(i), 1, f"20{10 + (i * 7) % 15}-01-01T00:00:00.000000Z")
+            for i in range(15)
+        )
+        oldest = select_oldest(tasks, 3)
+        self.assertEqual([t.created_at[:4] for t in oldest], ["2010", "2011", "2012"])
+        self.assertEqual(select_oldest([], 3), [])
+        self.assertEqual(select_oldest([make_task("1", 1, "2020-01-01")], 0), [])
+
+    def test_iter_oldest(self):
+        tasks = [
+            make_task("1", 1, "2022-01-01T00:00:00.000000Z"),
+            make_task("2", 1, "2019-10-02T15:15:42.000000Z"),
+            make_task(
+                "3", 1, datetime.datetime(2021, 1, 1, tzinfo=datetime.timezone.utc)
+            ),
+        ]
+        self.assertEqual([t.id for t in iter_oldest(tasks)], ["2", "3", "1"])
+
+    def test_plan_promotions_cascade(self):
+        buckets = {
+            "P1": [make_task("1", 4, "2020-01-01T00:00:00.000000Z")],
+            "P2": [
+                make_task("2", 3, "2022-01-01T00:00:00.000000Z"),
+                make_task("3", 3, "2021-01-01T00:00:00.000000Z"),
+            ],
+            "P3": [make_task("4", 2, "2023-01-01T00:00:00.000000Z")],
+            "P4": [
+                make_task("5", 1, "2019-01-01T00:00:00.000000Z"),
+                make_task("6", 1, "2018-01-01T00:00:00.000000Z"),
+            ],
+        }
+        plan = plan_promotions(buckets, {1: 2, 2: 2, 3: 1})
+
+        # P2 -> P1 takes the oldest P2 task, P3 -> P2 and P4 -> P3 follow
+        self.assertEqual(
+            [(c.task.id, c.fields["priority"]) for c in plan],
+            [("3", 4), ("4", 3), ("6", 2)],
+        )
+        self.assertEqual([t.id for t in buckets["P1"]], ["1", "3"])
+        self.assertEqual([t.id for t in buckets["P4"]], ["5"])
+        # The planner does not touch the tasks
+        self.assertEqual(buckets["P1"][1].priority, 3)
+
+    def test_plan_promotions_quotas(self):
+        buckets = {
+            "P1": [make_task("1", 4, "2020-01-01T00:00:00Z", project="work")],
+            "P2": [
+                make_task("2", 3, "2019-01-01T00:00:00Z", project="work"),
+                make_task("3", 3, "2019-06-01T00:00:00Z", labels=["home"]),
+                make_task("4", 3, "2019-07-01T00:00:00Z", labels=["home"]),
+                make_task("5", 3, "2021-01-01T00:00:00Z"),
+            ],
+            "P3": [make_task("6", 2, "2018-01-01T00:00:00Z", project="work")],
+            "P4": [],
+        }
+        quotas = {"work": {1: 1, 2: 1}, "@home": {1: 1}}
+        plan = plan_promotions(buckets, {1: 4, 2: 4, 3: 0}, quotas)
+
+        # work already has its P1 task and home takes one, the rest is global
+        self.assertEqual(
+            [(c.task.id, c.fields["priority"]) for c in plan],
+            [("3", 4), ("5", 4)],
+        )
+        # work still has its P2 task, so its P3 task is not promoted
+        self.assertEqual([t.id for t in buckets["P2"]], ["2", "4"])
+
+    def test_quota_ledger_drops_full_groups(self):
+        buckets = {
+            "P1": [make_task("1", 4, "2020-01-01T00:00:00Z", project="work")],
+            "P2": [
+                make_task(str(i), 3, f"20{10 + i}-01-01T00:00:00Z", project="work")
+                for i in range(2, 8)
+            ]
+            + [make_task("8", 3, "2022-01-01T00:00:00Z")],
+            "P3": [],
+            "P4": [],
+        }
+        ledger = QuotaLedger({"work": {1: 1}}, buckets)
+        with patch.object(ledger, "allows", wraps=ledger.allows) as allows:
+            selected = ledger.select(buckets["P2"], 1, 2)
+        self.assertEqual([t.id for t in selected], ["8"])
+        # One look at the full work group and one at the inbox group
+        self.assertEqual(allows.call_count, 2)
+
+    def test_index_tasks(self):
+        tasks = [
+            make_task("1", 3, "2021-01-01T00:00:00Z", labels=["b", "a"]),
+            make_task("2", 3, "2020-01-01T00:00:00Z", labels=["a", "b"]),
+            make_task("3", 2, "2019-01-01T00:00:00Z", labels=["a", "b"]),
+        ]
+        groups = index_tasks(tasks)
+        self.assertEqual([t.id for t in groups["inbox", ("a", "b"), 3]], ["2", "1"])
+        self.assertEqual(len(groups), 2)
+
+    def test_plan_today_fill(self):
+        today = [make_task("1", 4, "2020-01-01T00:00:00.000000Z", 30)]
+        pool = [
+            make_task("2", 4, "2020-01-01T00:00:00.000000Z"),
+            make_task("3", 4, "2020-01-01T00:00:00.000000Z", 1, "hour"),
+            make_task("4", 4, "2020-01-01T00:00:00.000000Z", 15),
+            make_task("5", 4, "2020-01-01T00:00:00.000000Z"),
+        ]
+        ledger = TodayLedger(1, 90, self.start)
+        ledger.add_today(today)
+        plan = plan_today_fill(pool, ledger)
+
+        self.assertEqual([c.task.id for c in plan], ["2", "3"])
+        self.assertEqual(plan[0].fields, {"due_string": "today at 18:00"})
+        self.assertEqual(plan[1].fields["due_string"], "today at 19:00")
+        self.assertEqual(
+            (ledger.count, ledger.minutes, ledger.next_start),
+            (1, 90, datetime.datetime(2024, 6, 5, 19, 0)),
+        )
+
+    def test_plan_today_fill_pools_in_priority_order(self):
+        pools = [
+            [make_task("1", 4, "2019-01-01T00:00:00.000000Z")],
+            [make_task("2", 3, "2019-01-01T00:00:00.000000Z")],
+            [make_task("3", 2, "2019-01-01T00:00:00.000000Z")],
+        ]
+        ledger = TodayLedger(2, 0, self.start)
+        plan = plan_today_fill(merge_pools(pools), ledger)
+
+        self.assertEqual([c.task.id for c in plan], ["1", "2"])
+        # Tasks without duration do not move the reschedule time
+        self.assertEqual(ledger.next_start, self.start)
+
+    def test_plan_today_fill_stops_after_overshoot(self):
+        pulled = []
+
+        def pool(*tasks):
+            for task in tasks:
+                pulled.append(task.id)
+                yield task
+
+        pools = [
+            pool(make_task("1", 4, "2020-01-01T00:00:00.000000Z")),
+            # 60 minutes overshoots the 45 minute target
+            pool(make_task("2", 3, "2020-01-01T00:00:00.000000Z", 60)),
+            pool(make_task("3", 2, "2020-01-01T00:00:00.000000Z", 15)),
+        ]
+        plan = plan_today_fill(merge_pools(pools), TodayLedger(1, 45, self.start))
+
+        self.assertEqual([c.task.id for c in plan], ["1", "2"])
+        # The pool after the targets were met is never started
+        self.assertEqual(pulled, ["1", "2"])
+
+    def test_plan_today_fill_full_ledger_pulls_nothing(self):
+        ledger = TodayLedger(1, 30, self.start)
+        ledger.add_today([make_task("1", 4, "2020-01-01T00:00:00.000000Z", 45)])
+        ledger.add_today([make_task("2", 4, "2020-01-01T00:00:00.000000Z")])
+        tasks = iter([make_task("3", 4, "2020-01-01T00:00:00.000000Z")])
+
+        self.assertEqual(plan_today_fill(tasks, ledger), [])
+        self.assertEqual(len(list(tasks)), 1)
+
+    def test_plan_parent_move(self):
+        plan = plan_parent_move(
+            make_task("1", 4, "2020-01-01T00:00:00.000000Z"), "parent"
+        )
+        self.assertEqual([c.kind for c in plan], ["move"])
+        self.assertEqual(plan[0].fields["duration"], 60)
+        self.assertEqual(plan[0].fields["project_id"], "parent")
+        # Written as an update then the move, with stable operation ids
+        operations = plan[0].operations()
+        self.assertEqual([kind for _, kind, _, _ in operations], ["update", "move"])
+        self.assertEqual(operations[1][2], {"project_id": "parent"})
+        self.assertNotIn("project_id", operations[0][2])
+        self.assertEqual(operations[1][0], plan[0].id)
+        self.assertEqual(operations[0][0], plan[0].operations()[0][0])
+        self.assertIsNone(operations[0][3])
+
+    def test_coalesce_plan_merges_changes_per_task(self):
+        task = make_task("1", 3, "2020-01-01T00:00:00.000000Z")
+        other = make_task("2", 1, "2020-01-01T00:00:00.000000Z")
+        plan = [
+            Change(task, "update", {"priority": 4}, "Promoted\n"),
+            Change(other, "update", {"priority": 2}, "Promoted other\n"),
+            Change(task, "update", {"due_string": "today at 18:00"}, "Rescheduled\n"),
+        ] + plan_parent_move(task, "parent")
+        coalesced = coalesce_plan(plan, self.start.date())
+
+        self.assertEqual(
+            [(c.task.id, c.kind) for c in coalesced], [("1", "move"), ("2", "update")]
+        )
+        self.assertEqual(
+            coalesced[0].fields,
+            {
+                "priority": 4,
+                "due_string": "today at 18:00",
+                "duration": 60,
+                "duration_unit": "minute",
+                "project_id": "parent",
+            },
+        )
+        self.assertEqual(
+            coalesced[0].message,
+            "Promoted\nRescheduled\nMoved data1 to project: 'parent'\n",
+        )
+        self.assertEqual((write_calls(plan), write_calls(coalesced)), (5, 3))
+
+    def test_coalesce_plan_drops_unchanged_fields(self):
+        record = TaskRecord(
+            "1",
+            "data1",
+            4,
+            0.0,
+            Duration(60, "minute"),
+            Due(self.start.date(), datetime.time(18, 0)),
+            "parent",
+        )
+        task = make_task("2", 4, "2020-01-01T00:00:00.000000Z", 2, "hour")
+        task.due = SimpleNamespace(
+            date=datetime.datetime(2024, 6, 5, 9, 30), string="today at 9:30"
+        )
+        plan = [
+            # Already P1, due today at 18:00 for an hour and in the parent project
+            Change(record, "update", {"priority": 4}, "Promoted\n"),
+            Change(
+                record,
+                "update",
+                {
+                    "due_string": "today at 18:00",
+                    "duration": 60,
+                    "duration_unit": "minute",
+                },
+            ),
+            Change(record, "move", {"project_id": "parent"}, "Moved\n"),
+            # Only the due time changes
+            Change(
+                task,
+                "update",
+                {
+                    "due_string": "today at 19:00",
+                    "duration": 120,
+                    "duration_unit": "minute",
+                },
+                "Rescheduled\n",
+            ),
+            Change(task, "move", {"project_id": "inbox"}, "Moved\n"),
+        ]
+        coalesced = coalesce_plan(plan, self.start.date())
+
+        self.assertEqual(len(coalesced), 1)
+        self.assertEqual(coalesced[0].task, task)
+        self.assertEqual(coalesced[0].kind, "update")
+        self.assertEqual(coalesced[0].fields, {"due_string": "today at 19:00"})
+        self.assertEqual(coalesced[0].message, "Rescheduled\n")
+        # Due on another day, the write is kept
+        self.assertEqual(
+            len(
+                coalesce_plan(plan[:2], self.start.date() + datetime.timedelta(days=1))
+            ),
+            1,
+        )
+
+    def test_plan_run_does_not_modify_snapshot(self):
+        p2_task = make_task("2", 3, "2021-01-01T00:00:00.000000Z")
+        snapshot = {"P1": [], "P2": [p2_task], "P3": [], "P4": [], "today": []}
+        plan = plan_run(snapshot, {1: 1, 2: 0, 3: 0}, 1, 0, "parent", self.start)
+
+        # Promoted, rescheduled and moved in one change
+        self.assertEqual([(c.task.id, c.kind) for c in plan], [("2", "move")])
+        self.assertEqual(plan[0].fields["priority"], 4)
+        self.assertEqual(plan[0].fields["project_id"], "parent")
+        self.assertEqual(snapshot["P1"], [])
+        self.assertEqual(snapshot["P2"], [p2_task])
+
+
+if __name__ == "__main__":
+    unittest.main()
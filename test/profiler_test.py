@@ -0,0 +1,47 @@
+import unittest
+import pstats
+import tempfile
+import sys
+import os
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+from profiler import profile_run
+from planner import select_oldest
+from types import SimpleNamespace
+
+
+class ProfilerTest(unittest.TestCase):
+    def test_profile_run(self):
+        tasks = [
+            SimpleNamespace(id=str(i), created_at=f"20{10 + i % 15}-01-01T00:00:00Z")
+            for i in range(1000)
+        ]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            paths = profile_run(lambda: select_oldest(tasks, 5), tmp_dir)
+            self.assertEqual(
+                set(os.listdir(tmp_dir)), set(map(os.path.basename, paths.values()))
+            )
+            # The dump is a regular cProfile dump
+            pstats.Stats(paths["profile"])
+            with open(paths["summary"]) as summary_file:
+                summary = summary_file.read()
+            with open(paths["allocations"]) as allocations_file:
+                self.assertIn("Top 15 allocations", allocations_file.read())
+        self.assertIn("Peak traced memory", summary)
+        self.assertIn("select_oldest (planner.py:", summary)
+        self.assertIn("created_at_key (planner.py:", summary)
+
+    def test_reports_are_written_when_the_run_fails(self):
+        def run():
+            raise SystemExit(1)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with self.assertRaises(SystemExit):
+                profile_run(run, os.path.join(tmp_dir, "reports"))
+            self.assertEqual(len(os.listdir(os.path.join(tmp_dir, "reports"))), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import unittest
+from types import SimpleNamespace
+import sys
+import os
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+from RequestGovernor import RequestGovernor, TokenBucket
+from RequestGovernor import is_idempotent, parse_retry_after
+
+TASK_URL = "https://api.todoist.com/api/v1/tasks/6X7rM8997g3RQmvh"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def make_response(status_code, headers=None):
+    response = SimpleNamespace(status_code=status_code, headers=headers or {})
+    response.closed = False
+    response.close = lambda: setattr(response, "closed", True)
+    return response
+
+
+class RequestGovernorTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.governor = RequestGovernor(
+            limit=10,
+            window=9,
+            burst=1,
+            max_retries=2,
+            sleep=self.clock.sleep,
+            clock=self.clock,
+        )
+
+    def send(self, responses, method="POST", url=TASK_URL):
+        responses = iter(responses)
+
+        def send():
+            response = next(responses)
+            if isinstance(response, Exception):
+                raise response
+            return response
+
+        return self.governor.send(method, url, "Bearer token", send, (OSError,))
+
+    def test_parse_retry_after(self):
+        self.assertEqual(parse_retry_after("120"), 120)
+        self.assertEqual(
+            parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT", now=1445412460), 20
+        )
+        self.assertIsNone(parse_retry_after(None))
+        self.assertIsNone(parse_retry_after("soon"))
+
+    def test_is_idempotent(self):
+        self.assertTrue(is_idempotent("GET", "https://api.todoist.com/api/v1/tasks"))
+        self.assertTrue(is_idempotent("POST", TASK_URL))
+        self.assertTrue(is_idempotent("POST", f"{TASK_URL}/move"))
+        self.assertTrue(is_idempotent("POST", "https://api.todoist.com/api/v1/sync"))
+        self.assertFalse(is_idempotent("POST", "https://api.todoist.com/api/v1/tasks"))
+
+    def test_token_bucket(self):
+        bucket = TokenBucket(rate=2, capacity=2, clock=self.clock)
+        for _ in range(4):
+            bucket.acquire(self.clock.sleep)
+        # Two requests fit in the burst, the next ones wait for the refill
+        self.assertEqual(self.clock.sleeps, [0.5, 0.5])
+        bucket.pause(10)
+        bucket.acquire(self.clock.sleep)
+        self.assertEqual(self.clock.sleeps[2], 10)
+
+    def test_retries_transient_errors(self):
+        ok = make_response(200)
+        failed = make_response(503)
+        self.assertIs(self.send([failed, OSError("reset"), ok]), ok)
+        self.assertTrue(failed.closed)
+        # Backoff waits plus one token wait per request after the burst
+        self.assertEqual(len(self.clock.sleeps), 4)
+
+    def test_gives_up_after_max_retries(self):
+        with self.assertRaises(OSError):
+            self.send([OSError("down")] * 3)
+        last = make_response(503)
+        self.assertIs(self.send([make_response(503), make_response(503), last]), last)
+
+    def test_honors_retry_after(self):
+        ok = make_response(200)
+        self.send([make_response(429, {"Retry-After": "30"}), ok])
+        self.assertIn(30, self.clock.sleeps)
+        # The pause applies to the other requests of the user
+        self.assertEqual(self.governor.bucket("Bearer token").paused_until, 30)
+
+    def test_does_not_retry_non_idempotent_requests(self):
+        failed = make_response(503)
+        url = "https://api.todoist.com/api/v1/tasks"
+        self.assertIs(self.send([failed], url=url), failed)
+        with self.assertRaises(OSError):
+            self.send([OSError("reset")], url=url)
+
+
+if __name__ == "__main__":
+    unittest.main()
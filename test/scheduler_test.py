@@ -0,0 +1,79 @@
+import unittest
+from unittest.mock import patch
+import datetime
+import tempfile
+import sys
+import os
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+from Scheduler import CronExpression, Scheduler, daily_expression
+
+
+class SchedulerTest(unittest.TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.path = os.path.join(tmp_dir.name, "scheduler_state.json")
+        # Wednesday
+        self.now = datetime.datetime(2024, 6, 5, 10, 15, 30)
+
+    def test_daily_expression(self):
+        cron = CronExpression(daily_expression("03", "00"))
+        self.assertEqual(cron.next_after(self.now), datetime.datetime(2024, 6, 6, 3, 0))
+
+    def test_cron_steps_ranges_and_lists(self):
+        cron = CronExpression("*/20 9-17 * * 1-5")
+        self.assertEqual(
+            cron.next_after(self.now), datetime.datetime(2024, 6, 5, 10, 20)
+        )
+        # Friday evening rolls over to Monday morning
+        friday = datetime.datetime(2024, 6, 7, 17, 45)
+        self.assertEqual(cron.next_after(friday), datetime.datetime(2024, 6, 10, 9, 0))
+        cron = CronExpression("0 3 1,15 * *")
+        self.assertEqual(
+            cron.next_after(self.now), datetime.datetime(2024, 6, 15, 3, 0)
+        )
+
+    def test_invalid_expression(self):
+        for expression in ("* * *", "60 * * * *", "* 25 * * *", "*/0 * * * *"):
+            with self.assertRaises(ValueError):
+                CronExpression(expression)
+
+    def test_multiple_run_times(self):
+        scheduler = Scheduler(
+            [daily_expression(3, 0), daily_expression(12, 30)], self.path
+        )
+        self.assertEqual(
+            scheduler.next_fire(self.now), datetime.datetime(2024, 6, 5, 12, 30)
+        )
+
+    def test_catch_up_missed_run(self):
+        scheduler = Scheduler([daily_expression(3, 0)], self.path)
+        scheduler.mark_run(datetime.datetime(2024, 6, 3, 3, 0, 5))
+
+        # Restarting after two missed runs catches up once
+        scheduler = Scheduler([daily_expression(3, 0)], self.path)
+        self.assertEqual(
+            scheduler.next_fire(self.now), datetime.datetime(2024, 6, 4, 3, 0)
+        )
+        scheduler.mark_run(self.now)
+        self.assertEqual(
+            scheduler.next_fire(self.now), datetime.datetime(2024, 6, 6, 3, 0)
+        )
+
+    def test_sleep_until_rechecks_wall_clock(self):
+        scheduler = Scheduler([daily_expression(3, 0)], self.path, max_sleep=60)
+        clock = iter([self.now, self.now + datetime.timedelta(hours=5), self.now])
+        with patch("Scheduler.datetime") as mock_datetime, patch(
+            "Scheduler.time.sleep"
+        ) as mock_sleep:
+            mock_datetime.datetime.now.side_effect = lambda: next(clock)
+            scheduler.sleep_until(self.now + datetime.timedelta(hours=1))
+        # The clock jumped past the fire time, e.g. after a suspend
+        mock_sleep.assert_called_once_with(60)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+import unittest
+from unittest.mock import patch
+import tempfile
+import sys
+import os
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+from Settings import Settings, SettingsFile, parse_run_times, parse_schedule
+
+CONFIG = """[DEFAULT]
+p1_tasks = 5
+parent_id = None
+write_mode = sync
+
+[USER]
+p1_tasks = 3
+parent_id = 2203306141
+incremental_sync = False
+webhook_debounce = 2.5
+"""
+
+
+class SettingsTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "config.ini")
+        with open(self.path, "w") as configfile:
+            configfile.write(CONFIG)
+
+    def test_typed_values(self):
+        settings = SettingsFile(self.path).get()
+        self.assertEqual(settings.p1_tasks, 3)
+        self.assertEqual(settings.parent_id, "2203306141")
+        self.assertFalse(settings.incremental_sync)
+        self.assertEqual(settings.webhook_debounce, 2.5)
+        # Missing keys get the defaults
+        self.assertEqual(settings.targets(), {1: 3, 2: 10, 3: 15})
+        self.assertIsNone(SettingsFile(self.path).get("DEFAULT").parent_id)
+
+    def test_invalid_values(self):
+        for key, value in (
+            ("p1_tasks", "many"),
+            ("run_hour", "24"),
+            ("task_duration", "-1"),
+            ("incremental_sync", "maybe"),
+            ("write_mode", "batch"),
+            ("quotas", "2203306141: p4=1"),
+            ("quotas", "@home p1=1"),
+            ("run_times", "25:00"),
+            ("run_times", "12"),
+            ("run_times", "12:30, 7:5"),
+            ("schedule", "0 3 * *"),
+            ("schedule", "0 3 * * 1-5; 61 * * * *"),
+            ("parent_project_id", "2203306141"),
+        ):
+            with self.subTest(key=key), self.assertRaises(ValueError):
+                Settings.from_section({key: value})
+
+    def test_schedule(self):
+        settings = Settings.from_section(
+            {"run_times": " 12:30, 7:05,", "schedule": "0 6 * * 1-5; 30 8 * * 0;"}
+        )
+        self.assertEqual(settings.run_times, "12:30, 7:05,")
+        self.assertEqual(parse_run_times(settings.run_times), [(12, 30), (7, 5)])
+        self.assertEqual(
+            parse_schedule(settings.schedule), ["0 6 * * 1-5", "30 8 * * 0"]
+        )
+
+    def test_quotas(self):
+        settings = Settings.from_section(
+            {"quotas": "2203306141: p1=2, P2=4; @home: p1=1;"}
+        )
+        self.assertEqual(
+            settings.quota_limits(), {"2203306141": {1: 2, 2: 4}, "@home": {1: 1}}
+        )
+        self.assertEqual(Settings().quota_limits(), {})
+
+    def test_parsed_once_and_reloaded_on_change(self):
+        settings_file = SettingsFile(self.path)
+        settings = settings_file.get()
+        self.assertIs(settings_file.get(), settings)
+
+        with open(self.path, "a") as configfile:
+            configfile.write("p2_tasks = 4\n")
+        os.utime(self.path, ns=(0, settings_file.mtime + 1))
+        self.assertEqual(settings_file.get().p2_tasks, 4)
+
+    def test_save_writes_once_atomically(self):
+        settings_file = SettingsFile(self.path)
+        settings_file.set("p1_tasks", 7)
+        settings_file.set("webhook_port", 8080)
+        with patch("Settings.os.replace", wraps=os.replace) as mock_replace:
+            settings_file.save()
+            settings_file.save()
+        mock_replace.assert_called_once_with(f"{self.path}.tmp", self.path)
+        settings = SettingsFile(self.path).get()
+        self.assertEqual((settings.p1_tasks, settings.webhook_port), (7, 8080))
+
+    def test_invalid_change_is_not_saved(self):
+        settings_file = SettingsFile(self.path)
+        settings_file.set("run_hour", 25)
+        with self.assertRaises(ValueError):
+            settings_file.save()
+        self.assertEqual(SettingsFile(self.path).get().run_hour, 3)
+
+    def test_reset(self):
+        settings_file = SettingsFile(self.path)
+        settings_file.reset()
+        settings_file.save()
+        settings = SettingsFile(self.path).get()
+        self.assertEqual((settings.p1_tasks, settings.parent_id), (5, None))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import unittest
+import datetime
+import importlib.util
+import sys
+import os
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "bench"))
+)
+from generate_account import generate_tasks
+from planner import plan_run
+
+HAS_NUMPY = importlib.util.find_spec("numpy") is not None
+if HAS_NUMPY:
+    from simulator import parse_range, parameter_grid, snapshot_arrays, simulate
+
+
+def replay(items, settings, days):
+    """Replay scheduled runs with plan_run, completing every task for today."""
+    from todoist_api_python.models import Task
+
+    tasks = {item["id"]: Task.from_dict(item) for item in items}
+    completed = promotions = 0
+    for _ in range(days):
+        snapshot = {f"P{level}": [] for level in (1, 2, 3, 4)}
+        for task in tasks.values():
+            snapshot[f"P{5 - task.priority}"].append(task)
+        snapshot["today"] = []
+        plan = plan_run(
+            snapshot,
+            {1: settings[0], 2: settings[1], 3: settings[2]},
+            settings[3],
+            settings[4],
+            None,
+            datetime.datetime(2024, 6, 5, 18, 0),
+        )
+        for change in plan:
+            if "priority" in change.fields:
+                change.task.priority = change.fields["priority"]
+                promotions += 1
+        for change in plan:
+            if "due_string" in change.fields and change.task.id in tasks:
+                del tasks[change.task.id]
+                completed += 1
+    levels = [0] * 4
+    for task in tasks.values():
+        levels[4 - task.priority] += 1
+    return completed, promotions, levels
+
+
+@unittest.skipUnless(HAS_NUMPY, "the simulator needs NumPy")
+class SimulatorTest(unittest.TestCase):
+    def test_parse_range(self):
+        self.assertEqual(parse_range("5"), [5])
+        self.assertEqual(parse_range("3,5,8"), [3, 5, 8])
+        self.assertEqual(parse_range("1:3"), [1, 2, 3])
+        self.assertEqual(parse_range("0:60:30"), [0, 30, 60])
+        for value in ("a", "1:2:3:4", "1:5:0"):
+            with self.subTest(value=value), self.assertRaises(ValueError):
+                parse_range(value)
+
+    def test_parameter_grid(self):
+        grid = parameter_grid(
+            {
+                "p1_tasks": [1, 2],
+                "p2_tasks": [3],
+                "p3_tasks": [4, 5, 6],
+                "number_of_tasks": [1],
+                "task_duration": [30],
+            }
+        )
+        self.assertEqual(grid["p1_tasks"].tolist(), [1, 1, 1, 2, 2, 2])
+        self.assertEqual(grid["p3_tasks"].tolist(), [4, 5, 6, 4, 5, 6])
+
+    def test_matches_planner(self):
+        """Test every combination behaves like scheduled runs of plan_run."""
+        items = generate_tasks(2000, seed=3)
+        for item in items:
+            item["due"] = None
+        combinations = [(5, 10, 15, 1, 30), (2, 3, 4, 4, 120), (0, 0, 1, 0, 0)]
+        grid = parameter_grid(
+            {
+                name: sorted({combination[i] for combination in combinations})
+                for i, name in enumerate(
+                    ("p1_tasks", "p2_tasks", "p3_tasks")
+                    + ("number_of_tasks", "task_duration")
+                )
+            }
+        )
+        days = 6
+        results = simulate(
+            snapshot_arrays(items, datetime.date(2024, 6, 5)),
+            grid,
+            days,
+            completion_rate=1.0,
+        )
+        for combination in combinations:
+            i = next(
+                i
+                for i in range(grid["p1_tasks"].size)
+                if tuple(values[i] for values in grid.values()) == combination
+            )
+            completed, promotions, levels = replay(items, combination, days)
+            with self.subTest(combination=combination):
+                self.assertEqual(results["completed"][i] * days, completed)
+                self.assertEqual(results["promotions"][i] * days, promotions)
+                self.assertEqual(
+                    [int(results[f"p{level}_final"][i]) for level in (1, 2, 3, 4)],
+                    levels,
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,136 @@
+import unittest
+from unittest.mock import patch
+import requests
+import tempfile
+import sys
+import os
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+from SyncStore import SyncStore
+from TaskRecord import TaskRecord
+
+
+def http_error(status_code, body):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = body.encode()
+    return requests.HTTPError(f"{status_code}", response=response)
+
+
+def make_item(id, content, priority=1, **fields):
+    item = {
+        "id": id,
+        "content": content,
+        "description": "",
+        "project_id": "2203306141",
+        "section_id": None,
+        "parent_id": None,
+        "labels": [],
+        "priority": priority,
+        "due": None,
+        "deadline": None,
+        "duration": None,
+        "collapsed": False,
+        "child_order": 1,
+        "responsible_uid": None,
+        "assigned_by_uid": None,
+        "added_by_uid": "1",
+        "added_at": "2021-12-11T22:36:50.000000Z",
+        "updated_at": "2021-12-11T22:36:50.000000Z",
+        "completed_at": None,
+        "checked": False,
+        "is_deleted": False,
+    }
+    item.update(fields)
+    return item
+
+
+class SyncStoreTest(unittest.TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.path = os.path.join(tmp_dir.name, "sync_state.bin")
+
+    def test_full_then_incremental_sync(self):
+        full = {
+            "full_sync": True,
+            "sync_token": "token1",
+            "items": [make_item("1", "data1"), make_item("2", "data2")],
+        }
+        delta = {
+            "full_sync": False,
+            "sync_token": "token2",
+            "items": [
+                make_item("1", "data1", priority=4),
+                make_item("2", "data2", checked=True),
+                make_item("3", "data3"),
+            ],
+        }
+        with patch("SyncStore.sync_request", side_effect=[full, delta]) as mock:
+            SyncStore("api", self.path).sync()
+            # A new store picks up the persisted sync token
+            tasks = SyncStore("api", self.path).sync()
+        self.assertEqual(mock.call_args_list[0].args[1]["sync_token"], "*")
+        self.assertEqual(mock.call_args_list[1].args[1]["sync_token"], "token1")
+        self.assertEqual({task.id: task.priority for task in tasks}, {"1": 4, "3": 1})
+
+    def test_tasks_are_copies(self):
+        store = SyncStore("api", self.path)
+        store.items = {"1": TaskRecord.from_item(make_item("1", "a"))}
+        store.tasks()[0].priority = 4
+        self.assertEqual(store.items["1"].priority, 1)
+
+    def test_rejected_token_falls_back_to_full_sync(self):
+        store = SyncStore("api", self.path)
+        store.sync_token = "expired"
+        store.items = {"9": TaskRecord.from_item(make_item("9", "stale"))}
+        full = {
+            "full_sync": True,
+            "sync_token": "token1",
+            "items": [make_item("1", "a")],
+        }
+
+        with patch(
+            "SyncStore.sync_request",
+            side_effect=[
+                http_error(
+                    400,
+                    '{"error_tag": "INVALID_ARGUMENT_VALUE", '
+                    '"error_extra": {"argument": "sync_token"}}',
+                ),
+                full,
+            ],
+        ) as mock:
+            tasks = store.sync()
+        self.assertEqual(mock.call_args.args[1]["sync_token"], "*")
+        self.assertEqual([task.id for task in tasks], ["1"])
+        self.assertEqual(store.sync_token, "token1")
+
+    def test_other_errors_keep_the_store(self):
+        store = SyncStore("api", self.path)
+        store.sync_token = "token1"
+        store.items = {"1": TaskRecord.from_item(make_item("1", "a"))}
+        for error in (
+            http_error(503, "Service Unavailable"),
+            requests.ConnectionError("offline"),
+        ):
+            with patch("SyncStore.sync_request", side_effect=error) as mock:
+                with self.assertRaises(requests.RequestException):
+                    store.sync()
+            # No full sync is started and the local state is kept
+            mock.assert_called_once()
+            self.assertEqual(store.sync_token, "token1")
+            self.assertEqual(list(store.items), ["1"])
+
+    def test_unreadable_state(self):
+        with open(self.path, "w") as state_file:
+            state_file.write("{")
+        store = SyncStore("api", self.path)
+        self.assertEqual(store.sync_token, "*")
+        self.assertEqual(store.items, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
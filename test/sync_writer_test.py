@@ -0,0 +1,74 @@
+import unittest
+from unittest.mock import patch
+from types import SimpleNamespace
+import sys
+import os
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+from SyncWriter import SyncWriter, item_update_args, sync_request
+
+
+class SyncWriterTest(unittest.TestCase):
+    def setUp(self):
+        self.task = SimpleNamespace(id="2995104339", content="data1")
+
+    def test_item_update_args(self):
+        args = item_update_args(
+            "1",
+            {"due_string": "today at 18:00", "duration": 30, "duration_unit": "minute"},
+        )
+        self.assertEqual(
+            args,
+            {
+                "id": "1",
+                "due": {"string": "today at 18:00"},
+                "duration": {"amount": 30, "unit": "minute"},
+            },
+        )
+
+    def test_sync_request_uses_session_timeout(self):
+        """Test the configured http_timeout is not overridden."""
+        with patch("http_session.get_session") as mock_session:
+            mock_session.return_value.post.return_value.json.return_value = {}
+            sync_request("token", {"commands": []})
+        self.assertNotIn("timeout", mock_session.return_value.post.call_args.kwargs)
+
+    def test_flush_sends_chunks(self):
+        writer = SyncWriter("token", chunk_size=2)
+        for _ in range(5):
+            writer.update_task(self.task, priority=4)
+
+        def mock_sync_request(token, data):
+            return {"sync_status": {c["uuid"]: "ok" for c in data["commands"]}}
+
+        with patch("SyncWriter.sync_request", side_effect=mock_sync_request) as mock:
+            failed = writer.flush()
+        self.assertEqual(mock.call_count, 3)
+        self.assertEqual(failed, {})
+        self.assertEqual(writer.commands, [])
+
+    def test_flush_reports_failed_commands(self):
+        writer = SyncWriter("token")
+        ok_uuid = writer.update_task(self.task, priority=4)
+        failed_uuid = writer.move_task(self.task, "parent")
+        error = {"error_code": 20, "error": "Project not found"}
+        response = {"sync_status": {ok_uuid: "ok", failed_uuid: error}}
+
+        with patch("SyncWriter.sync_request", return_value=response) as mock:
+            failed = writer.flush()
+        commands = mock.call_args.args[1]["commands"]
+        self.assertEqual([c["type"] for c in commands], ["item_update", "item_move"])
+        self.assertEqual(failed, {failed_uuid: error})
+
+    def test_flush_request_error(self):
+        writer = SyncWriter("token")
+        command_uuid = writer.update_task(self.task, priority=4)
+        with patch("SyncWriter.sync_request", side_effect=Exception("HTTP 500")):
+            failed = writer.flush()
+        self.assertEqual(failed, {command_uuid: "HTTP 500"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+import unittest
+from unittest.mock import patch
+import datetime
+import sqlite3
+import tempfile
+import sys
+import os
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+from TaskIndex import TaskIndex
+from TaskRecord import TaskRecord
+from SyncStore import SyncStore
+from sync_store_test import make_item
+
+TODAY = datetime.date(2024, 6, 5)
+
+
+def make_record(
+    id, priority, added_at, minutes=None, due=None, labels=(), project="2203306141"
+):
+    return TaskRecord.from_item(
+        make_item(
+            id,
+            f"data{id}",
+            priority=priority,
+            added_at=added_at,
+            duration=minutes and {"amount": minutes, "unit": "minute"},
+            due=due and {"date": due.isoformat(), "string": "today"},
+            labels=list(labels),
+            project_id=project,
+        )
+    )
+
+
+class TaskIndexTest(unittest.TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.path = os.path.join(tmp_dir.name, "tasks.sqlite3")
+        self.index = TaskIndex(self.path)
+        self.addCleanup(self.index.close)
+        self.records = [
+            make_record("1", 3, "2022-01-01T00:00:00Z", labels=["home", "a b"]),
+            make_record("2", 3, "2020-01-01T00:00:00Z", 30, TODAY),
+            make_record(
+                "3",
+                3,
+                "2021-01-01T00:00:00Z",
+                due=datetime.datetime.combine(TODAY, datetime.time(18, 0)),
+            ),
+            make_record("4", 1, "2019-01-01T00:00:00Z", 45, TODAY),
+        ]
+        self.index.update("token1", self.records)
+
+    def test_queries(self):
+        self.assertEqual(self.index.sync_token(), "token1")
+        self.assertEqual(self.index.counts(), {1: 1, 2: 0, 3: 3, 4: 0})
+        # The records come back with their due times
+        self.assertEqual(self.index.oldest(3, 2), [self.records[1], self.records[2]])
+        self.assertEqual(self.index.oldest(3, 5)[-1], self.records[0])
+        self.assertEqual(
+            [task.id for task in self.index.due_on(TODAY)], ["4", "2", "3"]
+        )
+        self.assertEqual(
+            [task.id for task in self.index.due_on(TODAY, with_duration=False)],
+            ["3"],
+        )
+        self.assertEqual(self.index.minutes_due(TODAY), 75)
+        self.assertEqual(self.index.count_due(TODAY), 3)
+        self.assertEqual(self.index.count_due(TODAY, with_duration=True), 2)
+        self.assertEqual(self.index.count_due(TODAY, with_duration=False), 1)
+
+    def test_index_of_another_version_is_rebuilt(self):
+        self.index.close()
+        connection = sqlite3.connect(self.path)
+        connection.execute("PRAGMA user_version = 1")
+        connection.commit()
+        connection.close()
+        self.index = TaskIndex(self.path)
+        self.addCleanup(self.index.close)
+        self.assertIsNone(self.index.sync_token())
+        self.assertEqual(sum(self.index.counts().values()), 0)
+
+    def test_update(self):
+        self.index.update(
+            "token2", [make_record("5", 4, "2023-01-01T00:00:00Z")], ["2"]
+        )
+        self.assertEqual(self.index.counts(), {1: 1, 2: 0, 3: 2, 4: 1})
+        self.index.update("token3", [self.records[3]], full=True)
+        self.assertEqual(self.index.counts(), {1: 1, 2: 0, 3: 0, 4: 0})
+        self.assertEqual(self.index.sync_token(), "token3")
+
+    def test_reader_during_write(self):
+        """Test a reader sees the last committed sync while a sync is written."""
+        reader = TaskIndex(self.path, readonly=True)
+        self.addCleanup(reader.close)
+        with self.index.connection:
+            self.index.connection.execute("DELETE FROM tasks")
+            self.assertEqual(sum(reader.counts().values()), 4)
+        self.assertEqual(sum(reader.counts().values()), 0)
+
+    def test_store_rebuilds_index(self):
+        state_path = os.path.join(os.path.dirname(self.path), "sync_state.bin")
+        full = {
+            "full_sync": True,
+            "sync_token": "token9",
+            "items": [make_item("7", "a", priority=2)],
+        }
+        with patch("SyncStore.sync_request", return_value=full):
+            SyncStore("api", state_path).sync()
+        # The index of another sync is replaced by the tasks of the store
+        SyncStore("api", state_path, self.index)
+        self.assertEqual(self.index.sync_token(), "token9")
+        self.assertEqual([task.id for task in self.index.oldest(2, 5)], ["7"])
+
+        delta = {"sync_token": "token10", "items": [make_item("7", "a", checked=True)]}
+        with patch("SyncStore.sync_request", return_value=delta):
+            SyncStore("api", state_path, self.index).sync()
+        self.assertEqual(sum(self.index.counts().values()), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
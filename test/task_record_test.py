@@ -0,0 +1,77 @@
+import unittest
+import datetime
+import marshal
+import sys
+import os
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+from todoist_api_python.models import Task
+from TaskRecord import TaskRecord, Duration, Due, pack_snapshot, unpack_snapshot
+from TaskRecord import from_columns
+from sync_store_test import make_item
+
+
+class TaskRecordTest(unittest.TestCase):
+    def test_from_item(self):
+        record = TaskRecord.from_item(
+            make_item(
+                "1",
+                "a",
+                priority=3,
+                duration={"amount": 2, "unit": "hour"},
+                due={"date": "2024-06-05", "string": "today", "lang": "en"},
+                labels=["home"],
+            )
+        )
+        self.assertEqual(record.priority, 3)
+        self.assertEqual(
+            record.created_at,
+            datetime.datetime(
+                2021, 12, 11, 22, 36, 50, tzinfo=datetime.timezone.utc
+            ).timestamp(),
+        )
+        # Hours are normalized once, when the task is read
+        self.assertEqual(record.duration, Duration(120, "minute"))
+        self.assertEqual(record.due, Due(datetime.date(2024, 6, 5)))
+        self.assertEqual((record.project_id, record.labels), ("2203306141", ("home",)))
+
+    def test_from_task(self):
+        item = make_item("1", "a", duration={"amount": 30, "unit": "minute"})
+        self.assertEqual(
+            TaskRecord.from_task(Task.from_dict(item)), TaskRecord.from_item(item)
+        )
+
+    def test_snapshot_round_trip(self):
+        records = [
+            TaskRecord.from_item(make_item("1", "a", priority=4)),
+            TaskRecord.from_item(
+                make_item(
+                    "2",
+                    "b",
+                    duration={"amount": 1, "unit": "day"},
+                    due={"date": "2024-06-05T18:00:00", "string": "today"},
+                )
+            ),
+        ]
+        self.assertEqual(
+            records[1].due, Due(datetime.date(2024, 6, 5), datetime.time(18, 0))
+        )
+        sync_token, columns = unpack_snapshot(pack_snapshot("token1", records))
+        self.assertEqual(sync_token, "token1")
+        self.assertEqual(from_columns(columns), records)
+
+    def test_unreadable_snapshot(self):
+        for data in (
+            b"",
+            b"{",
+            marshal.dumps((99, "token", {})),
+            marshal.dumps((2, "token", {"id": []})),
+        ):
+            with self.subTest(data=data), self.assertRaises(ValueError):
+                unpack_snapshot(data)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,8 @@
 import unittest
-from unittest.mock import patch
+from unittest.mock import Mock, patch
+from types import SimpleNamespace
+import datetime
+import tempfile
 import sys
 import os
 
@@ -8,10 +11,17 @@ sys.path.insert(0, src_dir)
 
 from todoist_prioritizer import check_for_updates
 from todoist_prioritizer import current_version
-from todoist_prioritizer import get_tasks
-from todoist_prioritizer import sort_tasks_date
+from todoist_prioritizer import get_tasks_stream
 from todoist_prioritizer import convert_priority
-from todoist_prioritizer import prioritize_tasks, fill_today_tasks
+from todoist_prioritizer import prioritize_tasks
+from todoist_prioritizer import bucket_tasks, run_once, get_oldest_tasks
+from todoist_prioritizer import reprioritize_levels
+from todoist_prioritizer import run_status, get_secret, print_status
+from todoist_prioritizer import export_metrics
+from todoist_prioritizer import EXIT_OK, EXIT_FAILED, EXIT_PARTIAL
+from Settings import Settings
+from TaskIndex import TaskIndex
+from task_index_test import make_record
 
 
 class Task:
@@ -20,6 +30,7 @@ class Task:
         self.content = content
         self.created_at = created_at
         self.priority = priority
+        self.duration = None
 
 
 mock_tasks = [
@@ -170,13 +181,13 @@ class TodoistPrioritizerHelperFunctionsTest(unittest.TestCase):
 
     def test_check_for_updates_invalid(self):
         """Test check_for_updates when the API call fails."""
-        with patch("requests.get") as mock_get:
+        with patch("requests.Session.get") as mock_get:
             mock_get.return_value.status_code = 500
             response = check_for_updates()
             self.assertEqual(response.status_code, 500)
 
-    def test_get_tasks(self):
-        """Test get_tasks returns only tasks with the desired priority."""
+    def test_get_tasks_stream(self):
+        """Test get_tasks_stream returns only tasks with the desired priority."""
         desired_priority = 4
         expected_tasks = [
             task for task in self.tasks if task.priority == desired_priority
@@ -184,14 +195,19 @@ class TodoistPrioritizerHelperFunctionsTest(unittest.TestCase):
 
         with patch("todoist_prioritizer.api_token") as mock_api_token:
             mock_api_token.filter_tasks.return_value = [expected_tasks]
-            tasks = get_tasks("P1")
+            tasks = list(get_tasks_stream("P1"))
             self.assertTrue(all(task.priority == desired_priority for task in tasks))
             self.assertEqual(tasks, expected_tasks)
             mock_api_token.filter_tasks.assert_called_with(query="P1")
 
-    def test_sort_tasks_date(self):
-        sorted_tasks = sort_tasks_date(self.tasks)
-        self.assertEqual(sorted_tasks, sorted(self.tasks, key=lambda x: x.created_at))
+    def test_get_oldest_tasks(self):
+        """Test get_oldest_tasks keeps the oldest tasks across all pages."""
+        pages = [self.tasks[:7], self.tasks[7:14], self.tasks[14:]]
+
+        with patch("todoist_prioritizer.api_token") as mock_api_token:
+            mock_api_token.filter_tasks.return_value = iter(pages)
+            tasks = get_oldest_tasks("P4", 2)
+        self.assertEqual([task.content for task in tasks], ["data19", "data2"])
 
     def test_convert_priority(self):
         self.assertEqual(convert_priority(1), 4)
@@ -235,6 +251,147 @@ class TodoistPrioritizerHelperFunctionsTest(unittest.TestCase):
             )
             mock_api_token.update_task.assert_called()
 
+    def test_bucket_tasks(self):
+        """Test partitioning tasks into priority buckets and the today view."""
+        today = datetime.date(2024, 6, 5)
+        valid_tasks = [task for task in self.tasks if task.priority in {1, 2, 3, 4}]
+        due_task = Task("1", "due", "2024-01-01T00:00:00.000000Z", 2)
+        due_task.due = SimpleNamespace(date=today)
+        snapshot = bucket_tasks(valid_tasks + [due_task], today)
+
+        for level, priority in (("P1", 4), ("P2", 3), ("P3", 2), ("P4", 1)):
+            self.assertTrue(all(t.priority == priority for t in snapshot[level]))
+        self.assertEqual(sum(len(snapshot[f"P{i}"]) for i in range(1, 5)), 19)
+        self.assertEqual(snapshot["today"], [due_task])
+
+    def test_run_once_dry_run(self):
+        """Test a dry run plans the cascade without any writes."""
+        settings = Settings(
+            p1_tasks=1, p2_tasks=1, p3_tasks=0, number_of_tasks=0, task_duration=0
+        )
+        old = Task("1", "old", "2019-01-01T00:00:00.000000Z", 2)
+        new = Task("2", "new", "2023-01-01T00:00:00.000000Z", 2)
+        snapshot = {"P1": [], "P2": [], "P3": [new, old], "P4": [], "today": []}
+
+        with patch("todoist_prioritizer.api_token") as mock_api_token, patch(
+            "todoist_prioritizer.settings_file", Mock(get=lambda: settings)
+        ), patch("todoist_prioritizer.get_snapshot", return_value=snapshot), patch(
+            "builtins.print"
+        ) as mock_print:
+            run_once(dry_run=True)
+            mock_api_token.update_task.assert_not_called()
+        printed = "\n".join(call.args[0] for call in mock_print.call_args_list)
+        self.assertIn("Planned changes (1)", printed)
+        self.assertIn("update old (1): priority=3", printed)
+        self.assertEqual(old.priority, 2)
+
+    def test_reprioritize_levels(self):
+        """Test only the affected level and the levels below it are fetched."""
+        settings = Settings(p1_tasks=5, p2_tasks=1, p3_tasks=1)
+        p3_task = Task("1", "p3", "2019-01-01T00:00:00.000000Z", 2)
+        pages = {"P2": [], "P3": [p3_task], "P4": []}
+
+        with patch("todoist_prioritizer.api_token") as mock_api_token, patch(
+            "todoist_prioritizer.settings_file", Mock(get=lambda: settings)
+        ):
+            mock_api_token.filter_tasks.side_effect = lambda query: [pages[query]]
+            reprioritize_levels({2})
+            queries = [
+                c.kwargs["query"] for c in mock_api_token.filter_tasks.mock_calls
+            ]
+            mock_api_token.update_task.assert_called_once_with(task_id="1", priority=3)
+        self.assertEqual(queries, ["P2", "P3", "P3"])
+
+    def test_reprioritize_levels_with_index(self):
+        """Test a task index answers the counts and selections after one sync."""
+        settings = Settings(p1_tasks=1, p2_tasks=2, p3_tasks=0)
+        with tempfile.TemporaryDirectory() as directory:
+            index = TaskIndex(os.path.join(directory, "tasks.sqlite3"))
+            self.addCleanup(index.close)
+            index.update(
+                "token1",
+                [
+                    make_record("1", 3, "2020-01-01T00:00:00Z"),
+                    make_record("2", 2, "2019-01-01T00:00:00Z"),
+                    make_record("3", 2, "2018-01-01T00:00:00Z"),
+                ],
+            )
+            with patch("todoist_prioritizer.api_token") as mock_api_token, patch(
+                "todoist_prioritizer.settings_file", Mock(get=lambda: settings)
+            ), patch("todoist_prioritizer.task_index", index), patch(
+                "todoist_prioritizer.sync_store"
+            ) as mock_store:
+                reprioritize_levels({1})
+                mock_store.sync.assert_called_once()
+                mock_api_token.filter_tasks.assert_not_called()
+                updated = [
+                    (c.kwargs["task_id"], c.kwargs["priority"])
+                    for c in mock_api_token.update_task.mock_calls
+                ]
+        # P2 -> P1 empties P2, so both P3 tasks are promoted, oldest first
+        self.assertEqual(updated, [("1", 4), ("3", 3), ("2", 3)])
+
+    def test_reprioritize_levels_with_quotas(self):
+        """Test a webhook top-up does not promote past a full quota."""
+        settings = Settings(p1_tasks=3, p2_tasks=0, p3_tasks=0, quotas="work: p1=2")
+        records = [
+            make_record("1", 4, "2020-01-01T00:00:00Z", project="work"),
+            make_record("2", 4, "2020-01-01T00:00:00Z", project="work"),
+            make_record("3", 3, "2018-01-01T00:00:00Z", project="work"),
+            make_record("4", 3, "2019-01-01T00:00:00Z", project="home"),
+        ]
+        with patch("todoist_prioritizer.api_token") as mock_api_token, patch(
+            "todoist_prioritizer.settings_file", Mock(get=lambda: settings)
+        ), patch("todoist_prioritizer.sync_store") as mock_store:
+            mock_store.sync.return_value = records
+            reprioritize_levels({1})
+            mock_api_token.filter_tasks.assert_not_called()
+            mock_api_token.update_task.assert_called_once_with(task_id="4", priority=4)
+
+    def test_print_status(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "tasks.sqlite3")
+            self.assertEqual(print_status(path), EXIT_FAILED)
+            index = TaskIndex(path)
+            index.update("token1", [make_record("1", 4, "2020-01-01T00:00:00Z")])
+            index.close()
+            with patch("builtins.print") as mock_print:
+                self.assertEqual(print_status(path), EXIT_OK)
+        printed = [call.args[0] for call in mock_print.call_args_list]
+        self.assertIn("P1: 1", printed)
+
+    def test_export_metrics_per_account(self):
+        settings = Settings(metrics_file="metrics.json")
+        with patch("todoist_prioritizer.ini_path", "/config/config.ini"), patch(
+            "todoist_prioritizer.registry"
+        ) as mock_registry:
+            export_metrics(settings)
+            export_metrics(settings, "alice")
+            export_metrics(Settings(), "bob")
+        self.assertEqual(
+            [c.args[0] for c in mock_registry.write_json.mock_calls],
+            ["/config/metrics.json", "/config/metrics_alice.json"],
+        )
+
+    def test_run_status(self):
+        """Test --once exit statuses."""
+        self.assertEqual(run_status(lambda: set()), EXIT_OK)
+        self.assertEqual(run_status(lambda: {"1"}), EXIT_PARTIAL)
+
+        def fail():
+            raise Exception("Failed to fetch tasks")
+
+        self.assertEqual(run_status(fail), EXIT_FAILED)
+
+    def test_get_secret_is_cached(self):
+        """Test a keyring secret is looked up once."""
+        get_secret.cache_clear()
+        self.addCleanup(get_secret.cache_clear)
+        with patch("keyring.get_password", return_value="token") as mock_get:
+            self.assertEqual(get_secret("todoist-api-token"), "token")
+            self.assertEqual(get_secret("todoist-api-token"), "token")
+        mock_get.assert_called_once_with("system", "todoist-api-token")
+
 
 if __name__ == "__main__":
     unittest.main()
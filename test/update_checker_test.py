@@ -0,0 +1,76 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import datetime
+import tempfile
+import sys
+import os
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+from UpdateChecker import UpdateChecker, parse_version
+
+
+def make_response(status_code, releases=None, etag=None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.json.return_value = releases
+    response.headers = {} if etag is None else {"ETag": etag}
+    return response
+
+
+class UpdateCheckerTest(unittest.TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.path = os.path.join(tmp_dir.name, "update_state.json")
+        self.release = {"tag_name": "v1.10.0", "body": "Notes", "html_url": "url"}
+
+    def test_parse_version(self):
+        self.assertGreater(parse_version("v1.10.0"), parse_version("v1.9.0"))
+        self.assertEqual(parse_version("v1.2"), parse_version("1.2.0"))
+        self.assertLess(parse_version("v1.3.0-rc1"), parse_version("v1.3.0"))
+        self.assertGreater(parse_version("v1.3.0-rc1"), parse_version("v1.2.0"))
+        with self.assertRaises(ValueError):
+            parse_version("latest")
+
+    def test_cached_conditional_check(self):
+        responses = [make_response(200, [self.release], '"abc"'), make_response(304)]
+        with patch("requests.Session.get", side_effect=responses) as mock_get:
+            with self.assertLogs(level="INFO") as logs:
+                UpdateChecker("v1.9.0", self.path, interval=0).check()
+            # A new checker sends the cached ETag
+            checker = UpdateChecker("v1.9.0", self.path, interval=0)
+            self.assertEqual(checker.check().status_code, 304)
+        self.assertIn("New version available: v1.10.0", logs.output[0])
+        self.assertNotIn("If-None-Match", mock_get.call_args_list[0].kwargs["headers"])
+        self.assertEqual(
+            mock_get.call_args_list[1].kwargs["headers"]["If-None-Match"], '"abc"'
+        )
+        self.assertEqual(checker.latest, self.release)
+
+    def test_interval(self):
+        checker = UpdateChecker("v1.9.0", self.path)
+        checker.checked_at = datetime.datetime.now()
+        checker.latest = self.release
+        with patch("requests.Session.get") as mock_get:
+            self.assertIsNone(checker.check())
+        mock_get.assert_not_called()
+
+    def test_failed_check_is_retried(self):
+        checker = UpdateChecker("v1.9.0", self.path)
+        with patch("requests.Session.get", return_value=make_response(500)):
+            checker.check()
+        self.assertTrue(checker.is_due(datetime.datetime.now()))
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_background_check_logs_errors(self):
+        checker = UpdateChecker("v1.9.0", self.path)
+        with patch("requests.Session.get", side_effect=OSError("offline")):
+            with self.assertLogs(level="ERROR"):
+                checker.start()
+                checker.thread.join(5)
+
+
+if __name__ == "__main__":
+    unittest.main()
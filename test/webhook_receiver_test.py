@@ -0,0 +1,79 @@
+import unittest
+import base64
+import hashlib
+import hmac
+import json
+import threading
+import urllib.error
+import urllib.request
+import sys
+import os
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+from WebhookReceiver import WebhookReceiver, affected_levels
+
+
+def make_event(event_name, priority, old_priority=None):
+    payload = {
+        "event_name": event_name,
+        "event_data": {"id": "1", "priority": priority},
+    }
+    if old_priority is not None:
+        payload["event_data_extra"] = {"old_item": {"priority": old_priority}}
+    return payload
+
+
+class WebhookReceiverTest(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+        self.called = threading.Event()
+
+        def callback(levels):
+            self.calls.append(levels)
+            self.called.set()
+
+        self.receiver = WebhookReceiver(callback, secret="secret", debounce=0.2)
+        self.receiver.start()
+        self.addCleanup(self.receiver.stop)
+
+    def post(self, payload, secret="secret"):
+        """Local stand-in for Todoist posting a webhook event."""
+        body = json.dumps(payload).encode()
+        digest = hmac.new(secret.encode(), body, hashlib.sha256).digest()
+        request = urllib.request.Request(
+            f"http://127.0.0.1:{self.receiver.port}/",
+            data=body,
+            headers={
+                "Content-Type": "application/json",
+                "X-Todoist-Hmac-SHA256": base64.b64encode(digest).decode(),
+            },
+        )
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status
+
+    def test_affected_levels(self):
+        self.assertEqual(affected_levels(make_event("item:completed", 4)), {1})
+        self.assertEqual(affected_levels(make_event("item:deleted", 2)), {3})
+        self.assertEqual(affected_levels(make_event("item:updated", 3, 4)), {1, 2})
+        self.assertEqual(affected_levels(make_event("item:updated", 3, 3)), set())
+        self.assertEqual(affected_levels(make_event("item:added", 4)), set())
+
+    def test_events_are_debounced(self):
+        self.assertEqual(self.post(make_event("item:completed", 3)), 200)
+        self.assertEqual(self.post(make_event("item:deleted", 4)), 200)
+        self.assertEqual(self.post(make_event("item:added", 1)), 200)
+
+        self.assertTrue(self.called.wait(5))
+        self.assertEqual(self.calls, [{1, 2}])
+
+    def test_invalid_signature(self):
+        with self.assertRaises(urllib.error.HTTPError) as context:
+            self.post(make_event("item:completed", 4), secret="wrong")
+        self.assertEqual(context.exception.code, 403)
+        self.assertFalse(self.called.wait(0.5))
+
+
+if __name__ == "__main__":
+    unittest.main()